@@ -6,8 +6,10 @@ import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
-from core.config import JWT_ALGORITHM, settings
+from core.config import ROLE_MASK_CLAIM
+from core.jwt_keys import get_keyring
 from models import OAuthProviders
+from services import role_catalog
 
 # Для чтения access-токенов из заголовка запроса
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="v1/auth/login")
@@ -15,24 +17,47 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="v1/auth/login")
 
 def decode_token(token: str) -> dict[str, Any] | None:
     try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[JWT_ALGORITHM])
+        payload = get_keyring().decode(token)
     except jwt.exceptions.InvalidTokenError:
         return None
 
     return payload
 
 
+def is_access_token(auth_data: dict[str, Any]) -> bool:
+    """Роли есть только в access-токенах, refresh-токены доступа не дают"""
+    return "roles" in auth_data or ROLE_MASK_CLAIM in auth_data
+
+
+def has_role(auth_data: dict[str, Any], title: str) -> bool:
+    """Проверка роли в токене любого формата, для маски - сдвиг и AND"""
+    if ROLE_MASK_CLAIM in auth_data:
+        catalog = role_catalog.catalog
+        bit = catalog.bit(title) if catalog is not None else None
+        return bit is not None and auth_data[ROLE_MASK_CLAIM] >> bit & 1 == 1
+    return title in auth_data.get("roles", ())
+
+
+def token_roles(auth_data: dict[str, Any]) -> list[str]:
+    """Названия ролей токена, например для передачи другим сервисам"""
+    if ROLE_MASK_CLAIM in auth_data:
+        if role_catalog.catalog is None:
+            return []
+        return role_catalog.catalog.role_titles(auth_data[ROLE_MASK_CLAIM])
+    return auth_data.get("roles", [])
+
+
 def check_allow_affect_user(auth_data: dict[str, Any], user_id: UUID):
     """
     Операции может производить только admin или пользователь со своим профилем
     """
-    if "admin" not in auth_data["roles"] and str(user_id) != auth_data["user_id"]:
+    if not has_role(auth_data, "admin") and str(user_id) != auth_data["user_id"]:
         raise HTTPException(status_code=HTTPStatus.FORBIDDEN)
 
 
 def check_admin(auth_data: dict[str, Any]):
     """Проверяет что только админ может получить доступ к endpoints"""
-    if "admin" not in auth_data["roles"]:
+    if not has_role(auth_data, "admin"):
         raise HTTPException(status_code=HTTPStatus.FORBIDDEN)
 
 
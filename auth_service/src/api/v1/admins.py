@@ -2,8 +2,8 @@ from http import HTTPStatus
 from typing import Annotated, Union
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi_pagination import Page, Params, paginate
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi_pagination import Page, Params
 
 from api.auth_utils import (check_admin, check_allow_affect_user, decode_token,
                             oauth2_scheme)
@@ -49,12 +49,11 @@ async def get_user_roles(
 
     check_allow_affect_user(payload, user_id)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
 
     try:
-        roles = await admin_service.get_user_roles(user_id)
-        return paginate(roles, params)
+        return await admin_service.get_user_roles(user_id, params)
     except ObjectNotFoundError:
         return []
     except UserNotFoundError:
@@ -63,6 +62,52 @@ async def get_user_roles(
         )
 
 
+@router.get(
+    "/{user_id}/roles/{title}",
+    status_code=HTTPStatus.NO_CONTENT,
+    summary="Проверка роли пользователя",
+    response_description="Роль назначена пользователю",
+    responses={
+        HTTPStatus.NOT_FOUND: {
+            "description": "Роль не назначена пользователю",
+            "content": {
+                "application/json": {"example": {"detail": "role not assigned"}}
+            },
+        },
+        HTTPStatus.UNAUTHORIZED: {
+            "description": "Ошибка валидации токена",
+            "content": {"application/json": {"example": {"detail": "invalid token"}}},
+        },
+        HTTPStatus.FORBIDDEN: {
+            "description": "Доступ запрещен",
+            "content": {"application/json": {"example": {"detail": "Forbidden"}}},
+        },
+    },
+)
+async def check_user_role(
+    user_id: UUID,
+    title: str,
+    access_token: Annotated[str, Depends(oauth2_scheme)],
+    auth_service: AuthService = Depends(get_auth_service),
+    admin_service: AdminService = Depends(get_admin_service),
+) -> Response:
+    payload = decode_token(access_token)
+    if not payload:
+        raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
+
+    check_allow_affect_user(payload, user_id)
+
+    if not await auth_service.is_access_token_valid(access_token, payload):
+        raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
+
+    if not await admin_service.has_user_role(user_id, title):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="role not assigned"
+        )
+
+    return Response(status_code=HTTPStatus.NO_CONTENT)
+
+
 @router.post(
     "/{user_id}/roles",
     response_model=RoleSchema,
@@ -96,7 +141,7 @@ async def add_user_role(
 
     check_admin(payload)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
 
     try:
@@ -148,7 +193,7 @@ async def remove_user_role(
 
     check_admin(payload)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
 
     try:
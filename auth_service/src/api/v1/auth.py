@@ -1,13 +1,22 @@
+import time
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from redis.asyncio import Redis
 
-from api.auth_utils import decode_token
-from schemas.auths import (AuthOutputSchema, LoginInputSchema,
-                           RefreshInputSchema)
+from api.auth_utils import decode_token, is_access_token, token_roles
+from core.config import settings
+from db.redis import get_redis
+from schemas.auths import (AuthOutputSchema, IntrospectInputSchema,
+                           IntrospectOutputSchema, LoginInputSchema,
+                           RefreshInputSchema, TokenIntrospectionSchema)
 from schemas.users import CreateUserSchema
 from services.auth import AuthService, get_auth_service
-from services.exceptions import ConflictError, ObjectNotFoundError
+from services.exceptions import (ConflictError, InvalidPasswordError,
+                                 InvalidRefreshTokenError, ObjectNotFoundError,
+                                 TooManyLoginAttemptsError)
+from services.token_denylist import AccessTokenDenylist, get_token_denylist
+from services.token_watermarks import TokenWatermarks, get_token_watermarks
 from services.user import UserService, get_user_service
 
 router = APIRouter()
@@ -71,7 +80,6 @@ async def signup(
 async def refresh(
     request_data: RefreshInputSchema,
     auth_service: AuthService = Depends(get_auth_service),
-    user_service: UserService = Depends(get_user_service),
 ) -> AuthOutputSchema:
 
     refresh_token_data = decode_token(request_data.refresh_token)
@@ -87,12 +95,16 @@ async def refresh(
 
     user_id = refresh_token_data["user_id"]
 
-    user_roles = [x.title for x in await user_service.get_user_roles(user_id)]
-    refresh_token, access_token = await auth_service.update_refresh_token(
-        user_id,
-        request_data.refresh_token,
-        user_roles,
-    )
+    user_roles = await auth_service.get_user_roles(user_id)
+    try:
+        refresh_token, access_token = await auth_service.update_refresh_token(
+            user_id,
+            request_data.refresh_token,
+            user_roles,
+        )
+    except InvalidRefreshTokenError:
+        # токен успели использовать или отозвать параллельным запросом
+        raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
 
     return AuthOutputSchema(
         access_token=access_token, refresh_token=refresh_token, user_id=user_id
@@ -119,35 +131,37 @@ async def refresh(
                 "application/json": {"example": {"detail": "invalid password"}}
             },
         },
+        HTTPStatus.TOO_MANY_REQUESTS: {
+            "description": "Слишком много неудачных попыток входа",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "too many failed login attempts"}
+                }
+            },
+        },
     },
 )
 async def login(
     request: Request,
     login_data: LoginInputSchema,
     auth_service: AuthService = Depends(get_auth_service),
-    user_service: UserService = Depends(get_user_service),
 ) -> AuthOutputSchema:
+    user_agent = request.headers.get("user-agent", "Unknown")
+
     try:
-        user = await user_service.get_user_by_login(login_data.login)
+        return await auth_service.login(
+            login_data.login, login_data.password, user_agent
+        )
     except ObjectNotFoundError:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="user not found")
-
-    if not user.check_password(login_data.password):
+    except InvalidPasswordError:
         raise HTTPException(HTTPStatus.BAD_REQUEST, detail="invalid password")
-
-    user_id = str(user.id)
-    user_agent = request.headers.get("user-agent", "Unknown")
-
-    await user_service.save_login_history(user_id, user_agent)
-
-    user_roles = [x.title for x in await user_service.get_user_roles(user_id)]
-
-    access_token = await auth_service.generate_access_token(user_id, user_roles)
-    refresh_token = await auth_service.emit_refresh_token(user_id)
-
-    return AuthOutputSchema(
-        access_token=access_token, refresh_token=refresh_token, user_id=user_id
-    )
+    except TooManyLoginAttemptsError:
+        raise HTTPException(
+            HTTPStatus.TOO_MANY_REQUESTS,
+            detail="too many failed login attempts",
+            headers={"Retry-After": str(settings.login_failures_window_sec)},
+        )
 
 
 @router.post(
@@ -182,6 +196,8 @@ async def logout(
     "/logout/all",
     status_code=200,
     summary="Выход пользователя из остальных аккаунтов",
+    description="Удаляет остальные refresh-токены и отзывает все выпущенные "
+    "access-токены, включая текущий: новый выдается через /refresh",
     response_description="",
     responses={
         HTTPStatus.UNAUTHORIZED: {
@@ -202,3 +218,93 @@ async def logout_all(
         refresh_token_data["user_id"], request_data.refresh_token
     )
     return {"detail": "logout from all other devices success"}
+
+
+@router.post(
+    "/introspect",
+    response_model=IntrospectOutputSchema,
+    summary="Проверка пачки access-токенов",
+    response_description="Для каждого токена: действителен ли он, пользователь и роли",
+)
+async def introspect(
+    request_data: IntrospectInputSchema,
+    response: Response,
+    auth_service: AuthService = Depends(get_auth_service),
+) -> IntrospectOutputSchema:
+    # refresh-токены без ролей доступа не дают и считаются недействительными
+    payloads = [
+        payload if payload and is_access_token(payload) else None
+        for payload in map(decode_token, request_data.tokens)
+    ]
+    decoded = [i for i, payload in enumerate(payloads) if payload]
+    valid = await auth_service.are_access_tokens_valid(
+        [request_data.tokens[i] for i in decoded], [payloads[i] for i in decoded]
+    )
+    for i, is_valid in zip(decoded, valid):
+        if not is_valid:
+            payloads[i] = None
+
+    # Недействительный токен таким и останется, а ответ по действительным
+    # можно кэшировать не дольше их оставшегося срока жизни
+    max_age = settings.introspect_max_age
+    now = int(time.time())
+    for payload in filter(None, payloads):
+        max_age = min(max_age, max(payload["exp"] - now, 0))
+    response.headers["Cache-Control"] = f"private, max-age={max_age}"
+
+    return IntrospectOutputSchema(
+        tokens=[
+            TokenIntrospectionSchema(
+                active=True,
+                user_id=payload["user_id"],
+                roles=token_roles(payload),
+                exp=payload["exp"],
+            )
+            if payload
+            else TokenIntrospectionSchema(active=False)
+            for payload in payloads
+        ]
+    )
+
+
+@router.get(
+    "/verify",
+    status_code=HTTPStatus.NO_CONTENT,
+    summary="Проверка access-токена для nginx auth_request",
+    response_description="Пустой ответ, пользователь и роли в заголовках",
+    responses={
+        HTTPStatus.NO_CONTENT: {
+            "description": "Токен действителен (X-User-Id, X-User-Roles) "
+            "или не передан (анонимный запрос)",
+        },
+        HTTPStatus.UNAUTHORIZED: {"description": "Токен недействителен или отозван"},
+    },
+)
+async def verify(
+    request: Request,
+    redis: Redis = Depends(get_redis),
+    denylist: AccessTokenDenylist | None = Depends(get_token_denylist),
+    watermarks: TokenWatermarks | None = Depends(get_token_watermarks),
+) -> Response:
+    # Без тела, без базы и без схем: ответ нужен только nginx
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return Response(status_code=HTTPStatus.NO_CONTENT)
+
+    scheme, _, token = authorization.partition(" ")
+    payload = decode_token(token) if scheme.lower() == "bearer" else None
+    if not payload or not is_access_token(payload):
+        return Response(status_code=HTTPStatus.UNAUTHORIZED)
+
+    if await (watermarks or TokenWatermarks(redis)).is_revoked(payload):
+        return Response(status_code=HTTPStatus.UNAUTHORIZED)
+    if await (denylist or AccessTokenDenylist(redis)).is_revoked(token):
+        return Response(status_code=HTTPStatus.UNAUTHORIZED)
+
+    return Response(
+        status_code=HTTPStatus.NO_CONTENT,
+        headers={
+            "X-User-Id": payload["user_id"],
+            "X-User-Roles": ",".join(token_roles(payload)),
+        },
+    )
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Request, Response, status
+
+from core.config import settings
+from core.jwt_keys import KeyRing, get_keyring
+
+router = APIRouter()
+
+
+@router.get(
+    "/jwks.json",
+    summary="Публичные ключи подписи токенов",
+    response_description="JWK Set с ключами, которыми подписаны access-токены",
+)
+async def jwks(request: Request, keyring: KeyRing = Depends(get_keyring)) -> Response:
+    # Ключи меняются только с перезапуском, поэтому тело и ETag посчитаны заранее
+    headers = {
+        "Cache-Control": (
+            f"public, max-age={settings.jwks_max_age}, "
+            f"stale-while-revalidate={settings.jwks_max_age}, "
+            f"stale-if-error=86400"
+        ),
+        "ETag": keyring.jwks_etag,
+    }
+    if request.headers.get("if-none-match") == keyring.jwks_etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=keyring.jwks_body, media_type="application/json", headers=headers
+    )
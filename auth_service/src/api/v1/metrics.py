@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from core.metrics import registry
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    summary="Метрики процесса",
+    response_description="Счетчики, текущие значения и гистограммы воркера",
+)
+async def metrics() -> dict:
+    return registry.snapshot()
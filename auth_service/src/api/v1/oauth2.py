@@ -4,10 +4,11 @@ from fastapi.responses import RedirectResponse
 from models import OAuthProviders
 from schemas.auths import AuthOutputSchema
 from services.auth import AuthService, get_auth_service
-from services.exceptions import OAuthUserNotFoundError, ObjectNotFoundError
+from services.exceptions import (ConflictError, OAuthUserNotFoundError,
+                                 ObjectNotFoundError)
 from services.oauth2 import OAuthServiceGoogle, get_google_service
 
-from ..auth_utils import get_oauth_service, is_provider_available
+from ..auth_utils import is_provider_available
 
 router = APIRouter()
 
@@ -50,6 +51,14 @@ async def authentication(
             "description": "Ошибки связанные с запросами к OAuth провайдеру",
             "content": {"application/json": {"example": {"detail": "error"}}},
         },
+        status.HTTP_409_CONFLICT: {
+            "description": "Логин из профиля провайдера занят другим пользователем",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "user with this parameters already exists"}
+                }
+            },
+        },
     },
 )
 async def authorization(
@@ -74,14 +83,18 @@ async def authorization(
             detail=f"{oauth_provider} not supported by service",
         )
 
-    access_token_to_provider = await oauth_service.get_access_token_from_provider(code)
+    provider_token = await oauth_service.get_access_token_from_provider(code)
 
-    user_data = await oauth_service.get_user_data_from_provider(
-        access_token_to_provider
-    )
+    user_data = await oauth_service.get_user_data_from_provider(provider_token)
 
     user_agent = request.headers.get("user-agent", "Unknown")
-    service_user = await oauth_service.authorize_user(user_data, user_agent)
+    try:
+        service_user = await oauth_service.authorize_user(user_data, user_agent)
+    except ConflictError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="user with this parameters already exists",
+        )
 
     user_id = str(service_user.id)
     access_token = await auth_service.generate_access_token(user_id, [])
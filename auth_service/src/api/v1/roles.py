@@ -1,7 +1,7 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_pagination import Page, paginate
+from fastapi_pagination import Page, Params
 from fastapi_pagination.utils import disable_installed_extensions_check
 
 from api.auth_utils import check_admin, decode_token, oauth2_scheme
@@ -51,6 +51,7 @@ async def roles(
     access_token: Annotated[str, Depends(oauth2_scheme)],
     auth_service: AuthService = Depends(get_auth_service),
     role_service: RoleService = Depends(get_role_service),
+    params: Params = Depends(),
 ) -> Page[RoleSchema]:
 
     payload = decode_token(access_token)
@@ -61,13 +62,12 @@ async def roles(
 
     check_admin(payload)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token"
         )
 
-    roles_list = await role_service.get_roles_list()
-    return paginate(roles_list)
+    return await role_service.get_roles_list(params)
 
 
 @router.post(
@@ -123,7 +123,7 @@ async def create_roles(
 
     check_admin(payload)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token"
         )
@@ -180,7 +180,7 @@ async def delete_roles(
 
     check_admin(payload)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token"
         )
@@ -235,7 +235,7 @@ async def update_roles(
 
     check_admin(payload)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid token"
         )
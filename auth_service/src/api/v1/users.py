@@ -1,14 +1,16 @@
+from datetime import datetime
 from http import HTTPStatus
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi_pagination import Page, paginate
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from api.auth_utils import check_allow_affect_user, decode_token, oauth2_scheme
-from schemas.users import UpdateUserSchema, UserLoginHistorySchema, UserSchema
+from schemas.users import (HistoryTotal, LoginHistoryPageSchema,
+                           UpdateUserSchema, UserSchema)
 from services.auth import AuthService, get_auth_service
-from services.exceptions import ConflictError, ObjectNotFoundError
+from services.exceptions import (ConflictError, InvalidCursorError,
+                                 ObjectNotFoundError)
 from services.user import UserService, get_user_service
 
 router = APIRouter()
@@ -47,7 +49,7 @@ async def get_user_info(
 
     check_allow_affect_user(payload, user_id)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
 
     try:
@@ -60,10 +62,14 @@ async def get_user_info(
 
 @router.get(
     "/{user_id}/login_history",
-    response_model=Page[UserLoginHistorySchema],
+    response_model=LoginHistoryPageSchema,
     summary="Информация об истории логинов пользователя",
-    response_description="Список всех логинов пользователя с пагинацией",
+    response_description="Логины пользователя от новых к старым, с курсором",
     responses={
+        HTTPStatus.BAD_REQUEST: {
+            "description": "Некорректный курсор",
+            "content": {"application/json": {"example": {"detail": "invalid cursor"}}},
+        },
         HTTPStatus.NOT_FOUND: {
             "description": "Пользователь не найден",
             "content": {"application/json": {"example": {"detail": "user not found"}}},
@@ -81,6 +87,13 @@ async def get_user_info(
 async def get_user_history(
     user_id: UUID,
     access_token: Annotated[str, Depends(oauth2_scheme)],
+    cursor: str | None = Query(None, description="next_cursor прошлой страницы"),
+    size: int = Query(50, ge=1, le=100),
+    date_from: datetime | None = Query(None, alias="from"),
+    date_to: datetime | None = Query(None, alias="to"),
+    total: HistoryTotal | None = Query(
+        None, description="exact - точный подсчёт, estimated - оценка по плану"
+    ),
     user_service: UserService = Depends(get_user_service),
     auth_service: AuthService = Depends(get_auth_service),
 ):
@@ -90,15 +103,17 @@ async def get_user_history(
 
     check_allow_affect_user(payload, user_id)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
 
     try:
-        user_history = await user_service.get_user_history(user_id)
+        return await user_service.get_user_history(
+            user_id, size, cursor, date_from, date_to, total
+        )
     except ObjectNotFoundError:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="user not found")
-
-    return paginate(user_history)
+    except InvalidCursorError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor")
 
 
 @router.put(
@@ -142,7 +157,7 @@ async def put_user_info(
 
     check_allow_affect_user(payload, user_id)
 
-    if not await auth_service.is_access_token_valid(access_token):
+    if not await auth_service.is_access_token_valid(access_token, payload):
         raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail="invalid token")
 
     try:
@@ -0,0 +1,122 @@
+"""
+Число выдач соединений из пула и задержка на запрос по эндпоинтам.
+
+Приложение вызывается напрямую через ASGI, без сети и без lifespan, так что
+локальные кэши не запущены и видно худший случай. Запуск из auth_service/src
+(нужны Postgres и Redis из настроек):
+    python -m benchmarks.bench_checkouts --requests 200
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+
+from httpx import ASGITransport, AsyncClient
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from benchmarks.utils import print_latency_report
+from core.config import settings
+from db import postgres, redis
+from main import app
+
+PASSWORD = "bench_password"
+API = "/auth/api/v1"
+
+
+class CheckoutCounter:
+    def __init__(self, engine):
+        self.value = 0
+        event.listen(engine.sync_engine.pool, "checkout", self._on_checkout)
+
+    def _on_checkout(self, *args):
+        self.value += 1
+
+
+async def main(requests: int) -> None:
+    postgres.engine = postgres.create_engine()
+    postgres.async_session = async_sessionmaker(
+        bind=postgres.engine, expire_on_commit=False, class_=AsyncSession
+    )
+    redis.redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    counter = CheckoutCounter(postgres.engine)
+    samples = defaultdict(list)
+    checkouts = defaultdict(int)
+
+    async def call(name: str, method: str, url: str, **kwargs):
+        before = counter.value
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        samples[name].append(time.perf_counter() - start)
+        checkouts[name] += counter.value - before
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            for _ in range(requests):
+                login = f"bench_{uuid.uuid4().hex[:12]}"
+                tokens = await call(
+                    "signup",
+                    "POST",
+                    f"{API}/auth/signup",
+                    json={
+                        "login": login,
+                        "password": PASSWORD,
+                        "email": f"{login}@example.com",
+                    },
+                )
+                tokens = await call(
+                    "login",
+                    "POST",
+                    f"{API}/auth/login",
+                    json={"login": login, "password": PASSWORD},
+                )
+                headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+                user_id = tokens["user_id"]
+                await call(
+                    "user info", "GET", f"{API}/users/{user_id}", headers=headers
+                )
+                await call(
+                    "login history",
+                    "GET",
+                    f"{API}/users/{user_id}/login_history",
+                    headers=headers,
+                )
+                tokens = await call(
+                    "refresh",
+                    "POST",
+                    f"{API}/auth/refresh",
+                    json={
+                        "access_token": tokens["access_token"],
+                        "refresh_token": tokens["refresh_token"],
+                    },
+                )
+                await call(
+                    "logout",
+                    "POST",
+                    f"{API}/auth/logout",
+                    json={
+                        "access_token": tokens["access_token"],
+                        "refresh_token": tokens["refresh_token"],
+                    },
+                )
+    finally:
+        await redis.redis.aclose()
+        await postgres.engine.dispose()
+
+    for name, endpoint_samples in samples.items():
+        print_latency_report(name, endpoint_samples)
+        print(f"  checkouts/request={checkouts[name] / len(endpoint_samples):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,87 @@
+"""
+Пропускная способность подписи и проверки access-токенов по алгоритмам.
+Отдельной строкой для RS256 показана проверка с разбором PEM на каждый
+токен, чтобы было видно, что даёт кэш разобранных ключей.
+
+Запуск из auth_service/src (внешние сервисы не нужны):
+    python -m benchmarks.bench_jwt --tokens 5000
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+
+from cli.jwt_keys_cli import KEY_FACTORIES
+from core.jwt_keys import KeyRing, SigningKey
+
+SECRET = "bench_secret"
+
+
+def make_payload() -> dict:
+    valid_till = datetime.now() + timedelta(hours=1)
+    return {
+        "user_id": "00000000-0000-0000-0000-000000000000",
+        "exp": int(valid_till.timestamp()),
+        "roles": ["subscriber"],
+    }
+
+
+def throughput(func, tokens: int) -> float:
+    start = time.perf_counter()
+    for _ in range(tokens):
+        func()
+    return tokens / (time.perf_counter() - start)
+
+
+def report(name: str, sign_rate: float | None, verify_rate: float, size: int):
+    sign = f"{sign_rate:>9.0f}/s" if sign_rate is not None else f"{'-':>11}"
+    print(f"{name:<22} sign={sign} verify={verify_rate:>9.0f}/s token={size}B")
+
+
+def main(tokens: int) -> None:
+    payload = make_payload()
+
+    keyring = KeyRing([], SECRET)
+    token = keyring.encode(payload)
+    report(
+        "HS256",
+        throughput(lambda: keyring.encode(payload), tokens),
+        throughput(lambda: keyring.decode(token), tokens),
+        len(token),
+    )
+
+    for algorithm, factory in KEY_FACTORIES.items():
+        key = SigningKey("bench", algorithm, factory())
+        keyring = KeyRing([key], SECRET)
+        token = keyring.encode(payload)
+        report(
+            algorithm,
+            throughput(lambda: keyring.encode(payload), tokens),
+            throughput(lambda: keyring.decode(token), tokens),
+            len(token),
+        )
+
+        if algorithm == "RS256":
+            public_pem = key.public_key.public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+            report(
+                "RS256 (PEM per token)",
+                None,
+                throughput(
+                    lambda: jwt.decode(token, public_pem, algorithms=["RS256"]),
+                    tokens,
+                ),
+                len(token),
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.tokens)
@@ -0,0 +1,110 @@
+"""
+Сравнение старого пайплайна входа (четыре вызова сервисов) и
+AuthService.login (один запрос за пользователем). Каждый вход выполняется
+в своём UnitOfWork, как запрос к API.
+
+Запуск из auth_service/src (нужны Postgres и Redis из настроек):
+    python -m benchmarks.bench_login --logins 500
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from redis.asyncio import Redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+                                    create_async_engine)
+
+from benchmarks.utils import print_latency_report
+from core.config import settings
+from db import postgres
+from db.unit_of_work import UnitOfWork
+from schemas.users import CreateUserSchema
+from services.auth import AuthService
+from services.password_hasher import verify_password
+from services.user import UserService
+
+PASSWORD = "bench_password"
+USER_AGENT = "bench"
+
+
+class EngineCounters:
+    def __init__(self, engine):
+        self.checkouts = 0
+        self.commits = 0
+        event.listen(engine.sync_engine.pool, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "commit", self._on_commit)
+
+    def _on_checkout(self, *args):
+        self.checkouts += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def reset(self):
+        self.checkouts = 0
+        self.commits = 0
+
+
+async def old_login(auth_service: AuthService, user_service: UserService, login: str):
+    user = await user_service.get_user_by_login(login)
+    if not await verify_password(user.password, PASSWORD):
+        raise RuntimeError("invalid password")
+    user_id = str(user.id)
+    await user_service.save_login_history(user_id, USER_AGENT)
+    user_roles = [x.title for x in await user_service.get_user_roles(user_id)]
+    await auth_service.generate_access_token(user_id, user_roles)
+    await auth_service.emit_refresh_token(user_id)
+
+
+async def new_login(auth_service: AuthService, user_service: UserService, login: str):
+    await auth_service.login(login, PASSWORD, USER_AGENT)
+
+
+async def run(name, pipeline, logins, counters, session_maker, redis, login):
+    counters.reset()
+    samples = []
+    for _ in range(logins):
+        start = time.perf_counter()
+        async with UnitOfWork(session_maker) as unit_of_work:
+            await pipeline(
+                AuthService(unit_of_work, redis), UserService(unit_of_work), login
+            )
+        samples.append(time.perf_counter() - start)
+    print_latency_report(name, samples)
+    print(
+        f"  checkouts/login={counters.checkouts / logins:.1f} "
+        f"commits/login={counters.commits / logins:.1f}"
+    )
+
+
+async def main(logins: int) -> None:
+    engine = create_async_engine(postgres.dsn, echo=False)
+    session_maker = async_sessionmaker(
+        bind=engine, expire_on_commit=False, class_=AsyncSession
+    )
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    counters = EngineCounters(engine)
+
+    login = f"bench_{uuid.uuid4().hex[:8]}"
+    async with UnitOfWork(session_maker) as unit_of_work:
+        await UserService(unit_of_work).create_user(
+            CreateUserSchema(
+                login=login, password=PASSWORD, email=f"{login}@example.com"
+            )
+        )
+    try:
+        for name, pipeline in (("old pipeline", old_login), ("login()", new_login)):
+            await run(name, pipeline, logins, counters, session_maker, redis, login)
+    finally:
+        await redis.aclose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
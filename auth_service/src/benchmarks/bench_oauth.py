@@ -0,0 +1,91 @@
+"""
+Вход через OAuth под нагрузкой без обращения к Google.
+
+Клиент провайдера заменяется поддельным транспортом с задержкой
+--provider-latency-ms, остальной путь (обмен кода, профиль, поиск и создание
+пользователя, выдача токенов) тот же, что в проде. С OAUTH_VERIFY_ID_TOKEN=False
+профиль берется из userinfo, а не из id_token. Параллельно раз в 10 мс
+меряется задержка цикла событий: если запрос к провайдеру блокирует воркер,
+она вырастет до задержки провайдера.
+
+Запуск из auth_service/src (нужны Postgres и Redis из настроек):
+    python -m benchmarks.bench_oauth --logins 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from httpx import ASGITransport, AsyncClient
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from benchmarks.utils import print_latency_report
+from core import oauth_clients
+from core.config import settings
+from db import postgres, redis
+from main import app
+from services import oidc_keys
+
+API = "/auth/api/v1"
+
+
+async def probe_loop_lag(samples: list[float], stop: asyncio.Event) -> None:
+    interval = 0.01
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def main(logins: int, concurrency: int, provider_latency_ms: int) -> None:
+    settings.oauth_fake_provider = True
+    settings.oauth_fake_latency_ms = provider_latency_ms
+    postgres.engine = postgres.create_engine()
+    postgres.async_session = async_sessionmaker(
+        bind=postgres.engine, expire_on_commit=False, class_=AsyncSession
+    )
+    redis.redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    oauth_clients.google_client = oauth_clients.create_google_client()
+    if settings.oauth_verify_id_token:
+        oidc_keys.google_keys = oidc_keys.OIDCKeySet(
+            oauth_clients.google_client, settings.google_discovery_url
+        )
+        await oidc_keys.google_keys.refresh()
+
+    codes = iter(uuid.uuid4().hex for _ in range(logins))
+    samples, lag = [], []
+    stop = asyncio.Event()
+
+    async def worker(client: AsyncClient):
+        for code in codes:
+            start = time.perf_counter()
+            response = await client.get(f"{API}/oauth/google/auth?code={code}")
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            probe = asyncio.create_task(probe_loop_lag(lag, stop))
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            stop.set()
+            await probe
+    finally:
+        await oauth_clients.google_client.aclose()
+        await redis.redis.aclose()
+        await postgres.engine.dispose()
+
+    print_latency_report("oauth login", samples)
+    print_latency_report("event loop lag", lag)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--provider-latency-ms", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency, args.provider_latency_ms))
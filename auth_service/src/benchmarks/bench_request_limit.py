@@ -0,0 +1,72 @@
+"""
+Задержка middleware лимита запросов в изоляции от остального приложения.
+
+Запуск из auth_service/src (нужен Redis из настроек):
+    python -m benchmarks.bench_request_limit --requests 20000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import Request, Response
+from redis.asyncio import Redis
+
+from benchmarks.utils import print_latency_report
+from core.config import settings
+from middlewares.request_limit_middleware import check_request_limit
+from services import rate_limiter
+
+
+def make_request(client_number: int) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/auth/api/v1/roles/",
+        "headers": [
+            (b"x-real-ip", f"10.0.{client_number // 256}.{client_number % 256}".encode()),
+            (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64) bench"),
+        ],
+        "client": ("127.0.0.1", 0),
+    }
+    return Request(scope)
+
+
+async def call_next(request: Request) -> Response:
+    return Response(status_code=200)
+
+
+async def worker(requests_count: int, client_number: int, samples: list[float]):
+    for _ in range(requests_count):
+        request = make_request(client_number)
+        start = time.perf_counter()
+        await check_request_limit(request, call_next)
+        samples.append(time.perf_counter() - start)
+
+
+async def main(requests_count: int, concurrency: int) -> None:
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    rate_limiter.limiter = rate_limiter.RateLimiter(
+        redis, capacity=settings.request_limit, period=settings.request_limit_period
+    )
+    samples: list[float] = []
+    per_worker = requests_count // concurrency
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(worker(per_worker, number, samples) for number in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        await redis.aclose()
+
+    print_latency_report("check_request_limit", samples)
+    print(f"  throughput={len(samples) / elapsed:.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
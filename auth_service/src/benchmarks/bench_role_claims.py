@@ -0,0 +1,66 @@
+"""
+Размер access-токена, скорость выпуска и проверки, а также проверки роли
+для двух форматов ролей: списка названий и битовой маски ("rm").
+
+Справочник ролей заполняется в памяти, роли пользователя берутся из его
+конца, чтобы проверка "admin" в списке названий шла по всему списку.
+
+Запуск из auth_service/src (внешние сервисы не нужны):
+    python -m benchmarks.bench_role_claims --tokens 5000 --roles 1 5 20 50
+"""
+
+import argparse
+
+from api.auth_utils import decode_token, has_role
+from benchmarks.bench_jwt import SECRET, throughput
+from core import jwt_keys
+from core.config import settings
+from services import role_catalog
+from services.auth import role_claims
+
+CATALOG_SIZE = 64
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def report(name: str, token: str, issue: float, verify: float, check: float):
+    print(
+        f"{name:<22} token={len(token):>5}B issue={issue:>9.0f}/s "
+        f"decode={verify:>9.0f}/s has_role={check:>10.0f}/s"
+    )
+
+
+def run(roles: list[str], tokens: int) -> None:
+    def issue() -> str:
+        # Тело AuthService.generate_access_token без асинхронной обертки
+        payload = {"user_id": USER_ID, "iat": 0, "exp": 2**31, **role_claims(roles)}
+        return jwt_keys.get_keyring().encode(payload)
+
+    for name, role_mask in (("titles", False), ("bitmask", True)):
+        settings.access_token_role_mask = role_mask
+        token = issue()
+        payload = decode_token(token)
+        report(
+            f"{len(roles):>2} roles, {name}",
+            token,
+            throughput(issue, tokens),
+            throughput(lambda: decode_token(token), tokens),
+            throughput(lambda: has_role(payload, "admin"), tokens * 10),
+        )
+
+
+def main(tokens: int, role_counts: list[int]) -> None:
+    jwt_keys.keyring = jwt_keys.KeyRing([], SECRET)
+    titles = [f"role_{i:02d}" for i in range(CATALOG_SIZE - 1)] + ["admin"]
+    role_catalog.catalog = role_catalog.RoleCatalog(None)
+    role_catalog.catalog.set_bits({title: bit for bit, title in enumerate(titles)})
+
+    for count in role_counts:
+        run(titles[-count:], tokens)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--roles", type=int, nargs="+", default=[1, 5, 20, 50])
+    args = parser.parse_args()
+    main(args.tokens, args.roles)
@@ -0,0 +1,103 @@
+"""
+Задержка, которую добавляет проверка токена через nginx auth_request.
+
+Запросы к одному и тому же адресу за nginx идут тремя сериями: без
+auth_request (--baseline-url, например порт бэкенда напрямую), с одним
+токеном на все запросы (ответ проверки берется из микрокэша nginx) и с
+новым токеном на каждый запрос (каждый раз подзапрос в auth_service).
+Токены подписываются ключами из настроек, поэтому скрипт запускается с
+тем же .env, что и auth_service.
+
+Запуск из auth_service/src (нужен поднятый docker-compose):
+    python -m benchmarks.bench_verify --url http://localhost/movies/api/v1/genres/ \\
+        --baseline-url http://localhost:8000/movies/api/v1/genres/
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from httpx import AsyncClient
+
+from benchmarks.utils import percentile, print_latency_report
+from core.jwt_keys import get_keyring
+
+
+def make_token() -> str:
+    valid_till = datetime.now() + timedelta(hours=1)
+    return get_keyring().encode(
+        {
+            "user_id": str(uuid.uuid4()),
+            "exp": int(valid_till.timestamp()),
+            "roles": ["subscriber"],
+        }
+    )
+
+
+async def run(
+    client: AsyncClient, url: str, tokens: list[str | None], concurrency: int
+) -> list[float]:
+    samples = []
+    queue = iter(tokens)
+
+    async def worker():
+        for token in queue:
+            headers = {"Authorization": f"Bearer {token}"} if token else {}
+            start = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def print_added(samples: list[float], baseline: list[float]) -> None:
+    to_ms = 1000
+    mean = statistics.fmean(samples) - statistics.fmean(baseline)
+    p50 = percentile(samples, 50) - percentile(baseline, 50)
+    p99 = percentile(samples, 99) - percentile(baseline, 99)
+    print(
+        f"  added vs baseline: mean={mean * to_ms:.3f}ms "
+        f"p50={p50 * to_ms:.3f}ms p99={p99 * to_ms:.3f}ms"
+    )
+
+
+async def main(
+    url: str, baseline_url: str | None, requests: int, concurrency: int
+) -> None:
+    shared_token = make_token()
+    series = {
+        "auth_request, cached token": [shared_token] * requests,
+        "auth_request, new token": [make_token() for _ in range(requests)],
+    }
+
+    async with AsyncClient(timeout=10) as client:
+        # Прогрев соединений и микрокэша
+        await run(client, url, [shared_token] * concurrency, concurrency)
+
+        baseline = None
+        if baseline_url:
+            baseline = await run(
+                client, baseline_url, [shared_token] * requests, concurrency
+            )
+            print_latency_report("baseline (no auth_request)", baseline)
+
+        for title, tokens in series.items():
+            samples = await run(client, url, tokens, concurrency)
+            print_latency_report(title, samples)
+            if baseline:
+                print_added(samples, baseline)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--baseline-url")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.baseline_url, args.requests, args.concurrency))
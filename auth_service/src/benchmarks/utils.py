@@ -0,0 +1,20 @@
+import statistics
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def print_latency_report(title: str, samples: list[float]) -> None:
+    """Печатает сводку по задержкам, samples в секундах"""
+    to_ms = 1000
+    print(f"{title}: {len(samples)} samples")
+    print(
+        f"  mean={statistics.fmean(samples) * to_ms:.3f}ms "
+        f"p50={percentile(samples, 50) * to_ms:.3f}ms "
+        f"p95={percentile(samples, 95) * to_ms:.3f}ms "
+        f"p99={percentile(samples, 99) * to_ms:.3f}ms "
+        f"max={max(samples) * to_ms:.3f}ms"
+    )
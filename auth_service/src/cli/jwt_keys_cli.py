@@ -0,0 +1,63 @@
+import os
+import sys
+from pathlib import Path
+
+import typer
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+sys.path.append("..")
+
+from core.config import settings
+from core.jwt_keys import KeyRing
+
+app = typer.Typer()
+
+KEY_FACTORIES = {
+    "EdDSA": ed25519.Ed25519PrivateKey.generate,
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "RS256": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+}
+
+
+@app.command()
+def generate(
+    kid: str,
+    algorithm: str = "EdDSA",
+    keys_dir: str = settings.jwt_keys_dir,
+):
+    if algorithm not in KEY_FACTORIES:
+        raise typer.BadParameter(f"choose one of {', '.join(KEY_FACTORIES)}")
+    if not keys_dir:
+        raise typer.BadParameter("set --keys-dir or JWT_KEYS_DIR")
+
+    path = Path(keys_dir) / f"{kid}.pem"
+    if path.exists():
+        raise typer.BadParameter(f"{path} already exists")
+
+    pem = KEY_FACTORIES[algorithm]().private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Приватный ключ читает только владелец
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(pem)
+    typer.echo(f"Created {path}")
+
+
+@app.command(name="list")
+def list_command():
+    keyring = KeyRing.from_settings()
+    if keyring.active is None:
+        typer.echo(f"No keys, tokens are signed with {keyring.algorithm}")
+        return
+    for key in keyring.keys:
+        active = " (active)" if key is keyring.active else ""
+        typer.echo(f"{key.kid}: {key.algorithm}{active}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+
+import typer
+
+sys.path.append("..")
+
+from core.config import settings
+from db import postgres
+from db.partitions import list_partitions, maintain_partitions
+
+app = typer.Typer()
+
+
+async def run_sync(func, *args, **kwargs):
+    engine = postgres.create_engine()
+    try:
+        async with engine.begin() as conn:
+            return await conn.run_sync(func, *args, **kwargs)
+    finally:
+        await engine.dispose()
+
+
+@app.command()
+def maintain(
+    months_ahead: int = settings.login_history_months_ahead,
+    retention_months: int = settings.login_history_retention_months,
+    drop: bool = settings.login_history_drop_detached,
+):
+    result = asyncio.run(
+        run_sync(
+            maintain_partitions,
+            months_ahead=months_ahead,
+            retention_months=retention_months,
+            drop_detached=drop,
+        )
+    )
+    typer.echo(f"Created: {', '.join(result['created']) or '-'}")
+    typer.echo(f"Detached: {', '.join(result['detached']) or '-'}")
+
+
+@app.command(name="list")
+def list_command():
+    for partition in asyncio.run(run_sync(list_partitions)):
+        bounds = (
+            "DEFAULT"
+            if partition.is_default
+            else f"{partition.start} .. {partition.end}"
+        )
+        typer.echo(f"{partition.name}: {bounds}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,46 @@
+import asyncio
+import sys
+
+import typer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+sys.path.append("..")
+
+from core.config import settings
+from db import postgres
+from services.refresh_token_sweeper import RefreshTokenSweeper
+
+app = typer.Typer()
+
+
+@app.callback()
+def main():
+    """Обслуживание таблицы refresh_tokens"""
+
+
+async def run_sweep(batch_size: int, max_batches: int) -> int:
+    engine = postgres.create_engine()
+    try:
+        sweeper = RefreshTokenSweeper(
+            async_sessionmaker(
+                bind=engine, expire_on_commit=False, class_=AsyncSession
+            ),
+            batch_size=batch_size,
+            max_batches=max_batches,
+        )
+        return await sweeper.sweep()
+    finally:
+        await engine.dispose()
+
+
+@app.command()
+def purge(
+    batch_size: int = settings.refresh_token_sweep_batch_size,
+    max_batches: int = settings.refresh_token_sweep_max_batches,
+):
+    deleted = asyncio.run(run_sweep(batch_size, max_batches))
+    typer.echo(f"Purged expired refresh tokens: {deleted}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+
+import typer
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+sys.path.append("..")
+
+from core.config import settings
+from db import postgres
+from models import User
+from services.taken_identifiers import TakenIdentifiers
+
+app = typer.Typer()
+
+
+@app.callback()
+def main():
+    """Фильтр занятых логинов и email для регистрации"""
+
+
+async def run_seed(capacity: int, error_rate: float) -> int:
+    engine = postgres.create_engine()
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    taken = TakenIdentifiers(redis, capacity=capacity, error_rate=error_rate)
+
+    async def identifiers():
+        async with engine.connect() as connection:
+            rows = await connection.stream(
+                select(User.login, User.email).execution_options(yield_per=10_000)
+            )
+            async for login, email in rows:
+                yield login, email
+
+    try:
+        return await taken.seed(identifiers())
+    finally:
+        await redis.aclose()
+        await engine.dispose()
+
+
+@app.command()
+def seed(
+    capacity: int = settings.signup_filter_capacity,
+    error_rate: float = settings.signup_filter_error_rate,
+):
+    """Заполняет фильтр всеми пользователями, регистрации при этом не теряются"""
+    count = asyncio.run(run_seed(capacity, error_rate))
+    typer.echo(f"Users added to the filter: {count}")
+
+
+if __name__ == "__main__":
+    app()
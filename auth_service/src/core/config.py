@@ -2,6 +2,10 @@ from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 JWT_ALGORITHM = "HS256"
+# Битовая маска ролей в access-токене, см. ACCESS_TOKEN_ROLE_MASK
+ROLE_MASK_CLAIM = "rm"
+# Время выпуска access-токена в миллисекундах, сравнивается с отметкой отзыва
+ISSUED_AT_MS_CLAIM = "iat_ms"
 
 
 class Settings(BaseSettings):
@@ -24,9 +28,71 @@ class Settings(BaseSettings):
     redis_port: int = Field(6379, alias="REDIS_PORT")
 
     jwt_secret_key: str = Field("my_secret_key", alias="JWT_SECRET_KEY")
+    jwt_keys_dir: str = Field("", alias="JWT_KEYS_DIR")
+    jwt_active_kid: str = Field("", alias="JWT_ACTIVE_KID")
+    jwt_accept_legacy_hs256: bool = Field(True, alias="JWT_ACCEPT_LEGACY_HS256")
+    jwks_max_age: int = Field(300, alias="JWKS_MAX_AGE")
+    introspect_max_tokens: int = Field(100, alias="INTROSPECT_MAX_TOKENS")
+    introspect_max_age: int = Field(60, alias="INTROSPECT_MAX_AGE")
     access_token_exp_hours: int = Field(1, alias="ACCESS_TOKEN_EXP_HOURS")
+    access_token_role_mask: bool = Field(False, alias="ACCESS_TOKEN_ROLE_MASK")
     refresh_token_exp_days: int = Field(10, alias="REFRESH_TOKEN_EXP_DAYS")
+    max_sessions_per_user: int = Field(10, alias="MAX_SESSIONS_PER_USER")
+    refresh_token_sweep_interval_sec: int = Field(
+        600, alias="REFRESH_TOKEN_SWEEP_INTERVAL_SEC"
+    )
+    refresh_token_sweep_batch_size: int = Field(
+        1000, alias="REFRESH_TOKEN_SWEEP_BATCH_SIZE"
+    )
+    refresh_token_sweep_max_batches: int = Field(
+        100, alias="REFRESH_TOKEN_SWEEP_MAX_BATCHES"
+    )
+    access_token_denylist_capacity: int = Field(
+        100_000, alias="ACCESS_TOKEN_DENYLIST_CAPACITY"
+    )
+    access_token_denylist_error_rate: float = Field(
+        0.001, alias="ACCESS_TOKEN_DENYLIST_ERROR_RATE"
+    )
+    access_token_denylist_rebuild_sec: int = Field(
+        600, alias="ACCESS_TOKEN_DENYLIST_REBUILD_SEC"
+    )
+    signup_filter_capacity: int = Field(1_000_000, alias="SIGNUP_FILTER_CAPACITY")
+    signup_filter_error_rate: float = Field(0.001, alias="SIGNUP_FILTER_ERROR_RATE")
+    token_watermarks_reload_sec: int = Field(600, alias="TOKEN_WATERMARKS_RELOAD_SEC")
+    password_hash_workers: int = Field(2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_concurrency: int = Field(
+        4, alias="PASSWORD_HASH_MAX_CONCURRENCY"
+    )
+    password_hash_queue_timeout: float = Field(
+        5.0, alias="PASSWORD_HASH_QUEUE_TIMEOUT"
+    )
+    login_history_queue_size: int = Field(10_000, alias="LOGIN_HISTORY_QUEUE_SIZE")
+    login_history_batch_size: int = Field(500, alias="LOGIN_HISTORY_BATCH_SIZE")
+    login_history_flush_ms: int = Field(200, alias="LOGIN_HISTORY_FLUSH_MS")
+    login_history_months_ahead: int = Field(3, alias="LOGIN_HISTORY_MONTHS_AHEAD")
+    login_history_retention_months: int = Field(
+        0, alias="LOGIN_HISTORY_RETENTION_MONTHS"
+    )
+    login_history_drop_detached: bool = Field(
+        False, alias="LOGIN_HISTORY_DROP_DETACHED"
+    )
+    login_history_partitions_on_startup: bool = Field(
+        True, alias="LOGIN_HISTORY_PARTITIONS_ON_STARTUP"
+    )
+    role_catalog_reload_sec: int = Field(300, alias="ROLE_CATALOG_RELOAD_SEC")
+    user_roles_cache_ttl: int = Field(300, alias="USER_ROLES_CACHE_TTL")
+    user_roles_cache_l1_size: int = Field(10_000, alias="USER_ROLES_CACHE_L1_SIZE")
+    login_cache_ttl: int = Field(300, alias="LOGIN_CACHE_TTL")
+    login_cache_negative_ttl: int = Field(30, alias="LOGIN_CACHE_NEGATIVE_TTL")
+    login_max_failures: int = Field(10, alias="LOGIN_MAX_FAILURES")
+    login_failures_window_sec: int = Field(900, alias="LOGIN_FAILURES_WINDOW_SEC")
     engine_echo: bool = Field(False, alias="ENGINE_ECHO")
+    db_pool_size: int = Field(10, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(10.0, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(1800, alias="DB_POOL_RECYCLE")
+    db_pool_pre_ping: bool = Field(True, alias="DB_POOL_PRE_PING")
+    db_statement_cache_size: int = Field(100, alias="DB_STATEMENT_CACHE_SIZE")
 
     jaeger_host: str = Field("127.0.0.1", alias="JAEGER_HOST")
     jaeger_port: int = Field(6831, alias="JAEGER_PORT")
@@ -34,6 +100,7 @@ class Settings(BaseSettings):
     jaeger_enabled: bool = Field(False, alias="JAEGER_ENABLED")
 
     request_limit: int = Field(15, alias="REQUEST_LIMIT")
+    request_limit_period: int = Field(60, alias="REQUEST_LIMIT_PERIOD")
     request_limit_enabled: bool = Field(False, alias="REQUEST_LIMIT_ENABLED")
 
     google_client_id: str = Field("google_client_id", alias="GOOGLE_CLIENT_ID")
@@ -44,6 +111,20 @@ class Settings(BaseSettings):
     google_token_url: str = Field("google_token_url", alias="GOOGLE_TOKEN_URL")
     google_userinfo_url: str = Field("google_userinfo_url", alias="GOOGLE_USERINFO_URL")
     google_redirect_url: str = Field("google_redirect_url", alias="GOOGLE_REDIRECT_URL")
+    google_discovery_url: str = Field(
+        "https://accounts.google.com/.well-known/openid-configuration",
+        alias="GOOGLE_DISCOVERY_URL",
+    )
+    oauth_verify_id_token: bool = Field(True, alias="OAUTH_VERIFY_ID_TOKEN")
+    oauth_keys_refresh_sec: int = Field(3600, alias="OAUTH_KEYS_REFRESH_SEC")
+    oauth_http_timeout: float = Field(5.0, alias="OAUTH_HTTP_TIMEOUT")
+    oauth_http_connect_timeout: float = Field(2.0, alias="OAUTH_HTTP_CONNECT_TIMEOUT")
+    oauth_http_retries: int = Field(2, alias="OAUTH_HTTP_RETRIES")
+    oauth_http_retry_backoff: float = Field(0.2, alias="OAUTH_HTTP_RETRY_BACKOFF")
+    oauth_http_max_connections: int = Field(100, alias="OAUTH_HTTP_MAX_CONNECTIONS")
+    oauth_http_max_keepalive: int = Field(20, alias="OAUTH_HTTP_MAX_KEEPALIVE")
+    oauth_fake_provider: bool = Field(False, alias="OAUTH_FAKE_PROVIDER")
+    oauth_fake_latency_ms: int = Field(50, alias="OAUTH_FAKE_LATENCY_MS")
 
 
 settings = Settings()
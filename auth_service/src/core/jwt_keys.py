@@ -0,0 +1,143 @@
+"""
+Ключи подписи JWT.
+
+По умолчанию токены подписываются HS256 общим секретом JWT_SECRET_KEY.
+Если в JWT_KEYS_DIR лежат приватные ключи <kid>.pem (RSA, Ed25519 или
+EC P-256), токены подписываются ключом JWT_ACTIVE_KID (или последним по
+имени файла) с заголовком kid, а публичные части всех ключей отдаются в
+/.well-known/jwks.json. Так другие сервисы проверяют токены без секрета и
+без обращения к auth_service на каждый запрос.
+
+Смена ключа: новый файл кладётся рядом со старым при прежнем JWT_ACTIVE_KID,
+после истечения кэша JWKS у потребителей JWT_ACTIVE_KID переключается на
+новый ключ, а старый удаляется не раньше, чем истекут выданные им токены.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+
+from core.config import JWT_ALGORITHM, settings
+
+JWK_EXPORTERS = {"RS256": RSAAlgorithm, "EdDSA": OKPAlgorithm, "ES256": ECAlgorithm}
+
+
+def algorithm_for_key(private_key: Any) -> str:
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return "RS256"
+    if isinstance(private_key, ed25519.Ed25519PrivateKey):
+        return "EdDSA"
+    if isinstance(private_key, ec.EllipticCurvePrivateKey) and isinstance(
+        private_key.curve, ec.SECP256R1
+    ):
+        return "ES256"
+    raise ValueError(f"unsupported JWT signing key type: {type(private_key).__name__}")
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    private_key: Any
+
+    @property
+    def public_key(self) -> Any:
+        return self.private_key.public_key()
+
+    def to_jwk(self) -> dict[str, Any]:
+        jwk = JWK_EXPORTERS[self.algorithm].to_jwk(self.public_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+    @classmethod
+    def from_pem(cls, kid: str, pem: bytes) -> "SigningKey":
+        private_key = load_pem_private_key(pem, password=None)
+        return cls(kid, algorithm_for_key(private_key), private_key)
+
+
+class KeyRing:
+    """
+    Набор ключей процесса. Ключи разбираются один раз при создании, на
+    каждый токен используются готовые объекты cryptography
+    """
+
+    def __init__(
+        self,
+        keys: list[SigningKey],
+        secret: str,
+        active_kid: str | None = None,
+        accept_legacy: bool = True,
+    ):
+        self.secret = secret
+        self.accept_legacy = accept_legacy
+        self._by_kid = {key.kid: key for key in keys}
+        self._public_keys = {key.kid: key.public_key for key in keys}
+        self.active: SigningKey | None = None
+        if keys:
+            self.active = self._by_kid[active_kid] if active_kid else keys[-1]
+
+        self.jwks_body = json.dumps(
+            {"keys": [key.to_jwk() for key in keys]}, separators=(",", ":")
+        ).encode()
+        self.jwks_etag = f'"{hashlib.sha256(self.jwks_body).hexdigest()[:32]}"'
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        keys = []
+        if settings.jwt_keys_dir:
+            for path in sorted(Path(settings.jwt_keys_dir).glob("*.pem")):
+                keys.append(SigningKey.from_pem(path.stem, path.read_bytes()))
+        return cls(
+            keys,
+            settings.jwt_secret_key,
+            active_kid=settings.jwt_active_kid or None,
+            accept_legacy=settings.jwt_accept_legacy_hs256,
+        )
+
+    @property
+    def keys(self) -> list[SigningKey]:
+        return list(self._by_kid.values())
+
+    @property
+    def algorithm(self) -> str:
+        return self.active.algorithm if self.active else JWT_ALGORITHM
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        if self.active is None:
+            return jwt.encode(payload, self.secret, algorithm=JWT_ALGORITHM)
+        return jwt.encode(
+            payload,
+            self.active.private_key,
+            algorithm=self.active.algorithm,
+            headers={"kid": self.active.kid},
+        )
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """Проверяет подпись и срок токена, при ошибке бросает InvalidTokenError"""
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            # Токены, выданные до перехода на асимметричные ключи
+            if self.active is not None and not self.accept_legacy:
+                raise jwt.InvalidTokenError("token without kid")
+            return jwt.decode(token, self.secret, algorithms=[JWT_ALGORITHM])
+
+        key = self._by_kid.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"unknown kid {kid}")
+        return jwt.decode(token, self._public_keys[kid], algorithms=[key.algorithm])
+
+
+keyring: KeyRing | None = None
+
+
+def get_keyring() -> KeyRing:
+    global keyring
+    if keyring is None:
+        keyring = KeyRing.from_settings()
+    return keyring
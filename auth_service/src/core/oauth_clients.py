@@ -1,7 +1,150 @@
+import asyncio
+import hashlib
+import json
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import jwt
 from authlib.integrations.httpx_client import AsyncOAuth2Client
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from core.config import settings
 
 google_client: AsyncOAuth2Client | None = None
 
 
 async def get_google_client() -> AsyncOAuth2Client:
     return google_client
+
+
+class FakeGoogleTransport(httpx.AsyncBaseTransport):
+    """
+    Google без сети для нагрузочных тестов OAuth: выдает токен и id_token
+    по любому коду, профиль однозначно выводится из кода. Отдает и
+    discovery-документ с JWKS, так что id_token проверяется как настоящий.
+    Задержка ответа имитирует время ответа провайдера
+    """
+
+    issuer = "https://accounts.google.com"
+    jwks_path = "/oauth2/v3/certs"
+
+    def __init__(self, latency: float = 0.05, client_id: str = ""):
+        self.latency = latency
+        self.client_id = client_id
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._jwk = {
+            **RSAAlgorithm.to_jwk(self._key.public_key(), as_dict=True),
+            "kid": "fake",
+            "alg": "RS256",
+            "use": "sig",
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        if request.method == "POST":
+            code = parse_qs((await request.aread()).decode()).get("code", [""])[0]
+            return self._json(
+                {
+                    "access_token": code,
+                    "token_type": "Bearer",
+                    "expires_in": 3600,
+                    "id_token": self._id_token(code),
+                }
+            )
+
+        path = request.url.path
+        if path.endswith("/openid-configuration"):
+            return self._json(
+                {
+                    "issuer": self.issuer,
+                    "jwks_uri": str(request.url.copy_with(path=self.jwks_path)),
+                }
+            )
+        if path == self.jwks_path:
+            return self._json({"keys": [self._jwk]})
+
+        code = request.headers.get("authorization", "").removeprefix("Bearer ")
+        profile = self._profile(code)
+        return self._json({**profile, "id": profile["sub"]})
+
+    @staticmethod
+    def _profile(code: str) -> dict:
+        user_id = hashlib.sha256(code.encode()).hexdigest()[:21]
+        return {
+            "sub": user_id,
+            "email": f"{user_id}@fake.example.com",
+            "given_name": "Fake",
+            "family_name": "User",
+        }
+
+    def _id_token(self, code: str) -> str:
+        now = int(time.time())
+        claims = {
+            **self._profile(code),
+            "iss": self.issuer,
+            "aud": self.client_id,
+            "iat": now,
+            "exp": now + 3600,
+        }
+        return jwt.encode(claims, self._key, algorithm="RS256", headers={"kid": "fake"})
+
+    @staticmethod
+    def _json(data: dict) -> httpx.Response:
+        return httpx.Response(
+            200,
+            content=json.dumps(data).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+
+
+def create_google_client() -> AsyncOAuth2Client:
+    """
+    Один клиент на процесс: соединения с провайдером переиспользуются,
+    на каждый запрос жесткие таймауты. Транспорт повторяет только неудачные
+    подключения, поэтому обмен кода на токен не отправляется дважды
+    """
+    if settings.oauth_fake_provider:
+        transport = FakeGoogleTransport(
+            settings.oauth_fake_latency_ms / 1000, settings.google_client_id
+        )
+    else:
+        transport = httpx.AsyncHTTPTransport(
+            retries=settings.oauth_http_retries,
+            limits=httpx.Limits(
+                max_connections=settings.oauth_http_max_connections,
+                max_keepalive_connections=settings.oauth_http_max_keepalive,
+            ),
+        )
+    return AsyncOAuth2Client(
+        client_id=settings.google_client_id,
+        client_secret=settings.google_client_secret,
+        redirect_uri=settings.google_redirect_url,
+        scope="openid email profile",
+        timeout=httpx.Timeout(
+            settings.oauth_http_timeout, connect=settings.oauth_http_connect_timeout
+        ),
+        transport=transport,
+    )
+
+
+async def get_with_retries(
+    client: httpx.AsyncClient, url: str, **kwargs
+) -> httpx.Response:
+    """
+    GET с повторами при сетевых ошибках и ответах 5xx. Подходит только для
+    идемпотентных запросов вроде чтения профиля пользователя
+    """
+    attempts = settings.oauth_http_retries + 1
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = await client.request("GET", url, **kwargs)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+        else:
+            if response.status_code < 500 or last_attempt:
+                return response
+        await asyncio.sleep(settings.oauth_http_retry_backoff * 2**attempt)
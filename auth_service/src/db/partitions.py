@@ -0,0 +1,179 @@
+"""
+Обслуживание помесячных партиций login_history.
+
+Функции работают с синхронным соединением, чтобы их можно было вызывать
+из миграций, из after_create модели и из асинхронного кода через run_sync.
+Индексы (BRIN по event_date и btree по user_id, event_date) объявлены на
+родительской таблице, поэтому Postgres сам создаёт их в каждой партиции.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "login_history"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+# Ключ advisory-блокировки, чтобы несколько воркеров не обслуживали партиции разом
+MAINTENANCE_LOCK_ID = 0x6C68_7061
+
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    start: date | None = None
+    end: date | None = None
+
+    @property
+    def is_default(self) -> bool:
+        return self.start is None
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def list_partitions(connection: Connection) -> list[Partition]:
+    rows = connection.execute(
+        text(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:parent AS regclass)
+            ORDER BY c.relname
+            """
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_RE.search(bound)
+        if match is None:
+            partitions.append(Partition(name))
+            continue
+        start, end = (datetime.fromisoformat(x).date() for x in match.groups())
+        partitions.append(Partition(name, start, end))
+    return partitions
+
+
+def create_default_partition(connection: Connection) -> None:
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} "
+            f"PARTITION OF {PARENT_TABLE} DEFAULT"
+        )
+    )
+
+
+def create_month_partition(connection: Connection, month: date) -> str:
+    """
+    Создаёт партицию на месяц. Строки этого месяца, успевшие попасть в
+    партицию по умолчанию, переносятся в новую партицию перед её подключением
+    """
+    name = partition_name(month)
+    params = {"start": month, "end": add_months(month, 1)}
+    connection.execute(
+        text(
+            f"CREATE TABLE {name} "
+            f"(LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    if connection.scalar(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}
+    ):
+        connection.execute(
+            text(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE event_date >= :start AND event_date < :end
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """
+            ),
+            params,
+        )
+    # DDL не принимает параметры, границы подставляются как литералы дат
+    connection.execute(
+        text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{params['start']}') TO ('{params['end']}')"
+        )
+    )
+    return name
+
+
+def maintain_partitions(
+    connection: Connection,
+    months_ahead: int = 3,
+    retention_months: int = 0,
+    drop_detached: bool = False,
+    today: date | None = None,
+) -> dict[str, list[str]]:
+    """
+    Создаёт партиции с текущего месяца на months_ahead месяцев вперёд и
+    партицию по умолчанию. Если задан retention_months, отключает партиции,
+    которые целиком старше этого срока, а при drop_detached удаляет их
+    """
+    created, detached = [], []
+    # Таблицы ещё нет, если сервис стартовал раньше миграций
+    if not connection.scalar(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {"name": PARENT_TABLE}
+    ):
+        return {"created": created, "detached": detached}
+
+    connection.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_id)"),
+        {"lock_id": MAINTENANCE_LOCK_ID},
+    )
+    current_month = month_start(today or date.today())
+    partitions = list_partitions(connection)
+    ranges = [(x.start, x.end) for x in partitions if not x.is_default]
+
+    if not any(x.is_default for x in partitions):
+        create_default_partition(connection)
+        created.append(DEFAULT_PARTITION)
+
+    for offset in range(months_ahead + 1):
+        month = add_months(current_month, offset)
+        month_end = add_months(month, 1)
+        # Старые партиции могут называться иначе, поэтому смотрим на диапазоны
+        if any(start < month_end and month < end for start, end in ranges):
+            continue
+        created.append(create_month_partition(connection, month))
+
+    if retention_months > 0:
+        cutoff = add_months(current_month, -retention_months)
+        for partition in partitions:
+            if partition.is_default or partition.end > cutoff:
+                continue
+            connection.execute(
+                text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {partition.name}")
+            )
+            if drop_detached:
+                connection.execute(text(f"DROP TABLE {partition.name}"))
+            detached.append(partition.name)
+
+    if created or detached:
+        logger.info(
+            "login_history partitions: created %s, detached %s", created, detached
+        )
+    return {"created": created, "detached": detached}
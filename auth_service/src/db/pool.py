@@ -0,0 +1,53 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import registry
+
+pool_wait = registry.histogram(
+    "db_pool_wait_seconds", "Ожидание соединения из пула, включая его открытие"
+)
+pool_timeouts = registry.counter(
+    "db_pool_timeouts_total", "Запросы, не дождавшиеся соединения за pool_timeout"
+)
+connections_opened = registry.counter(
+    "db_pool_connections_opened_total", "Открытые пулом соединения с Postgres"
+)
+connections_invalidated = registry.counter(
+    "db_pool_connections_invalidated_total", "Соединения, закрытые из-за ошибок"
+)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет, сколько запрос ждал свободное соединение"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_wait.observe(time.perf_counter() - started)
+
+
+def instrument_pool(engine: AsyncEngine) -> None:
+    pool = engine.sync_engine.pool
+    registry.gauge(
+        "db_pool_checked_out", "Выданные соединения", callback=pool.checkedout
+    )
+    # overflow() отсчитывается от -pool_size, пока пул не заполнен
+    registry.gauge(
+        "db_pool_overflow",
+        "Соединения сверх pool_size",
+        callback=lambda: max(pool.overflow(), 0),
+    )
+    registry.gauge(
+        "db_pool_idle", "Свободные соединения в пуле", callback=pool.checkedin
+    )
+    event.listen(pool, "connect", lambda *args: connections_opened.inc())
+    event.listen(pool, "invalidate", lambda *args: connections_invalidated.inc())
@@ -1,9 +1,13 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_sessionmaker, create_async_engine)
 from sqlalchemy.orm import declarative_base
 
 from core.config import settings
+from db.pool import InstrumentedAsyncPool, instrument_pool
+from db.unit_of_work import UnitOfWork
 
 Base = declarative_base()
 
@@ -13,5 +17,33 @@ async_session: Optional[AsyncSession] = None
 dsn = settings.postgres_url
 
 
-async def get_postgres_session() -> AsyncSession:
+def create_engine() -> AsyncEngine:
+    """Движок с настройками пула из Settings и метриками пула"""
+    engine = create_async_engine(
+        dsn,
+        echo=settings.engine_echo,
+        future=True,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": settings.db_statement_cache_size
+        },
+    )
+    instrument_pool(engine)
+    return engine
+
+
+async def get_session_maker() -> async_sessionmaker:
     return async_session
+
+
+async def get_postgres_session(
+    session_maker: async_sessionmaker = Depends(get_session_maker),
+) -> AsyncIterator[UnitOfWork]:
+    """Общая для всех сервисов сессия запроса с одним коммитом в конце"""
+    async with UnitOfWork(session_maker) as unit_of_work:
+        yield unit_of_work
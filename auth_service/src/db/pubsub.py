@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[str], Awaitable[None]]
+ReconnectHook = Callable[[], Awaitable[None]]
+
+
+class PubSubListener:
+    """
+    Одно pub/sub соединение на процесс для всех локальных кэшей.
+
+    Пока соединения нет, сообщения могут теряться, поэтому кэши проверяют
+    connected и после каждого (пере)подключения перестраиваются через хуки.
+    """
+
+    def __init__(self, redis: Redis, reconnect_delay: float = 1.0):
+        self.redis = redis
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self._handlers: dict[str, MessageHandler] = {}
+        self._hooks: list[ReconnectHook] = []
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: MessageHandler,
+        on_reconnect: ReconnectHook | None = None,
+    ) -> None:
+        self._handlers[channel] = handler
+        if on_reconnect:
+            self._hooks.append(on_reconnect)
+
+    async def start(self, timeout: float = 5.0) -> None:
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("pub/sub is not ready, local caches fall back to Redis")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.connected = False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(*self._handlers)
+                    for hook in self._hooks:
+                        await hook()
+                    self.connected = True
+                    self._ready.set()
+                    async for message in pubsub.listen():
+                        await self._dispatch(message)
+            except (RedisError, OSError) as exc:
+                logger.warning("pub/sub connection lost: %s", exc)
+            except Exception:
+                logger.exception("pub/sub listener failed")
+            self.connected = False
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _dispatch(self, message: dict) -> None:
+        channel = message["channel"].decode()
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
+        try:
+            await handler(message["data"].decode())
+        except Exception:
+            logger.exception("pub/sub handler for %s failed", channel)
+
+
+listener: PubSubListener | None = None
+
+
+async def get_pubsub_listener() -> PubSubListener | None:
+    return listener
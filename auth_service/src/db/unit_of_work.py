@@ -0,0 +1,91 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+AfterCommitHook = Callable[[], Awaitable[None]]
+
+
+class UnitOfWork:
+    """
+    Одна сессия и одно соединение на запрос.
+
+    Вызывается так же, как async_sessionmaker, поэтому сервисы открывают
+    сессию привычным async with self.postgres_session() as session, но все
+    получают одну и ту же сессию. Сервисы делают только flush, коммит
+    выполняется один раз при выходе из UnitOfWork. Вне запроса (CLI,
+    скрипты) его открывают как async with UnitOfWork(sessionmaker) as uow.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+        self._session: AsyncSession | None = None
+        self._after_commit: list[AfterCommitHook] = []
+
+    def __call__(self):
+        return self._shared_session()
+
+    @asynccontextmanager
+    async def _shared_session(self) -> AsyncIterator[AsyncSession]:
+        if self._session is None:
+            self._session = self.session_factory()
+        yield self._session
+
+    def after_commit(self, hook: AfterCommitHook) -> None:
+        """Действие, которое выполняется только после успешного коммита"""
+        self._after_commit.append(hook)
+
+    async def commit(self) -> None:
+        if self._session is not None:
+            await self._session.commit()
+        hooks, self._after_commit = self._after_commit, []
+        for hook in hooks:
+            # Данные уже записаны, ошибка хука не должна превращаться в 500
+            try:
+                await hook()
+            except Exception:
+                logger.exception("after commit hook failed")
+
+    async def rollback(self) -> None:
+        self._after_commit.clear()
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            await self.close()
+
+
+async def run_after_commit(postgres_session, hook: AfterCommitHook) -> None:
+    """Внутри UnitOfWork откладывает hook до коммита, иначе выполняет сразу"""
+    if isinstance(postgres_session, UnitOfWork):
+        postgres_session.after_commit(hook)
+    else:
+        await hook()
+
+
+def short_session(postgres_session) -> AsyncSession:
+    """
+    Отдельная сессия мимо UnitOfWork для чтения перед долгой работой вроде
+    хэширования пароля: соединение возвращается в пул при выходе из async with,
+    а не держится до коммита запроса
+    """
+    if isinstance(postgres_session, UnitOfWork):
+        return postgres_session.session_factory()
+    return postgres_session()
@@ -1,43 +1,129 @@
 from contextlib import asynccontextmanager
 
 import uvicorn
-from authlib.integrations.httpx_client import AsyncOAuth2Client
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.responses import ORJSONResponse
 from fastapi_pagination import add_pagination
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from redis.asyncio import Redis
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
-                                    create_async_engine)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from starlette.middleware.sessions import SessionMiddleware
 
-from api.v1 import admins, auth, oauth2, roles, users
-from core import oauth_clients
+from api.v1 import admins, auth, jwks, metrics, oauth2, roles, users
+from core import jwt_keys, oauth_clients
 from core.config import settings
 from core.jaeger import configure_tracer
-from db import postgres, redis
+from db import partitions, postgres, pubsub, redis
 from middlewares.request_id_middleware import request_id_middleware
 from middlewares.request_limit_middleware import check_request_limit
+from services import (login_history_writer, login_lookup_cache, oidc_keys,
+                      password_hasher, rate_limiter, refresh_token_sweeper,
+                      role_catalog, taken_identifiers, token_denylist,
+                      token_watermarks, user_roles_cache)
+from services.exceptions import PasswordHashingTimeoutError
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
+        # Ошибки в файлах ключей всплывают при старте, а не на первом входе
+        jwt_keys.keyring = jwt_keys.KeyRing.from_settings()
         redis.redis = Redis(host=settings.redis_host, port=settings.redis_port)
-        postgres.engine = create_async_engine(
-            postgres.dsn, echo=settings.engine_echo, future=True
-        )
+        postgres.engine = postgres.create_engine()
         postgres.async_session = async_sessionmaker(
             bind=postgres.engine, expire_on_commit=False, class_=AsyncSession
         )
-        oauth_clients.google_client = AsyncOAuth2Client(
-            client_id=settings.google_client_id,
-            client_secret=settings.google_client_secret,
-            redirect_uri=settings.google_redirect_url,
-            scope="openid email profile",
+        if settings.login_history_partitions_on_startup:
+            async with postgres.engine.begin() as conn:
+                await conn.run_sync(
+                    partitions.maintain_partitions,
+                    months_ahead=settings.login_history_months_ahead,
+                    retention_months=settings.login_history_retention_months,
+                    drop_detached=settings.login_history_drop_detached,
+                )
+        oauth_clients.google_client = oauth_clients.create_google_client()
+        if settings.oauth_verify_id_token:
+            oidc_keys.google_keys = oidc_keys.OIDCKeySet(
+                oauth_clients.google_client,
+                settings.google_discovery_url,
+                refresh_interval=settings.oauth_keys_refresh_sec,
+            )
+            await oidc_keys.google_keys.start()
+        if settings.request_limit_enabled:
+            rate_limiter.limiter = rate_limiter.RateLimiter(
+                redis.redis,
+                capacity=settings.request_limit,
+                period=settings.request_limit_period,
+            )
+        password_hasher.password_hasher = password_hasher.PasswordHasher(
+            max_workers=settings.password_hash_workers,
+            max_concurrency=settings.password_hash_max_concurrency,
+            queue_timeout=settings.password_hash_queue_timeout,
+        )
+        login_history_writer.writer = login_history_writer.LoginHistoryWriter(
+            postgres.async_session,
+            max_queue_size=settings.login_history_queue_size,
+            batch_size=settings.login_history_batch_size,
+            flush_interval=settings.login_history_flush_ms / 1000,
+        )
+        await login_history_writer.writer.start()
+        refresh_token_sweeper.sweeper = refresh_token_sweeper.RefreshTokenSweeper(
+            postgres.async_session,
+            batch_size=settings.refresh_token_sweep_batch_size,
+            interval=settings.refresh_token_sweep_interval_sec,
+            max_batches=settings.refresh_token_sweep_max_batches,
+        )
+        await refresh_token_sweeper.sweeper.start()
+        pubsub.listener = pubsub.PubSubListener(redis.redis)
+        token_denylist.denylist = token_denylist.AccessTokenDenylist(
+            redis.redis,
+            listener=pubsub.listener,
+            capacity=settings.access_token_denylist_capacity,
+            error_rate=settings.access_token_denylist_error_rate,
+            rebuild_interval=settings.access_token_denylist_rebuild_sec,
+        )
+        taken_identifiers.taken = taken_identifiers.TakenIdentifiers(
+            redis.redis,
+            capacity=settings.signup_filter_capacity,
+            error_rate=settings.signup_filter_error_rate,
+        )
+        login_lookup_cache.login_cache = login_lookup_cache.LoginLookupCache(
+            redis.redis
+        )
+        token_watermarks.watermarks = token_watermarks.TokenWatermarks(
+            redis.redis,
+            listener=pubsub.listener,
+            reload_interval=settings.token_watermarks_reload_sec,
         )
+        role_catalog.catalog = role_catalog.RoleCatalog(
+            postgres.async_session,
+            redis.redis,
+            listener=pubsub.listener,
+            reload_interval=settings.role_catalog_reload_sec,
+        )
+        user_roles_cache.cache = user_roles_cache.UserRolesCache(
+            postgres.async_session,
+            redis.redis,
+            listener=pubsub.listener,
+            ttl=settings.user_roles_cache_ttl,
+            l1_size=settings.user_roles_cache_l1_size,
+        )
+        await pubsub.listener.start()
+        await token_denylist.denylist.start()
+        await token_watermarks.watermarks.start()
+        await role_catalog.catalog.start()
         yield
     finally:
+        if oidc_keys.google_keys is not None:
+            await oidc_keys.google_keys.stop()
+        await role_catalog.catalog.stop()
+        await token_denylist.denylist.stop()
+        await token_watermarks.watermarks.stop()
+        await pubsub.listener.stop()
+        await refresh_token_sweeper.sweeper.stop()
+        await login_history_writer.writer.stop()
+        password_hasher.password_hasher.shutdown()
         await redis.redis.aclose()
         await oauth_clients.google_client.aclose()
 
@@ -50,6 +136,29 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
 )
 
+
+@app.exception_handler(PasswordHashingTimeoutError)
+async def password_hashing_timeout_handler(
+    request: Request, exc: PasswordHashingTimeoutError
+) -> ORJSONResponse:
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "service is busy, try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+async def db_pool_timeout_handler(
+    request: Request, exc: PoolTimeoutError
+) -> ORJSONResponse:
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "service is busy, try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # для трассировки Jaeger
 if settings.jaeger_enabled:
     configure_tracer()
@@ -68,6 +177,9 @@ app.include_router(users.router, prefix="/auth/api/v1/users", tags=["users"])
 app.include_router(admins.router, prefix="/auth/api/v1/users", tags=["admins"])
 app.include_router(auth.router, prefix="/auth/api/v1/auth", tags=["auth"])
 app.include_router(oauth2.router, prefix="/auth/api/v1/oauth", tags=["oauth2"])
+app.include_router(jwks.router, prefix="/auth/.well-known", tags=["jwks"])
+# без префикса /auth/api/v1, чтобы nginx не отдавал метрики наружу
+app.include_router(metrics.router, prefix="/auth/metrics", tags=["metrics"])
 
 add_pagination(app)
 
@@ -1,40 +1,36 @@
-import datetime
-
-import redis
 from fastapi import Request, Response, status
 from fastapi.responses import ORJSONResponse
 
-from core.config import settings
+from services import rate_limiter
+
+# Проверка токена подзапросом nginx идет на каждый запрос к фильмам и не должна
+# тратить лимит клиента, рассчитанный на вход и остальные ручки
+EXEMPT_PATHS = frozenset({"/auth/api/v1/auth/verify"})
 
 
 async def check_request_limit(request: Request, call_next) -> Response:
     """Проверка на кол-во запросов в минуту"""
 
-    redis_conn = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
-    pipe = redis_conn.pipeline()
-
-    # Определяем текущее время
-    now = datetime.datetime.now()
+    limiter = rate_limiter.limiter
+    if limiter is None or request.url.path in EXEMPT_PATHS:
+        return await call_next(request)
 
     # Получаем User-Agent из заголовков запроса
     user_agent = request.headers.get("user-agent", "unknown")
 
     # Ip юзера
-    user_ip = request.headers.get("x-real-ip")
-
-    # Создаем ключ для лимита запросов
-    key = f"{user_ip}{user_agent}:{now.minute}"
+    user_ip = request.headers.get("x-real-ip") or (
+        request.client.host if request.client else "unknown"
+    )
 
-    # Используем pipeline для инкремента и установки TTL
-    pipe.incr(key, 1)
-    pipe.expire(key, 60 - now.second)
-    result_count_requests = pipe.execute()[0]
+    result = await limiter.hit(limiter.make_key(user_ip, user_agent))
 
     # Проверка на лимит запросов
-    if result_count_requests > settings.request_limit:
+    if not result.allowed:
         return ORJSONResponse(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             content={"message": "Уважаемый ревьюер остановись, отдохни!"},
+            headers={"Retry-After": str(result.retry_after)},
         )
 
     response = await call_next(request)
@@ -0,0 +1,64 @@
+"""refresh_token_hash
+
+Revision ID: 8d2f4c61a7b3
+Revises: 311d618b1b3d
+Create Date: 2026-10-18 10:12:31.504217
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d2f4c61a7b3"
+down_revision: Union[str, None] = "311d618b1b3d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "refresh_tokens",
+        sa.Column("token_hash", sa.String(length=64), nullable=True),
+    )
+    # Переносим уже выданные токены, чтобы не разлогинивать пользователей
+    op.execute(
+        "UPDATE refresh_tokens "
+        "SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')"
+    )
+    # Дубликаты могли появиться при выдаче двух токенов в одну секунду
+    op.execute(
+        """
+        DELETE FROM refresh_tokens a USING refresh_tokens b
+        WHERE a.token_hash = b.token_hash AND a.id < b.id
+        """
+    )
+    op.alter_column("refresh_tokens", "token_hash", nullable=False)
+    op.drop_column("refresh_tokens", "token")
+    op.create_index(
+        op.f("ix_refresh_tokens_token_hash"),
+        "refresh_tokens",
+        ["token_hash"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_refresh_tokens_user_id_expires_at",
+        "refresh_tokens",
+        ["user_id", "expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_tokens_user_id_expires_at", table_name="refresh_tokens")
+    op.drop_index(op.f("ix_refresh_tokens_token_hash"), table_name="refresh_tokens")
+    # Исходные токены из хэша не восстановить, поэтому все сессии сбрасываются
+    op.execute("DELETE FROM refresh_tokens")
+    op.add_column(
+        "refresh_tokens",
+        sa.Column("token", sa.String(length=255), nullable=False),
+    )
+    op.drop_column("refresh_tokens", "token_hash")
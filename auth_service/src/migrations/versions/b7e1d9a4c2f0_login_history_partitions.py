@@ -0,0 +1,59 @@
+"""login_history_partitions
+
+Revision ID: b7e1d9a4c2f0
+Revises: 8d2f4c61a7b3
+Create Date: 2026-10-18 12:41:09.318734
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+from db.partitions import DEFAULT_PARTITION, maintain_partitions
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e1d9a4c2f0"
+down_revision: Union[str, None] = "8d2f4c61a7b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Индексы на родительской таблице создаются во всех партициях
+    op.create_index(
+        "ix_login_history_event_date_brin",
+        "login_history",
+        ["event_date"],
+        postgresql_using="brin",
+    )
+    op.create_index(
+        "ix_login_history_user_id_event_date",
+        "login_history",
+        ["user_id", "event_date"],
+    )
+    maintain_partitions(op.get_bind())
+
+
+def downgrade() -> None:
+    # Строки из новых партиций и партиции по умолчанию удаляются вместе с ними
+    connection = op.get_bind()
+    partitions = connection.scalars(
+        sa.text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST('login_history' AS regclass)
+              AND c.relname LIKE 'login_history_y%'
+            """
+        )
+    ).all()
+    for name in partitions:
+        op.execute(f"DROP TABLE IF EXISTS {name}")
+    op.execute(f"DROP TABLE IF EXISTS {DEFAULT_PARTITION}")
+
+    op.drop_index("ix_login_history_user_id_event_date", table_name="login_history")
+    op.drop_index("ix_login_history_event_date_brin", table_name="login_history")
@@ -0,0 +1,32 @@
+"""refresh_tokens_expires_at
+
+Revision ID: c4a8e2f1d903
+Revises: b7e1d9a4c2f0
+Create Date: 2026-10-18 15:02:47.126583
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8e2f1d903"
+down_revision: Union[str, None] = "b7e1d9a4c2f0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_refresh_tokens_expires_at",
+        "refresh_tokens",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_tokens_expires_at", table_name="refresh_tokens")
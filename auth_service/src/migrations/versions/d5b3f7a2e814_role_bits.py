@@ -0,0 +1,45 @@
+"""role_bits
+
+Revision ID: d5b3f7a2e814
+Revises: c4a8e2f1d903
+Create Date: 2026-10-18 19:41:05.318274
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5b3f7a2e814"
+down_revision: Union[str, None] = "c4a8e2f1d903"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    role_bit_seq = sa.Sequence("roles_bit_seq", start=0, minvalue=0)
+    op.execute(sa.schema.CreateSequence(role_bit_seq))
+    op.add_column("roles", sa.Column("bit", sa.Integer(), nullable=True))
+    # Существующие роли получают биты по порядку названий
+    op.execute(
+        "UPDATE roles SET bit = ordered.bit FROM ("
+        "SELECT id, nextval('roles_bit_seq') AS bit FROM "
+        "(SELECT id FROM roles ORDER BY title) AS by_title"
+        ") AS ordered WHERE roles.id = ordered.id"
+    )
+    op.alter_column(
+        "roles",
+        "bit",
+        nullable=False,
+        server_default=sa.text("nextval('roles_bit_seq')"),
+    )
+    op.create_unique_constraint("roles_bit_key", "roles", ["bit"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("roles_bit_key", "roles", type_="unique")
+    op.drop_column("roles", "bit")
+    op.execute(sa.schema.DropSequence(sa.Sequence("roles_bit_seq")))
@@ -1,34 +1,31 @@
 import uuid
 
-from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Text,
-                        UniqueConstraint, func, text)
+from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Index, Text,
+                        UniqueConstraint, func)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
+from core.config import settings
+from db.partitions import maintain_partitions
 from db.postgres import Base
 
 
-def create_monthly_partitions(target, connection, **kw):
-    """Партицирование на 12 месяцев."""
-    for month in range(1, 13):
-        connection.execute(
-            text(
-                f"""
-            CREATE TABLE IF NOT EXISTS login_history_{month:02d} 
-            PARTITION OF login_history 
-            FOR VALUES FROM ('2024-{month:02d}-01') TO ('2024-{month+1 if month < 12 else 1:02d}-01');
-            """
-            )
-        )
+def create_partitions(target, connection, **kw):
+    """Партиция по умолчанию и помесячные партиции на ближайшие месяцы"""
+    maintain_partitions(connection, months_ahead=settings.login_history_months_ahead)
 
 
 class LoginHistory(Base):
     __tablename__ = "login_history"
     __table_args__ = (
         UniqueConstraint("id", "event_date"),
+        Index(
+            "ix_login_history_event_date_brin", "event_date", postgresql_using="brin"
+        ),
+        Index("ix_login_history_user_id_event_date", "user_id", "event_date"),
         {
             "postgresql_partition_by": "RANGE (event_date)",
-            "listeners": [("after_create", create_monthly_partitions)],
+            "listeners": [("after_create", create_partitions)],
         },
     )
 
@@ -36,11 +33,11 @@ class LoginHistory(Base):
         UUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
-        unique=True,
         nullable=False,
     )
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    event_date = Column(DateTime, default=func.now(), nullable=False)
+    # Ключ партиционирования входит в первичный ключ, как в миграции
+    event_date = Column(DateTime, default=func.now(), primary_key=True, nullable=False)
     success = Column(Boolean, nullable=False)  # True для успеха, False для неудачи
     user = relationship("User", back_populates="login_history")
     user_agent = Column(Text, nullable=False)
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -9,6 +9,12 @@ from db.postgres import Base
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # выборка и очистка токенов пользователя без полного сканирования
+        Index("ix_refresh_tokens_user_id_expires_at", "user_id", "expires_at"),
+        # пачки просроченных токенов для фоновой очистки
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
 
     id = Column(
         UUID(as_uuid=True),
@@ -18,10 +24,11 @@ class RefreshToken(Base):
         nullable=False,
     )
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    token = Column(String(255), nullable=False)
+    # sha256 от токена, сам токен в базе не храним
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
     created_at = Column(DateTime, default=func.now())
     expires_at = Column(DateTime, nullable=False)
     user = relationship("User", back_populates="refresh_tokens")
 
     def __repr__(self) -> str:
-        return f"<RefreshToken {self.token} for User {self.user_id}>"
+        return f"<RefreshToken {self.id} for User {self.user_id}>"
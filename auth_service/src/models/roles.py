@@ -1,10 +1,14 @@
 import uuid
 
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Integer, Sequence, String
 from sqlalchemy.dialects.postgresql import UUID
 
 from db.postgres import Base
 
+# Номера битов ролей не переиспользуются, поэтому бит в уже выданном
+# токене никогда не начнет означать другую роль
+role_bit_seq = Sequence("roles_bit_seq", start=0, minvalue=0)
+
 
 class Role(Base):
     __tablename__ = "roles"
@@ -17,6 +21,14 @@ class Role(Base):
         nullable=False,
     )
     title = Column(String(50), unique=True, nullable=False)
+    # Позиция роли в битовой маске ролей access-токена
+    bit = Column(
+        Integer,
+        role_bit_seq,
+        server_default=role_bit_seq.next_value(),
+        unique=True,
+        nullable=False,
+    )
 
     def __repr__(self) -> str:
         return f"<Role {self.title}>"
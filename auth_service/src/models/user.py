@@ -54,10 +54,20 @@ class User(Base):
     __table_args__ = (UniqueConstraint("login", "email", name="login_email_unique"),)
 
     def __init__(
-        self, login: str, password: str, email: str, first_name: str, last_name: str
+        self,
+        login: str,
+        email: str,
+        first_name: str,
+        last_name: str,
+        password: str | None = None,
+        password_hash: str | None = None,
     ) -> None:
+        """
+        Сервисы передают готовый password_hash, посчитанный в пуле процессов,
+        хэширование здесь остается для CLI и тестов
+        """
         self.login = login
-        self.password = generate_password_hash(password)
+        self.password = password_hash or generate_password_hash(password)
         self.email = email
         self.first_name = first_name
         self.last_name = last_name
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
 
+from core.config import settings
+
 
 class AuthOutputSchema(BaseModel):
     access_token: str
@@ -17,6 +19,21 @@ class LoginInputSchema(BaseModel):
     password: str = Field(min_length=1)
 
 
+class IntrospectInputSchema(BaseModel):
+    tokens: list[str] = Field(min_length=1, max_length=settings.introspect_max_tokens)
+
+
+class TokenIntrospectionSchema(BaseModel):
+    active: bool
+    user_id: str | None = None
+    roles: list[str] | None = None
+    exp: int | None = None
+
+
+class IntrospectOutputSchema(BaseModel):
+    tokens: list[TokenIntrospectionSchema]
+
+
 class OAuthUser(BaseModel):
     oauth_user_id: str
     email: str
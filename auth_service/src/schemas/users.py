@@ -1,4 +1,5 @@
 from datetime import date, datetime
+from enum import Enum
 
 from pydantic import BaseModel, EmailStr, Field, model_validator
 
@@ -36,6 +37,22 @@ class UserLoginHistorySchema(BaseModel):
     success: bool
     user_agent: str
 
+    class Config:
+        from_attributes = True
+
+
+class HistoryTotal(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+
+
+class LoginHistoryPageSchema(BaseModel):
+    items: list[UserLoginHistorySchema]
+    size: int
+    next_cursor: str | None = None
+    total: int | None = None
+    total_is_estimate: bool = False
+
 
 class CreateUserSchema(BaseModel):
     login: str = Field(min_length=1)
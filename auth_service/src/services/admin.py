@@ -1,83 +1,154 @@
-from functools import lru_cache
+from functools import partial
 from uuid import UUID
 
 from fastapi import Depends
-from sqlalchemy import select
+from fastapi_pagination import Page, Params, create_page
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, insert, literal, select, true
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased
 
 from db.postgres import get_postgres_session
+from db.redis import get_redis
+from db.unit_of_work import run_after_commit
+from models.associations import user_role
 from models.roles import Role
 from models.user import User
+from schemas.roles import RoleSchema
 from services.exceptions import (ConflictError, ObjectNotFoundError,
                                  UserNotFoundError)
+from services.role_catalog import RoleCatalog, get_role_catalog
+from services.token_watermarks import TokenWatermarks, get_token_watermarks
+from services.user_roles_cache import UserRolesCache, get_user_roles_cache
 
 
 class AdminService:
-    def __init__(self, postgres_session: AsyncSession):
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        redis: Redis | None = None,
+        catalog: RoleCatalog | None = None,
+        roles_cache: UserRolesCache | None = None,
+        watermarks: TokenWatermarks | None = None,
+    ):
         self.postgres_session = postgres_session
+        self.catalog = catalog or RoleCatalog(postgres_session, redis)
+        self.roles_cache = roles_cache or UserRolesCache(postgres_session, redis)
+        self.watermarks = watermarks or TokenWatermarks(redis)
+
+    async def get_user_roles(self, user_id: UUID, params: Params) -> Page[Role]:
+        """
+        Страница ролей пользователя одним запросом: к пользователю
+        присоединяется LATERAL-подзапрос со страницей ролей и их общим числом.
+        Нет строк - нет пользователя, роль NULL - на странице нет ролей
+        """
+        raw_params = params.to_raw_params()
+        roles_page = (
+            select(Role)
+            .join(user_role, user_role.c.role_id == Role.id)
+            .where(user_role.c.user_id == User.id)
+            .order_by(Role.title, Role.id)
+            .limit(raw_params.limit)
+            .offset(raw_params.offset)
+            .lateral("roles_page")
+        )
+        roles_total = (
+            select(func.count())
+            .select_from(user_role)
+            .where(user_role.c.user_id == User.id)
+            .scalar_subquery()
+        )
+        page_role = aliased(Role, roles_page)
 
-    async def get_user_roles(self, user_id: UUID):
         async with self.postgres_session() as session:
-            user_scalars = await session.scalars(select(User).where(User.id == user_id))
-            user = user_scalars.first()
-            if not user:
-                raise UserNotFoundError
+            rows = (
+                await session.execute(
+                    select(roles_total, page_role)
+                    .select_from(User)
+                    .outerjoin(roles_page, true())
+                    .where(User.id == user_id)
+                )
+            ).all()
 
-            role_scalars = await session.scalars(
-                select(Role).join(User.roles).where(User.id == user_id)
-            )
-            roles = role_scalars.fetchall()
-            if not roles:
-                raise ObjectNotFoundError
-            return roles
+        if not rows:
+            raise UserNotFoundError
+        total = rows[0][0]
+        if not total:
+            raise ObjectNotFoundError
+        roles = [role for _, role in rows if role is not None]
+        return create_page(roles, total=total, params=params)
 
-    async def add_user_role(self, user_id: UUID, role_id: UUID):
-        async with self.postgres_session() as session:
-            role_scalars = await session.scalars(select(Role).where(Role.id == role_id))
-            role = role_scalars.first()
-            if not role:
-                raise ObjectNotFoundError
+    async def has_user_role(self, user_id: UUID, title: str) -> bool:
+        """
+        Проверка роли по кэшу ролей пользователя. При промахе кэш читает роли
+        по первичному ключу user_role и уникальному индексу roles.title
+        """
+        return title in await self.roles_cache.get(user_id)
 
-            user_scalars = await session.scalars(
-                select(User).options(selectinload(User.roles)).where(User.id == user_id)
-            )
-            user = user_scalars.first()
-            if not user:
-                raise UserNotFoundError
+    async def add_user_role(self, user_id: UUID, role_id: UUID) -> RoleSchema:
+        role = await self.catalog.get(role_id)
+        if not role:
+            raise ObjectNotFoundError
 
-            user.roles.append(role)
-            session.add(user)
+        async with self.postgres_session() as session:
+            # Строка вставляется, только если пользователь существует
             try:
-                await session.commit()
+                added = await session.scalar(
+                    insert(user_role)
+                    .from_select(
+                        ["user_id", "role_id"],
+                        select(User.id, literal(role.id)).where(User.id == user_id),
+                    )
+                    .returning(user_role.c.user_id)
+                )
+                await session.flush()
             except IntegrityError:
                 raise ConflictError
-            return role
+        if added is None:
+            raise UserNotFoundError
 
-    async def remove_user_role(self, user_id: UUID, role_id: UUID):
-        async with self.postgres_session() as session:
-            user_scalars = await session.scalars(
-                select(User).options(selectinload(User.roles)).where(User.id == user_id)
-            )
-            user = user_scalars.first()
-            if not user:
-                raise UserNotFoundError
+        await run_after_commit(
+            self.postgres_session, partial(self.roles_cache.invalidate, user_id)
+        )
+        return role
 
-            role_scalars = await session.scalars(select(Role).where(Role.id == role_id))
-            role = role_scalars.first()
-            if not role:
-                raise ObjectNotFoundError
+    async def remove_user_role(self, user_id: UUID, role_id: UUID) -> RoleSchema:
+        role = await self.catalog.get(role_id)
 
-            if role in user.roles:
-                user.roles.remove(role)
+        async with self.postgres_session() as session:
+            removed = None
+            if role:
+                removed = await session.scalar(
+                    delete(user_role)
+                    .where(
+                        user_role.c.user_id == user_id,
+                        user_role.c.role_id == role.id,
+                    )
+                    .returning(user_role.c.user_id)
+                )
+                await session.flush()
+            if removed is None and not await session.get(User, user_id):
+                raise UserNotFoundError
 
-            await session.commit()
-            return role
+        if not role:
+            raise ObjectNotFoundError
+        if removed is not None:
+            await run_after_commit(
+                self.postgres_session, partial(self.roles_cache.invalidate, user_id)
+            )
+            # Снятая роль остается в выпущенных токенах до их отзыва
+            await run_after_commit(
+                self.postgres_session, partial(self.watermarks.revoke_all, user_id)
+            )
+        return role
 
 
-@lru_cache()
 def get_admin_service(
     postgres_session: AsyncSession = Depends(get_postgres_session),
+    redis: Redis = Depends(get_redis),
+    catalog: RoleCatalog | None = Depends(get_role_catalog),
+    roles_cache: UserRolesCache | None = Depends(get_user_roles_cache),
+    watermarks: TokenWatermarks | None = Depends(get_token_watermarks),
 ) -> AdminService:
-    return AdminService(postgres_session)
+    return AdminService(postgres_session, redis, catalog, roles_cache, watermarks)
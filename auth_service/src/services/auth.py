@@ -1,71 +1,211 @@
+import uuid
 from datetime import datetime, timedelta
-from functools import lru_cache
+from functools import partial
+from typing import Any
 
-import jwt
 from fastapi import Depends
 from redis import Redis
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import delete, exists, select
+from sqlalchemy.sql import delete, exists, func, insert, literal, select
 
 import models as db_models
-from core.config import JWT_ALGORITHM, settings
+from core.config import ISSUED_AT_MS_CLAIM, ROLE_MASK_CLAIM, settings
+from core.jwt_keys import get_keyring
+from core.metrics import registry
 from db.postgres import get_postgres_session
-from db.redis import RedisCache, get_redis
+from db.redis import get_redis
+from db.unit_of_work import run_after_commit, short_session
+from schemas.auths import AuthOutputSchema
+from services import role_catalog
+from services.exceptions import (InvalidPasswordError, InvalidRefreshTokenError,
+                                 ObjectNotFoundError, TooManyLoginAttemptsError)
+from services.login_history_writer import (LoginHistoryWriter,
+                                           get_login_history_writer)
+from services.login_lookup_cache import (UNKNOWN_LOGIN, LoginLookup,
+                                         LoginLookupCache,
+                                         get_login_lookup_cache)
+from services.password_hasher import verify_password
+from services.token_denylist import AccessTokenDenylist, get_token_denylist
+from services.token_watermarks import TokenWatermarks, get_token_watermarks
+from services.user_roles_cache import UserRolesCache, get_user_roles_cache
+from utils.hashing import token_digest
+
+evicted_sessions = registry.counter(
+    "refresh_tokens_evicted_total",
+    "Refresh-токены, удалённые при превышении лимита сессий пользователя",
+)
+
+
+def role_claims(user_roles: list[str]) -> dict[str, Any]:
+    """
+    Роли для access-токена: список названий или, при ACCESS_TOKEN_ROLE_MASK,
+    битовая маска по справочнику ролей. Если справочник не загружен или не
+    знает какую-то роль, токен выпускается со списком названий
+    """
+    if settings.access_token_role_mask and role_catalog.catalog is not None:
+        mask = role_catalog.catalog.role_mask(user_roles)
+        if mask is not None:
+            return {ROLE_MASK_CLAIM: mask}
+    return {"roles": user_roles}
 
 
 class AuthService:
-    def __init__(self, postgres_session: AsyncSession, redis: Redis):
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        redis: Redis,
+        denylist: AccessTokenDenylist | None = None,
+        history_writer: LoginHistoryWriter | None = None,
+        roles_cache: UserRolesCache | None = None,
+        watermarks: TokenWatermarks | None = None,
+        login_cache: LoginLookupCache | None = None,
+    ):
         self.postgres_session = postgres_session
-        self.redis = RedisCache(redis)
+        self.denylist = denylist or AccessTokenDenylist(redis)
+        self.history_writer = history_writer
+        self.roles_cache = roles_cache or UserRolesCache(postgres_session, redis)
+        self.watermarks = watermarks or TokenWatermarks(redis)
+        self.login_cache = login_cache or LoginLookupCache(redis)
 
     @staticmethod
     async def generate_access_token(user_id: str, user_roles: list[str]) -> str:
-        valid_till = datetime.now() + timedelta(hours=settings.access_token_exp_hours)
+        issued_at = datetime.now()
+        valid_till = issued_at + timedelta(hours=settings.access_token_exp_hours)
         payload = {
             "user_id": user_id,
+            "iat": int(issued_at.timestamp()),
+            ISSUED_AT_MS_CLAIM: int(issued_at.timestamp() * 1000),
             "exp": int(valid_till.timestamp()),
-            "roles": user_roles,
+            **role_claims(user_roles),
         }
 
-        return jwt.encode(payload, settings.jwt_secret_key, algorithm=JWT_ALGORITHM)
+        return get_keyring().encode(payload)
 
     @staticmethod
     def _generate_refresh_token(user_id: str, valid_till: datetime) -> str:
         payload = {
             "user_id": user_id,
             "exp": int(valid_till.timestamp()),
+            # без jti токены, выданные в одну секунду, совпали бы
+            "jti": uuid.uuid4().hex,
         }
 
-        return jwt.encode(payload, settings.jwt_secret_key, algorithm=JWT_ALGORITHM)
+        return get_keyring().encode(payload)
 
-    async def save_refresh_token(
-        self, user_id: str, refresh_token: str, valid_till: datetime
-    ) -> None:
-        async with self.postgres_session() as session:
-            refresh_token = db_models.RefreshToken(
-                user_id=user_id,
-                token=refresh_token,
-                expires_at=valid_till,
-            )
-            session.add(refresh_token)
+    def _build_refresh_token(
+        self, user_id: str
+    ) -> tuple[str, db_models.RefreshToken]:
+        valid_till = datetime.now() + timedelta(days=settings.refresh_token_exp_days)
+        refresh_token = self._generate_refresh_token(user_id, valid_till)
+        refresh_token_row = db_models.RefreshToken(
+            user_id=user_id,
+            token_hash=token_digest(refresh_token),
+            expires_at=valid_till,
+        )
+        return refresh_token, refresh_token_row
 
-            await session.commit()
+    @staticmethod
+    async def _evict_extra_sessions(session: AsyncSession, user_id: str) -> None:
+        """
+        Оставляет пользователю не больше max_sessions_per_user refresh-токенов,
+        удаляя те, что истекают раньше всех. Выборка идёт по индексу
+        (user_id, expires_at), просроченные токены уходят первыми
+        """
+        if settings.max_sessions_per_user <= 0:
+            return
 
-    async def emit_refresh_token(self, user_id: str) -> str:
-        valid_till = datetime.now() + timedelta(days=settings.refresh_token_exp_days)
+        extra = (
+            select(db_models.RefreshToken.id)
+            .where(db_models.RefreshToken.user_id == user_id)
+            .order_by(db_models.RefreshToken.expires_at.desc())
+            .offset(settings.max_sessions_per_user)
+            .scalar_subquery()
+        )
+        result = await session.execute(
+            delete(db_models.RefreshToken).where(db_models.RefreshToken.id.in_(extra))
+        )
+        evicted_sessions.inc(result.rowcount)
 
-        refresh_token = self._generate_refresh_token(user_id, valid_till)
+    async def emit_refresh_token(self, user_id: str) -> str:
+        refresh_token, refresh_token_row = self._build_refresh_token(user_id)
 
-        await self.save_refresh_token(user_id, refresh_token, valid_till)
+        async with self.postgres_session() as session:
+            session.add(refresh_token_row)
+            await session.flush()
+            await self._evict_extra_sessions(session, user_id)
 
         return refresh_token
 
+    async def login(
+        self, login: str, password: str, user_agent: str
+    ) -> AuthOutputSchema:
+        """
+        Вход пользователя с одним коммитом: история входа и refresh-токен
+        пишутся в одной транзакции, роли для токена берутся из кэша. Если
+        запущен фоновый писатель истории, событие входа уходит в его очередь.
+        Пользователь ищется по логину в кэше, при промахе - в короткой
+        отдельной сессии, так что во время проверки пароля соединение из пула
+        не занято. После login_max_failures неудачных попыток вход
+        отклоняется до проверки пароля. Попытка учитывается до хэширования,
+        поэтому параллельный подбор пароля не обходит лимит
+        """
+        lookup = await self.login_cache.get(login, self._lookup_user)
+        if not lookup.found:
+            raise ObjectNotFoundError
+
+        if not await self.login_cache.reserve_attempt(login):
+            raise TooManyLoginAttemptsError
+        if not await verify_password(lookup.password_hash, password):
+            raise InvalidPasswordError
+        await self.login_cache.reset_failures(login)
+
+        user_id = lookup.user_id
+        async with self.postgres_session() as session:
+            refresh_token, refresh_token_row = self._build_refresh_token(user_id)
+            session.add(refresh_token_row)
+            if self.history_writer is not None:
+                self.history_writer.submit(user_id, user_agent)
+            else:
+                session.add(
+                    db_models.LoginHistory(
+                        user_id=user_id, success=True, user_agent=user_agent
+                    )
+                )
+            await session.flush()
+            await self._evict_extra_sessions(session, user_id)
+
+        access_token = await self.generate_access_token(
+            user_id, await self.roles_cache.get(user_id)
+        )
+
+        return AuthOutputSchema(
+            access_token=access_token, refresh_token=refresh_token, user_id=user_id
+        )
+
+    async def _lookup_user(self, login: str) -> LoginLookup:
+        user = db_models.User
+        # Соединение запроса не должно быть занято на время проверки пароля
+        async with short_session(self.postgres_session) as session:
+            row = (
+                await session.execute(
+                    select(user.id, user.password).where(user.login == login)
+                )
+            ).first()
+        if row is None:
+            return UNKNOWN_LOGIN
+        return LoginLookup(str(row.id), row.password)
+
+    async def get_user_roles(self, user_id: str) -> list[str]:
+        return await self.roles_cache.get(user_id)
+
     async def is_refresh_token_valid(self, refresh_token: str) -> bool:
         async with self.postgres_session() as session:
-            return await session.execute(
+            return await session.scalar(
                 select(
-                    exists(db_models.RefreshToken).where(
-                        db_models.RefreshToken.token == refresh_token,
+                    exists().where(
+                        db_models.RefreshToken.token_hash
+                        == token_digest(refresh_token),
                         db_models.RefreshToken.expires_at >= datetime.now(),
                     )
                 )
@@ -77,8 +217,45 @@ class AuthService:
         refresh_token: str,
         user_roles: list[str],
     ) -> tuple[str, str]:
-        await self.invalidate_refresh_token(refresh_token)
-        refresh_token_new = await self.emit_refresh_token(user_id)
+        """
+        Ротация refresh-токена одним запросом: старый токен удаляется
+        и новый вставляется только если старый еще действителен
+        """
+        valid_till = datetime.now() + timedelta(days=settings.refresh_token_exp_days)
+        refresh_token_new = self._generate_refresh_token(user_id, valid_till)
+
+        rotated = (
+            delete(db_models.RefreshToken)
+            .where(
+                db_models.RefreshToken.token_hash == token_digest(refresh_token),
+                db_models.RefreshToken.user_id == user_id,
+                db_models.RefreshToken.expires_at >= datetime.now(),
+            )
+            .returning(db_models.RefreshToken.user_id)
+            .cte("rotated")
+        )
+        statement = (
+            insert(db_models.RefreshToken)
+            .from_select(
+                ["id", "user_id", "token_hash", "created_at", "expires_at"],
+                select(
+                    literal(uuid.uuid4(), UUID(as_uuid=True)),
+                    rotated.c.user_id,
+                    literal(token_digest(refresh_token_new)),
+                    func.now(),
+                    literal(valid_till),
+                ),
+            )
+            .add_cte(rotated)
+            .returning(db_models.RefreshToken.id)
+        )
+
+        async with self.postgres_session() as session:
+            result = await session.execute(statement)
+            if result.first() is None:
+                raise InvalidRefreshTokenError
+            await session.flush()
+
         access_token = await self.generate_access_token(user_id, user_roles)
 
         return refresh_token_new, access_token
@@ -87,34 +264,64 @@ class AuthService:
         async with self.postgres_session() as session:
             await session.execute(
                 delete(db_models.RefreshToken).where(
-                    db_models.RefreshToken.token == refresh_token
+                    db_models.RefreshToken.token_hash == token_digest(refresh_token)
                 )
             )
-            await session.commit()
+            await session.flush()
 
     async def invalidate_user_refresh_tokens(self, user_id: str, exclude_token: str):
+        """
+        Удаляет остальные сессии пользователя и отзывает все его access-токены,
+        включая текущий: новый выдается по сохраненному refresh-токену
+        """
         async with self.postgres_session() as session:
             await session.execute(
                 delete(db_models.RefreshToken).where(
                     db_models.RefreshToken.user_id == user_id,
-                    db_models.RefreshToken.token != exclude_token,
+                    db_models.RefreshToken.token_hash != token_digest(exclude_token),
                 )
             )
-            await session.commit()
+            await session.flush()
 
-    async def invalidate_access_token(self, token: str) -> None:
-        await self.redis.put_to_cache(
-            key=token, value=True, ttl=settings.access_token_exp_hours * 3600
+        await run_after_commit(
+            self.postgres_session, partial(self.watermarks.revoke_all, user_id)
         )
 
-    async def is_access_token_valid(self, token: str) -> bool:
-        invalid_token = await self.redis.get_from_cache(key=token)
-        return False if invalid_token else True
+    async def invalidate_access_token(self, token: str) -> None:
+        await self.denylist.revoke(token, ttl=settings.access_token_exp_hours * 3600)
+
+    async def is_access_token_valid(self, token: str, payload: dict[str, Any]) -> bool:
+        if await self.watermarks.is_revoked(payload):
+            return False
+        return not await self.denylist.is_revoked(token)
+
+    async def are_access_tokens_valid(
+        self, tokens: list[str], payloads: list[dict[str, Any]]
+    ) -> list[bool]:
+        revoked = await self.watermarks.are_revoked(payloads)
+        # В denylist проверяются только токены, не отозванные отметкой
+        rest = [i for i, x in enumerate(revoked) if not x]
+        denied = await self.denylist.are_revoked([tokens[i] for i in rest])
+        for i, is_denied in zip(rest, denied):
+            revoked[i] = is_denied
+        return [not x for x in revoked]
 
 
-@lru_cache()
 def get_auth_service(
     postgres_session: AsyncSession = Depends(get_postgres_session),
     redis: Redis = Depends(get_redis),
+    denylist: AccessTokenDenylist | None = Depends(get_token_denylist),
+    history_writer: LoginHistoryWriter | None = Depends(get_login_history_writer),
+    roles_cache: UserRolesCache | None = Depends(get_user_roles_cache),
+    watermarks: TokenWatermarks | None = Depends(get_token_watermarks),
+    login_cache: LoginLookupCache | None = Depends(get_login_lookup_cache),
 ) -> AuthService:
-    return AuthService(postgres_session, redis)
+    return AuthService(
+        postgres_session,
+        redis,
+        denylist,
+        history_writer,
+        roles_cache,
+        watermarks,
+        login_cache,
+    )
@@ -16,3 +16,23 @@ class UserNotFoundError(Exception):
 
 class OAuthUserNotFoundError(Exception):
     pass
+
+
+class InvalidRefreshTokenError(Exception):
+    pass
+
+
+class PasswordHashingTimeoutError(Exception):
+    pass
+
+
+class InvalidPasswordError(Exception):
+    pass
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+class TooManyLoginAttemptsError(Exception):
+    pass
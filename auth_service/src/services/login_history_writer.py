@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models as db_models
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+flush_lag = registry.histogram(
+    "login_history_flush_lag_seconds", "Время от входа до записи истории в базу"
+)
+flushed = registry.counter("login_history_flushed_total", "Записанные события")
+dropped = registry.counter(
+    "login_history_dropped_total", "События, отброшенные из-за переполнения очереди"
+)
+failed = registry.counter(
+    "login_history_failed_total", "События, потерянные из-за ошибки записи"
+)
+
+
+class LoginHistoryWriter:
+    """
+    Отложенная запись истории входов.
+
+    События копятся в ограниченной очереди и пишутся одним многострочным
+    INSERT каждые flush_interval секунд или при накоплении batch_size событий.
+    При переполнении очереди новые события отбрасываются и учитываются в метриках.
+    """
+
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        max_queue_size: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+    ):
+        self.postgres_session = postgres_session
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: deque[tuple[float, dict]] = deque()
+        self._batch_ready = asyncio.Event()
+        self._closed = False
+        self._task: asyncio.Task | None = None
+        registry.gauge(
+            "login_history_queue_depth",
+            "События в очереди на запись",
+            callback=lambda: len(self._queue),
+        )
+
+    def submit(self, user_id: str, user_agent: str, success: bool = True) -> None:
+        if len(self._queue) >= self.max_queue_size:
+            dropped.inc()
+            return
+
+        event = {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "event_date": datetime.now(),
+            "success": success,
+            "user_agent": user_agent,
+        }
+        self._queue.append((time.perf_counter(), event))
+        if len(self._queue) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Дописывает все накопленные события и останавливает фоновую задачу"""
+        self._closed = True
+        self._batch_ready.set()
+        if self._task:
+            await self._task
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self._flush_pending()
+        await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        while self._queue:
+            batch = [
+                self._queue.popleft()
+                for _ in range(min(self.batch_size, len(self._queue)))
+            ]
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[float, dict]]) -> None:
+        try:
+            async with self.postgres_session() as session:
+                await session.execute(
+                    insert(db_models.LoginHistory), [event for _, event in batch]
+                )
+                await session.commit()
+        except Exception:
+            failed.inc(len(batch))
+            logger.exception("failed to write %s login history events", len(batch))
+            return
+
+        flushed_at = time.perf_counter()
+        flushed.inc(len(batch))
+        for enqueued_at, _ in batch:
+            flush_lag.observe(flushed_at - enqueued_at)
+
+
+writer: LoginHistoryWriter | None = None
+
+
+async def get_login_history_writer() -> LoginHistoryWriter | None:
+    return writer
@@ -0,0 +1,163 @@
+import json
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from core.config import settings
+from core.metrics import registry
+
+lookup_hits = registry.counter(
+    "login_lookup_cache_hits_total", "Входы, для которых пользователь найден в кэше"
+)
+lookup_misses = registry.counter(
+    "login_lookup_cache_misses_total", "Входы, для которых пользователь искался в базе"
+)
+login_blocked = registry.counter(
+    "login_blocked_total",
+    "Входы, отклоненные из-за неудачных попыток до проверки пароля",
+)
+
+# Попытка входа занимается до проверки пароля одним INCR, поэтому
+# параллельные попытки не проходят проверку лимита все разом. Окно
+# ставится на первой попытке и последующими не продлевается
+RESERVE_ATTEMPT_SCRIPT = """
+local attempts = redis.call("INCR", KEYS[1])
+if attempts == 1 then
+    redis.call("EXPIRE", KEYS[1], ARGV[1])
+end
+return attempts
+"""
+
+# Прочитанное из базы кладется в кэш, только если поколение логина не
+# менялось после чтения. Иначе вход, начатый до смены пароля, вернул бы в
+# кэш старый хэш уже после инвалидации
+GUARDED_SET_SCRIPT = """
+if (redis.call("GET", KEYS[2]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class LoginLookup:
+    user_id: str | None
+    password_hash: str | None
+
+    @property
+    def found(self) -> bool:
+        return self.user_id is not None
+
+
+UNKNOWN_LOGIN = LoginLookup(None, None)
+
+
+class LoginLookupCache:
+    """
+    Кэш поиска пользователя по логину для входа и счетчик неудачных попыток.
+
+    По логину хранится id пользователя и хэш пароля, для несуществующего
+    логина - пустая запись с коротким TTL, чтобы перебор логинов не ходил в
+    базу. Записи сбрасываются после коммита при регистрации и изменении
+    логина или пароля (UserService.invalidate_logins): инвалидация
+    увеличивает поколение логина, и запись из начатого раньше чтения базы
+    уже не сохраняется. TTL ограничивает устаревание при правках мимо
+    сервиса. Каждая попытка входа по существующему логину занимает место в
+    счетчике до проверки пароля, успешный вход счетчик обнуляет, неудачный
+    оставляет попытку учтенной.
+    """
+
+    key_prefix = "login_lookup"
+    generation_prefix = "login_lookup_generation"
+    failures_prefix = "login_failures"
+
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: int | None = None,
+        negative_ttl: int | None = None,
+        max_failures: int | None = None,
+        failures_window: int | None = None,
+    ):
+        self.redis = redis
+        self.ttl = ttl or settings.login_cache_ttl
+        self.negative_ttl = negative_ttl or settings.login_cache_negative_ttl
+        self.max_failures = (
+            settings.login_max_failures if max_failures is None else max_failures
+        )
+        self.failures_window = failures_window or settings.login_failures_window_sec
+        self._reserve_attempt = redis.register_script(RESERVE_ATTEMPT_SCRIPT)
+        self._guarded_set = redis.register_script(GUARDED_SET_SCRIPT)
+
+    def _key(self, login: str) -> str:
+        return f"{self.key_prefix}:{login}"
+
+    def _failures_key(self, login: str) -> str:
+        return f"{self.failures_prefix}:{login}"
+
+    def _generation_key(self, login: str) -> str:
+        return f"{self.generation_prefix}:{login}"
+
+    async def get(
+        self, login: str, load: Callable[[str], Awaitable[LoginLookup]]
+    ) -> LoginLookup:
+        """Запись из кэша, при промахе - из load с сохранением в кэш"""
+        value, generation = await self.redis.mget(
+            [self._key(login), self._generation_key(login)]
+        )
+        if value is not None:
+            lookup_hits.inc()
+            if not value:
+                return UNKNOWN_LOGIN
+            data = json.loads(value)
+            return LoginLookup(data["id"], data["password"])
+
+        lookup_misses.inc()
+        lookup = await load(login)
+        if lookup.found:
+            value = json.dumps({"id": lookup.user_id, "password": lookup.password_hash})
+            ttl = self.ttl
+        else:
+            value, ttl = "", self.negative_ttl
+        await self._guarded_set(
+            keys=[self._key(login), self._generation_key(login)],
+            args=[(generation or b"").decode(), value, ttl],
+        )
+        return lookup
+
+    async def invalidate(self, *logins: str) -> None:
+        if not logins:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            # Поколение меняется раньше удаления записи: запись из чтения,
+            # начатого до инвалидации, либо удаляется, либо не сохраняется
+            for login in logins:
+                pipe.incr(self._generation_key(login))
+                pipe.expire(self._generation_key(login), self.ttl)
+            pipe.delete(*(self._key(login) for login in logins))
+            await pipe.execute()
+
+    async def reserve_attempt(self, login: str) -> bool:
+        """False - лимит неудачных попыток в текущем окне исчерпан"""
+        if self.max_failures <= 0:
+            return True
+        attempts = await self._reserve_attempt(
+            keys=[self._failures_key(login)], args=[self.failures_window]
+        )
+        if attempts > self.max_failures:
+            login_blocked.inc()
+            return False
+        return True
+
+    async def reset_failures(self, login: str) -> None:
+        if self.max_failures > 0:
+            await self.redis.delete(self._failures_key(login))
+
+
+login_cache: LoginLookupCache | None = None
+
+
+async def get_login_lookup_cache() -> LoginLookupCache | None:
+    return login_cache
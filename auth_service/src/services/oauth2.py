@@ -1,23 +1,37 @@
-import random
-import string
+import logging
 from abc import ABC, abstractmethod
-from functools import lru_cache
+from uuid import UUID
 
-import requests
+import httpx
+import jwt
 from authlib.integrations.base_client.errors import OAuthError
 from fastapi import Depends, HTTPException, status
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import models as db_models
 from core import oauth_clients
 from core.config import settings
+from core.metrics import registry
 from db.postgres import get_postgres_session
 from schemas.auths import AuthOutputSchema, OAuthUser
-from schemas.users import CreateUserSchema
-from services.exceptions import OAuthUserNotFoundError, ObjectNotFoundError
+from services.exceptions import (ConflictError, OAuthUserNotFoundError,
+                                 ObjectNotFoundError)
+from services.oidc_keys import OIDCKeySet, get_google_keys
+from services.password_hasher import UNUSABLE_PASSWORD
 from services.user import UserService, get_user_service
 
+logger = logging.getLogger(__name__)
+
+id_token_profiles = registry.counter(
+    "oauth_id_token_profiles_total", "Профили, прочитанные из проверенного id_token"
+)
+userinfo_profiles = registry.counter(
+    "oauth_userinfo_profiles_total", "Профили, полученные запросом к userinfo"
+)
+
 
 class AbstractOAuthService(ABC):
     @abstractmethod
@@ -25,7 +39,7 @@ class AbstractOAuthService(ABC):
         pass
 
     @abstractmethod
-    async def get_access_token_from_provider(self, *args, **kwargs) -> str:
+    async def get_access_token_from_provider(self, *args, **kwargs) -> dict:
         pass
 
     @abstractmethod
@@ -42,18 +56,18 @@ class AbstractOAuthService(ABC):
 
 
 class OAuthServiceGoogle(AbstractOAuthService):
-    def __init__(self, postgres_session: AsyncSession, user_service: UserService):
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        user_service: UserService,
+        keys: OIDCKeySet | None = None,
+    ):
         self.postgres_session = postgres_session
         self.user_service = user_service
+        self.keys = keys
 
     provider_name = "Google"
 
-    @staticmethod
-    def _generate_random_password(length=10):
-        characters = string.ascii_letters + string.digits + string.punctuation
-        password = "".join(random.choice(characters) for _ in range(length))
-        return password
-
     @staticmethod
     async def create_redirect_url() -> str:
         uri, _state = oauth_clients.google_client.create_authorization_url(
@@ -62,7 +76,8 @@ class OAuthServiceGoogle(AbstractOAuthService):
         return uri
 
     @staticmethod
-    async def get_access_token_from_provider(code: str) -> str:
+    async def get_access_token_from_provider(code: str) -> dict:
+        """Обменивает код на токены провайдера: access_token и id_token"""
         try:
             data: dict = await oauth_clients.google_client.fetch_token(
                 settings.google_token_url,
@@ -75,12 +90,56 @@ class OAuthServiceGoogle(AbstractOAuthService):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"error while connect to redirect url: {exc!s}",
             )
+        except httpx.HTTPError:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="oauth provider unavailable",
+            )
 
-        return data.get("access_token")
+        return data
 
-    async def get_user_data_from_provider(self, access_token: str) -> OAuthUser:
+    async def get_user_data_from_provider(self, token: dict) -> OAuthUser:
+        """
+        Профиль берется из id_token, проверенного по закэшированным ключам
+        провайдера, без отдельного запроса. Если id_token нет или проверить
+        его не удалось, профиль запрашивается из userinfo
+        """
+        id_token = token.get("id_token")
+        if id_token and self.keys is not None:
+            try:
+                claims = await self.keys.verify(id_token, settings.google_client_id)
+            except jwt.InvalidTokenError as exc:
+                logger.warning("id_token verification failed: %s", exc)
+            else:
+                if "email" in claims:
+                    id_token_profiles.inc()
+                    return OAuthUser(
+                        oauth_user_id=claims["sub"],
+                        email=claims["email"],
+                        first_name=claims.get("given_name"),
+                        last_name=claims.get("family_name"),
+                        provider_type=self.provider_name,
+                    )
+
+        userinfo_profiles.inc()
+        return await self._get_user_data_from_userinfo(token.get("access_token"))
+
+    async def _get_user_data_from_userinfo(self, access_token: str) -> OAuthUser:
         headers = {"Authorization": f"Bearer {access_token}"}
-        result = requests.get(settings.google_userinfo_url, headers=headers)
+        try:
+            # Клиент общий для всех запросов, поэтому токен передается явно,
+            # а не берется из состояния клиента
+            result = await oauth_clients.get_with_retries(
+                oauth_clients.google_client,
+                settings.google_userinfo_url,
+                headers=headers,
+                withhold_token=True,
+            )
+        except httpx.HTTPError:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="oauth provider unavailable",
+            )
         if result.status_code != status.HTTP_200_OK:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -96,73 +155,93 @@ class OAuthServiceGoogle(AbstractOAuthService):
             provider_type=self.provider_name,
         )
 
-    async def get_oauth_user_from_db(self, oauth_user_id: str) -> OAuthUser:
+    async def authorize_user(
+        self, user_data: OAuthUser, user_agent: str
+    ) -> db_models.User:
+        """
+        Пользователь по OAuth-аккаунту. Повторный вход - один запрос, при
+        первом входе пользователь ищется или создается по email одним upsert,
+        а привязка вставляется с ON CONFLICT, поэтому параллельные первые
+        входы одного аккаунта не падают на уникальных ограничениях
+        """
         async with self.postgres_session() as session:
-            user_scalars = await session.scalars(
-                select(db_models.OAuthAccount).where(
-                    db_models.OAuthAccount.oauth_user_id == oauth_user_id,
+            service_user = await session.scalar(
+                select(db_models.User)
+                .join(db_models.OAuthAccount)
+                .where(
+                    db_models.OAuthAccount.oauth_user_id
+                    == str(user_data.oauth_user_id),
                     db_models.OAuthAccount.provider_type == self.provider_name,
                 )
             )
-            user = user_scalars.first()
-
-            return user if user else None
-
-    async def create_oauth_user(
-        self, oauth_user: OAuthUser, service_user_id: str
-    ) -> db_models.OAuthAccount:
-        async with self.postgres_session() as session:
-            user = db_models.OAuthAccount(
-                user_id=service_user_id,
-                oauth_user_id=str(oauth_user.oauth_user_id),
-                provider_type=self.provider_name,
-            )
-            session.add(user)
-            await session.commit()
-
-            return user
-
-    async def authorize_user(
-        self, user_data: OAuthUser, user_agent: str
-    ) -> AuthOutputSchema:
-        oauth_user_db = await self.get_oauth_user_from_db(user_data.oauth_user_id)
-
-        if oauth_user_db:
-            try:
-                service_user = await self.user_service.get_user_by_id(
-                    oauth_user_db.user_id
-                )
-            except ObjectNotFoundError:
-                pass
-            else:
-                # Есть oauth_user_db, есть service_user
+            if service_user is not None:
                 return service_user
 
-        # Нет oauth_user_db, нет service_user по id
-        try:
-            service_user = await self.user_service.get_user_by_email(
-                user_data.email.lower()
-            )
-        except ObjectNotFoundError:
-            # Создаем service_user
-            service_user = await self.user_service.create_user(
-                CreateUserSchema(
-                    login=user_data.email,
-                    first_name=user_data.first_name,
-                    last_name=user_data.last_name,
-                    password=self._generate_random_password(),
-                    email=user_data.email,
+            try:
+                service_user = await self._upsert_user(session, user_data)
+                linked_user_id = await self._link_oauth_account(
+                    session, user_data, service_user.id
                 )
-            )
+            except IntegrityError:
+                # login занят другим пользователем
+                raise ConflictError
 
-        # В любом случае создаем oauth_user_db
-        await self.create_oauth_user(user_data, service_user.id)
+            # Аккаунт успели привязать к другому пользователю
+            if linked_user_id != service_user.id:
+                service_user = await session.get(db_models.User, linked_user_id)
 
+        await self.user_service.remember_identifiers(
+            service_user.login, service_user.email
+        )
+        await self.user_service.invalidate_logins(service_user.login)
         # Фиксируем вход пользователя через OAuth
         await self.user_service.save_login_history(service_user.id, user_agent)
 
         return service_user
 
+    @staticmethod
+    async def _upsert_user(
+        session: AsyncSession, user_data: OAuthUser
+    ) -> db_models.User:
+        # Войти по паролю OAuth-пользователь не может, хэшировать нечего
+        email = user_data.email.lower()
+        stmt = (
+            insert(db_models.User)
+            .values(
+                login=user_data.email,
+                email=email,
+                password=UNUSABLE_PASSWORD,
+                first_name=user_data.first_name,
+                last_name=user_data.last_name,
+            )
+            # Обновление без изменений, чтобы RETURNING вернул и существующего
+            .on_conflict_do_update(
+                index_elements=[db_models.User.email], set_={"email": email}
+            )
+            .returning(db_models.User)
+        )
+        return await session.scalar(stmt, execution_options={"populate_existing": True})
+
+    async def _link_oauth_account(
+        self, session: AsyncSession, user_data: OAuthUser, user_id: UUID
+    ) -> UUID:
+        """Привязывает аккаунт, возвращает id пользователя, к которому он привязан"""
+        account = db_models.OAuthAccount
+        stmt = (
+            insert(account)
+            .values(
+                user_id=user_id,
+                oauth_user_id=str(user_data.oauth_user_id),
+                provider_type=self.provider_name,
+            )
+            .on_conflict_do_update(
+                constraint="oauth_user_id_provider_type_unique",
+                set_={"user_id": account.user_id},
+            )
+            .returning(account.user_id)
+        )
+        return await session.scalar(stmt)
+
     async def get_oauth_user_by_service_user_id(
         self, service_user_id: str
     ) -> db_models.OAuthAccount | None:
@@ -189,12 +268,12 @@ class OAuthServiceGoogle(AbstractOAuthService):
 
         async with self.postgres_session() as session:
             await session.delete(oauth_user)
-            await session.commit()
+            await session.flush()
 
 
-@lru_cache()
 def get_google_service(
     postgres_session: AsyncSession = Depends(get_postgres_session),
     user_service: UserService = Depends(get_user_service),
+    keys: OIDCKeySet | None = Depends(get_google_keys),
 ) -> OAuthServiceGoogle:
-    return OAuthServiceGoogle(postgres_session, user_service)
+    return OAuthServiceGoogle(postgres_session, user_service, keys)
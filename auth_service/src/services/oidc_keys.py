@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
+import httpx
+import jwt
+
+from core.oauth_clients import get_with_retries
+
+logger = logging.getLogger(__name__)
+
+
+class OIDCKeySet:
+    """
+    Discovery-документ и JWKS OIDC-провайдера для локальной проверки id_token.
+
+    Документ и ключи загружаются в фоне при старте и перечитываются раз в
+    refresh_interval секунд, а также при встрече неизвестного kid (ротация
+    ключей у провайдера), но не чаще раза в min_refresh_interval секунд.
+    Пока ключи не загружены, verify бросает InvalidTokenError и вызывающий
+    код идет за профилем в userinfo.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        discovery_url: str,
+        refresh_interval: float = 3600,
+        min_refresh_interval: float = 60,
+    ):
+        self.client = client
+        self.discovery_url = discovery_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._issuers: list[str] = []
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        # Недоступный провайдер не должен задерживать старт сервиса
+        self._task = asyncio.create_task(self._refresh_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def refresh(self) -> None:
+        """Перечитывает ключи, при ошибке оставляет прежние"""
+        self._refreshed_at = time.monotonic()
+        try:
+            discovery = await self._get_json(self.discovery_url)
+            jwk_set = jwt.PyJWKSet.from_dict(
+                await self._get_json(discovery["jwks_uri"])
+            )
+        except Exception:
+            logger.exception("failed to load OIDC keys from %s", self.discovery_url)
+            return
+
+        issuer = discovery["issuer"]
+        # Google подписывает токены и с issuer без схемы
+        self._issuers = list({issuer, issuer.removeprefix("https://")})
+        self._keys = {key.key_id: key for key in jwk_set.keys}
+
+    async def verify(self, id_token: str, audience: str) -> dict[str, Any]:
+        kid = jwt.get_unverified_header(id_token).get("kid")
+        key = await self._get_key(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f"unknown kid {kid}")
+        return jwt.decode(
+            id_token,
+            key.key,
+            algorithms=[key.algorithm_name],
+            audience=audience,
+            issuer=self._issuers,
+            leeway=30,
+        )
+
+    async def _get_key(self, kid: str | None) -> jwt.PyJWK | None:
+        if kid in self._keys:
+            return self._keys[kid]
+
+        async with self._lock:
+            stale = time.monotonic() - self._refreshed_at >= self.min_refresh_interval
+            if kid not in self._keys and stale:
+                await self.refresh()
+        return self._keys.get(kid)
+
+    async def _get_json(self, url: str) -> dict:
+        response = await get_with_retries(self.client, url, withhold_token=True)
+        response.raise_for_status()
+        return response.json()
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+
+google_keys: OIDCKeySet | None = None
+
+
+async def get_google_keys() -> OIDCKeySet | None:
+    return google_keys
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from core.metrics import registry
+from services.exceptions import PasswordHashingTimeoutError
+
+queue_depth = registry.gauge(
+    "password_hash_queue_depth", "Запросы, ожидающие свободного воркера"
+)
+in_flight = registry.gauge("password_hash_in_flight", "Хэширования в пуле процессов")
+queue_wait = registry.histogram(
+    "password_hash_queue_wait_seconds", "Ожидание свободного воркера"
+)
+hash_duration = registry.histogram(
+    "password_hash_duration_seconds", "Время хэширования или проверки пароля"
+)
+timeouts = registry.counter(
+    "password_hash_timeouts_total", "Запросы, не дождавшиеся воркера"
+)
+
+
+class PasswordHasher:
+    """
+    Хэширование паролей в пуле процессов, чтобы не блокировать event loop.
+
+    Одновременно в пул отправляется не больше max_concurrency задач,
+    остальные ждут в очереди не дольше queue_timeout секунд.
+    """
+
+    def __init__(self, max_workers: int, max_concurrency: int, queue_timeout: float):
+        self.queue_timeout = queue_timeout
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run(self, func: Callable, *args):
+        queued_at = time.perf_counter()
+        queue_depth.inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            timeouts.inc()
+            raise PasswordHashingTimeoutError
+        finally:
+            queue_depth.dec()
+
+        started = time.perf_counter()
+        queue_wait.observe(started - queued_at)
+        in_flight.inc()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            in_flight.dec()
+            hash_duration.observe(time.perf_counter() - started)
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(generate_password_hash, password)
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        return await self._run(check_password_hash, password_hash, password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher: PasswordHasher | None = None
+
+# Пароль пользователей, вошедших через OAuth: не является хэшем, поэтому
+# проверка любого пароля по нему ложна
+UNUSABLE_PASSWORD = "!"
+
+
+async def hash_password(password: str) -> str:
+    # Без пула (CLI, тесты) хэшируем на месте
+    if password_hasher is None:
+        return generate_password_hash(password)
+    return await password_hasher.hash(password)
+
+
+async def verify_password(password_hash: str, password: str) -> bool:
+    if password_hash == UNUSABLE_PASSWORD:
+        return False
+    if password_hasher is None:
+        return check_password_hash(password_hash, password)
+    return await password_hasher.verify(password_hash, password)
@@ -0,0 +1,73 @@
+import math
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+
+from utils.hashing import short_digest
+
+# Token bucket: пополнение и списание токена за один атомарный вызов.
+# Время берется у Redis, чтобы не зависеть от рассинхрона часов воркеров.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_ms = tonumber(ARGV[2])
+local ttl_ms = tonumber(ARGV[3])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_per_ms)
+
+local allowed = 0
+local retry_after_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after_ms = math.ceil((1 - tokens) / refill_per_ms)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], ttl_ms)
+
+return {allowed, retry_after_ms}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    retry_after: int  # секунды до появления следующего токена
+
+
+class RateLimiter:
+    """Лимит запросов по алгоритму token bucket поверх общего пула redis.asyncio"""
+
+    key_prefix = "rate_limit"
+
+    def __init__(self, redis: Redis, capacity: int, period: int):
+        self.capacity = capacity
+        self.period_ms = period * 1000
+        self.refill_per_ms = capacity / self.period_ms
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def make_key(self, user_ip: str, user_agent: str) -> str:
+        return f"{self.key_prefix}:{short_digest(f'{user_ip}:{user_agent}')}"
+
+    async def hit(self, key: str) -> RateLimitResult:
+        allowed, retry_after_ms = await self._script(
+            keys=[key], args=[self.capacity, self.refill_per_ms, self.period_ms]
+        )
+        return RateLimitResult(
+            allowed=bool(allowed), retry_after=math.ceil(retry_after_ms / 1000)
+        )
+
+
+limiter: RateLimiter | None = None
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models as db_models
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+purged = registry.counter(
+    "refresh_tokens_purged_total", "Удалённые просроченные refresh-токены"
+)
+sweep_duration = registry.histogram(
+    "refresh_tokens_sweep_seconds", "Длительность одного прохода очистки"
+)
+
+
+class RefreshTokenSweeper:
+    """
+    Фоновая очистка просроченных refresh-токенов.
+
+    Токены удаляются пачками по batch_size строк, каждая пачка в своей
+    транзакции. Строки выбираются с FOR UPDATE SKIP LOCKED, поэтому несколько
+    воркеров чистят таблицу параллельно, не дожидаясь друг друга и не
+    блокируя ротацию токенов. За один проход удаляется не больше max_batches
+    пачек, остаток дочищается на следующем проходе.
+    """
+
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        batch_size: int = 1000,
+        interval: float = 600,
+        max_batches: int = 100,
+    ):
+        self.postgres_session = postgres_session
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_batches = max_batches
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def sweep(self) -> int:
+        """Удаляет просроченные токены и возвращает их количество"""
+        total = 0
+        started_at = time.perf_counter()
+        for _ in range(self.max_batches):
+            deleted = await self._purge_batch()
+            total += deleted
+            if deleted < self.batch_size:
+                break
+        sweep_duration.observe(time.perf_counter() - started_at)
+        if total:
+            logger.info("purged %s expired refresh tokens", total)
+        return total
+
+    async def _purge_batch(self) -> int:
+        expired = (
+            select(db_models.RefreshToken.id)
+            .where(db_models.RefreshToken.expires_at < datetime.now())
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.postgres_session() as session:
+            result = await session.execute(
+                delete(db_models.RefreshToken).where(
+                    db_models.RefreshToken.id.in_(expired)
+                )
+            )
+            await session.commit()
+        purged.inc(result.rowcount)
+        return result.rowcount
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("refresh token sweep failed")
+
+
+sweeper: RefreshTokenSweeper | None = None
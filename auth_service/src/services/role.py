@@ -1,22 +1,33 @@
 from abc import ABC, abstractmethod
-from functools import lru_cache
+from functools import partial
 from uuid import UUID
 
 from fastapi import Depends, HTTPException
+from fastapi_pagination import Page, Params
+from fastapi_pagination import paginate as paginate_list
+from fastapi_pagination.ext.sqlalchemy import paginate
+from redis.asyncio import Redis
+from sqlalchemy import delete, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from db.postgres import get_postgres_session
+from db.redis import get_redis
+from db.unit_of_work import run_after_commit
+from models.associations import user_role
 from models.roles import Role
 from schemas.roles import RoleCreateSchema, RoleSchema
 from services.exceptions import (ObjectAlreadyExistsException,
                                  ObjectNotFoundError)
+from services.role_catalog import RoleCatalog, get_role_catalog
+from services.token_watermarks import TokenWatermarks, get_token_watermarks
+from services.user_roles_cache import UserRolesCache, get_user_roles_cache
 
 
 class AbstractRoleService(ABC):
     @abstractmethod
-    async def get_roles_list(self) -> Role | None:
+    async def get_roles_list(self, params: Params) -> Page[RoleSchema]:
         pass
 
     @abstractmethod
@@ -32,25 +43,36 @@ class AbstractRoleService(ABC):
         pass
 
     @abstractmethod
-    async def get_role_by_id(self, role_id: str) -> Role:
+    async def get_role_by_id(self, role_id: str) -> RoleSchema | None:
         pass
 
 
 class RoleService(AbstractRoleService):
-    def __init__(self, postgres_session: AsyncSession):
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        redis: Redis | None = None,
+        catalog: RoleCatalog | None = None,
+        roles_cache: UserRolesCache | None = None,
+        watermarks: TokenWatermarks | None = None,
+    ):
         self.postgres_session = postgres_session
+        self.catalog = catalog or RoleCatalog(postgres_session, redis)
+        self.roles_cache = roles_cache or UserRolesCache(postgres_session, redis)
+        self.watermarks = watermarks or TokenWatermarks(redis)
 
-    async def get_role_by_id(self, role_id: str) -> Role:
+    async def get_role_by_id(self, role_id: str) -> RoleSchema | None:
         """Поиск роли по id"""
-        async with self.postgres_session() as session:
-            result = await session.scalars(select(Role).filter_by(id=role_id))
-            return result.first()
+        return await self.catalog.get(role_id)
+
+    async def get_roles_list(self, params: Params) -> Page[RoleSchema]:
+        """Страница ролей из справочника, без него LIMIT/OFFSET в базе"""
+        roles = self.catalog.roles()
+        if roles is not None:
+            return paginate_list(roles, params)
 
-    async def get_roles_list(self) -> Role | None:
-        """Получение всех ролей"""
         async with self.postgres_session() as session:
-            result = await session.scalars(select(Role))
-            return result.all()
+            return await paginate(session, select(Role).order_by(Role.title), params)
 
     async def create_role(self, role: RoleCreateSchema) -> Role | HTTPException:
         """Создание роли"""
@@ -59,26 +81,45 @@ class RoleService(AbstractRoleService):
         async with self.postgres_session() as session:
             try:
                 session.add(new_role)
-                await session.commit()
+                await session.flush()
                 await session.refresh(new_role)
-                return new_role
             except IntegrityError:
                 raise ObjectAlreadyExistsException
 
+        await run_after_commit(self.postgres_session, self.catalog.notify_changed)
+        return new_role
+
     async def delete_role(self, role_id: str) -> None:
-        """Удаление роли"""
+        """Удаление роли вместе с её назначениями пользователям"""
         role = await self.get_role_by_id(role_id)
 
         if role is None:
             raise ObjectNotFoundError
 
         async with self.postgres_session() as session:
-            await session.delete(role)
-            await session.commit()
+            affected_users = await session.scalars(
+                delete(user_role)
+                .where(user_role.c.role_id == role.id)
+                .returning(user_role.c.user_id)
+            )
+            affected_users = affected_users.all()
+            await session.execute(delete(Role).where(Role.id == role.id))
+            await session.flush()
+
+        await run_after_commit(self.postgres_session, self.catalog.notify_changed)
+        await run_after_commit(
+            self.postgres_session,
+            partial(self.roles_cache.invalidate, *affected_users),
+        )
+        # Удаленная роль остается в выпущенных токенах до их отзыва
+        await run_after_commit(
+            self.postgres_session,
+            partial(self.watermarks.revoke_all, *affected_users),
+        )
 
     async def change_role(
         self, role: RoleCreateSchema, role_id: str
-    ) -> Role | HTTPException:
+    ) -> RoleSchema | HTTPException:
         """Изменение роли"""
         old_role = await self.get_role_by_id(role_id)
 
@@ -88,18 +129,39 @@ class RoleService(AbstractRoleService):
         if old_role.title == role.title:
             return old_role
 
-        old_role.title = role.title
-
         async with self.postgres_session() as session:
-            session.add(old_role)
-            await session.commit()
-            await session.refresh(old_role)
-
-            return old_role
+            updated_role = await session.scalar(
+                update(Role)
+                .where(Role.id == old_role.id)
+                .values(title=role.title)
+                .returning(Role)
+            )
+            affected_users = await session.scalars(
+                select(user_role.c.user_id).where(user_role.c.role_id == old_role.id)
+            )
+            affected_users = affected_users.all()
+            await session.flush()
+
+        await run_after_commit(self.postgres_session, self.catalog.notify_changed)
+        # Название роли попадает в токены, поэтому кэш её владельцев устарел
+        await run_after_commit(
+            self.postgres_session,
+            partial(self.roles_cache.invalidate, *affected_users),
+        )
+        # Бит роли сохраняется, и в выпущенных токенах с маской старая роль
+        # читалась бы под новым названием
+        await run_after_commit(
+            self.postgres_session,
+            partial(self.watermarks.revoke_all, *affected_users),
+        )
+        return updated_role
 
 
-@lru_cache()
 def get_role_service(
     postgres_session: AsyncSession = Depends(get_postgres_session),
+    redis: Redis = Depends(get_redis),
+    catalog: RoleCatalog | None = Depends(get_role_catalog),
+    roles_cache: UserRolesCache | None = Depends(get_user_roles_cache),
+    watermarks: TokenWatermarks | None = Depends(get_token_watermarks),
 ) -> RoleService:
-    return RoleService(postgres_session)
+    return RoleService(postgres_session, redis, catalog, roles_cache, watermarks)
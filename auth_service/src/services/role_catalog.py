@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.pubsub import PubSubListener
+from models.roles import Role
+from schemas.roles import RoleSchema
+
+logger = logging.getLogger(__name__)
+
+
+class RoleCatalog:
+    """
+    Справочник ролей в памяти процесса.
+
+    Загружается при старте и перечитывается по сообщению в канале
+    roles:changed, после переподключения pub/sub и раз в reload_interval
+    секунд. Пока справочник не загружен или подписка оборвана, роли читаются
+    из Postgres, так что устаревание ограничено одним сообщением pub/sub.
+    """
+
+    channel = "roles:changed"
+
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        redis: Redis | None = None,
+        listener: PubSubListener | None = None,
+        reload_interval: int = 300,
+    ):
+        self.postgres_session = postgres_session
+        self.redis = redis
+        self.listener = listener
+        self.reload_interval = reload_interval
+        self._by_id: dict[UUID, RoleSchema] | None = None
+        self._bits: dict[str, int] = {}
+        self._titles: dict[int, str] = {}
+        self._load_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+        if listener is not None:
+            listener.subscribe(self.channel, self._on_changed, self.load)
+
+    async def start(self) -> None:
+        await self.load()
+        self._task = asyncio.create_task(self._reload_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def load(self) -> None:
+        """
+        Загрузки по сообщению, после переподключения и периодическая идут по
+        одной, поэтому более старый снимок не перезапишет более новый
+        """
+        async with self._load_lock:
+            async with self.postgres_session() as session:
+                roles = list(
+                    await session.scalars(select(Role).order_by(Role.title))
+                )
+                by_id = {
+                    role.id: RoleSchema.model_validate(role, from_attributes=True)
+                    for role in roles
+                }
+            self._by_id = by_id
+            self.set_bits({role.title: role.bit for role in roles})
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._by_id is not None
+            and self.listener is not None
+            and self.listener.connected
+        )
+
+    async def get(self, role_id: UUID | str) -> RoleSchema | None:
+        try:
+            role_id = UUID(str(role_id))
+        except ValueError:
+            return None
+        if self.ready:
+            return self._by_id.get(role_id)
+
+        async with self.postgres_session() as session:
+            role = await session.get(Role, role_id)
+        if role is None:
+            return None
+        return RoleSchema.model_validate(role, from_attributes=True)
+
+    def roles(self) -> list[RoleSchema] | None:
+        """Все роли по названию или None, если справочнику нельзя доверять"""
+        if not self.ready:
+            return None
+        return sorted(self._by_id.values(), key=lambda role: role.title)
+
+    def set_bits(self, bits: dict[str, int]) -> None:
+        self._bits = bits
+        self._titles = {bit: title for title, bit in bits.items()}
+
+    def bit(self, title: str) -> int | None:
+        """
+        Бит роли в маске токена. Биты не переиспользуются, поэтому даже
+        устаревший справочник не ошибается в известных ему ролях
+        """
+        return self._bits.get(title)
+
+    def role_mask(self, titles: list[str]) -> int | None:
+        """Маска ролей или None, если какой-то роли нет в справочнике"""
+        mask = 0
+        for title in titles:
+            bit = self._bits.get(title)
+            if bit is None:
+                return None
+            mask |= 1 << bit
+        return mask
+
+    def role_titles(self, mask: int) -> list[str]:
+        titles = []
+        while mask:
+            bit = mask.bit_length() - 1
+            if bit in self._titles:
+                titles.append(self._titles[bit])
+            mask ^= 1 << bit
+        return sorted(titles)
+
+    async def notify_changed(self) -> None:
+        """Сообщает всем воркерам об изменении ролей и перечитывает свой справочник"""
+        if self.redis is not None:
+            await self.redis.publish(self.channel, "changed")
+        if self._by_id is not None:
+            await self.load()
+
+    async def _on_changed(self, message: str) -> None:
+        await self.load()
+
+    async def _reload_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.load()
+            except Exception:
+                logger.exception("role catalog reload failed")
+
+
+catalog: RoleCatalog | None = None
+
+
+async def get_role_catalog() -> RoleCatalog | None:
+    return catalog
@@ -0,0 +1,106 @@
+from typing import AsyncIterable
+
+from redis.asyncio import Redis
+
+from core.metrics import registry
+from utils.bloom_filter import bloom_positions, optimal_bloom_params
+
+filter_negatives = registry.counter(
+    "signup_filter_negatives_total",
+    "Регистрации, для которых фильтр точно исключил занятый логин и email",
+)
+
+
+class TakenIdentifiers:
+    """
+    Фильтр Блума занятых логинов и email в Redis.
+
+    Биты лежат в одной строке Redis и читаются и пишутся одной командой
+    BITFIELD. В имени ключа - размер фильтра и число хэш-функций, поэтому
+    после изменения емкости старый фильтр просто перестает использоваться.
+    Пока фильтр не заполнен из базы (cli/taken_identifiers_cli.py seed),
+    might_be_taken всегда отвечает "возможно", и регистрация проверяет
+    уникальность запросом. Удаленные пользователи из фильтра не пропадают,
+    это дает только лишнюю проверку запросом.
+    """
+
+    key_prefix = "taken_identifiers"
+
+    def __init__(
+        self, redis: Redis, capacity: int = 1_000_000, error_rate: float = 0.001
+    ):
+        self.redis = redis
+        self.size, self.hash_count = optimal_bloom_params(capacity, error_rate)
+        self.key = f"{self.key_prefix}:{self.size}:{self.hash_count}"
+        self.seeded_key = f"{self.key}:seeded"
+
+    @staticmethod
+    def _items(login: str | None, email: str | None) -> list[str]:
+        items = []
+        if login is not None:
+            items.append(f"login:{login}")
+        if email is not None:
+            items.append(f"email:{email}")
+        return items
+
+    def _positions(self, item: str) -> list[int]:
+        return bloom_positions(item, self.size, self.hash_count)
+
+    async def might_be_taken(self, login: str, email: str) -> bool:
+        """False - логин и email точно свободны, True - нужна проверка в базе"""
+        items = self._items(login, email)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(self.seeded_key)
+            bits = pipe.bitfield(self.key)
+            for item in items:
+                for position in self._positions(item):
+                    bits.get("u1", position)
+            bits.execute()
+            seeded, values = await pipe.execute()
+
+        if not seeded:
+            return True
+        # Элемент возможно занят, только если взведены все его биты
+        for start in range(0, len(values), self.hash_count):
+            if all(values[start : start + self.hash_count]):
+                return True
+        filter_negatives.inc()
+        return False
+
+    async def add(self, login: str | None = None, email: str | None = None) -> None:
+        bits = self.redis.bitfield(self.key)
+        for item in self._items(login, email):
+            for position in self._positions(item):
+                bits.set("u1", position, 1)
+        await bits.execute()
+
+    async def seed(self, identifiers: AsyncIterable[tuple[str, str]]) -> int:
+        """
+        Заполняет фильтр парами (логин, email). Биты собираются в памяти и
+        объединяются с ключом через BITOP OR, поэтому добавленные во время
+        заполнения регистрации не теряются
+        """
+        buffer = bytearray((self.size + 7) // 8)
+        count = 0
+        async for login, email in identifiers:
+            for item in self._items(login, email):
+                for position in self._positions(item):
+                    # В Redis нулевой бит - старший бит первого байта
+                    buffer[position >> 3] |= 0x80 >> (position & 7)
+            count += 1
+
+        staging_key = f"{self.key}:staging"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(staging_key, bytes(buffer))
+            pipe.bitop("OR", self.key, self.key, staging_key)
+            pipe.delete(staging_key)
+            pipe.set(self.seeded_key, 1)
+            await pipe.execute()
+        return count
+
+
+taken: TakenIdentifiers | None = None
+
+
+async def get_taken_identifiers() -> TakenIdentifiers | None:
+    return taken
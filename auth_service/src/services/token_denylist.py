@@ -0,0 +1,137 @@
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+
+from db.pubsub import PubSubListener
+from utils.bloom_filter import BloomFilter
+from utils.hashing import token_digest
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTokenDenylist:
+    """
+    Список отозванных access-токенов.
+
+    В Redis хранится ключ по хэшу токена. Каждый воркер держит локальный
+    фильтр Блума, который обновляется через pub/sub, поэтому в Redis уходят
+    только токены, которые фильтр считает возможно отозванными. Без подписки
+    (например, в тестах или при обрыве соединения) проверка идет сразу в Redis.
+    """
+
+    key_prefix = "revoked_access_token"
+    channel = "revoked_access_tokens"
+
+    def __init__(
+        self,
+        redis: Redis,
+        listener: PubSubListener | None = None,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        rebuild_interval: int = 600,
+    ):
+        self.redis = redis
+        self.listener = listener
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self._bloom: BloomFilter | None = None
+        self._pending: list[str] | None = None
+        self._rebuild_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+        if listener is not None:
+            listener.subscribe(self.channel, self._on_revoked, self.rebuild)
+
+    def _key(self, digest: str) -> str:
+        return f"{self.key_prefix}:{digest}"
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._rebuild_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def revoke(self, token: str, ttl: int) -> None:
+        digest = token_digest(token)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(digest), 1, ex=ttl)
+            pipe.publish(self.channel, digest)
+            await pipe.execute()
+        await self._on_revoked(digest)
+
+    async def is_revoked(self, token: str) -> bool:
+        digest = token_digest(token)
+        if self._filter_ready() and digest not in self._bloom:
+            return False
+        return bool(await self.redis.exists(self._key(digest)))
+
+    async def are_revoked(self, tokens: list[str]) -> list[bool]:
+        """Проверка пачки токенов: фильтр Блума и не больше одного MGET в Redis"""
+        digests = [token_digest(token) for token in tokens]
+        revoked = [False] * len(tokens)
+        if self._filter_ready():
+            suspects = [i for i, x in enumerate(digests) if x in self._bloom]
+        else:
+            suspects = list(range(len(tokens)))
+        if not suspects:
+            return revoked
+
+        values = await self.redis.mget([self._key(digests[i]) for i in suspects])
+        for i, value in zip(suspects, values):
+            revoked[i] = value is not None
+        return revoked
+
+    async def rebuild(self) -> None:
+        """
+        Пересобирает фильтр из Redis, заодно выбрасывая истекшие записи.
+        Пересборки (периодическая и после переподключения) идут по одной:
+        иначе одна из них поставила бы фильтр без отзывов, пришедших во время
+        сканирования другой, и отозванный токен снова принимался бы
+        """
+        async with self._rebuild_lock:
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            pending: list[str] = []
+            self._pending = pending
+            try:
+                prefix_length = len(self.key_prefix) + 1
+                async for key in self.redis.scan_iter(
+                    match=f"{self.key_prefix}:*", count=1000
+                ):
+                    bloom.add(key.decode()[prefix_length:])
+                for digest in pending:
+                    bloom.add(digest)
+                self._bloom = bloom
+            finally:
+                self._pending = None
+
+    def _filter_ready(self) -> bool:
+        return (
+            self._bloom is not None
+            and self.listener is not None
+            and self.listener.connected
+        )
+
+    async def _on_revoked(self, digest: str) -> None:
+        if self._bloom is not None:
+            self._bloom.add(digest)
+        if self._pending is not None:
+            self._pending.append(digest)
+
+    async def _rebuild_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("access token denylist rebuild failed")
+
+
+denylist: AccessTokenDenylist | None = None
+
+
+async def get_token_denylist() -> AccessTokenDenylist | None:
+    return denylist
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from typing import Any
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from core.config import ISSUED_AT_MS_CLAIM, settings
+from db.pubsub import PubSubListener
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_BATCH_SIZE = 1000
+# Отметки до перехода на миллисекунды записаны в секундах
+SECONDS_WATERMARK_LIMIT = 10**11
+
+
+class TokenWatermarks:
+    """
+    Отзыв всех access-токенов пользователя одной записью.
+
+    По пользователю в Redis хранится время tokens_not_before в миллисекундах:
+    токены, выпущенные раньше него (claim iat_ms), недействительны. Запись
+    живет столько же, сколько access-токен, после этого все токены,
+    выпущенные до нее, истекли сами.
+    Таких записей немного, поэтому каждый воркер держит в памяти их полную
+    копию, которую обновляет через pub/sub, и проверка токена обходится без
+    Redis. Без подписки проверка идет в Redis.
+
+    У токенов без iat_ms время выпуска берется из iat с точностью до
+    секунды и считается началом этой секунды, так что такие токены,
+    выпущенные в секунду отзыва, тоже отзываются.
+    """
+
+    key_prefix = "tokens_not_before"
+    channel = "tokens_not_before:updated"
+
+    def __init__(
+        self,
+        redis: Redis,
+        listener: PubSubListener | None = None,
+        ttl: int | None = None,
+        reload_interval: int = 600,
+    ):
+        self.redis = redis
+        self.listener = listener
+        # Отметка нужна, пока живы выпущенные до нее access-токены
+        self.ttl = ttl or settings.access_token_exp_hours * 3600
+        self.reload_interval = reload_interval
+        self._l1: dict[str, int] | None = None
+        self._pending: dict[str, int] | None = None
+        self._reload_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+        if listener is not None:
+            listener.subscribe(self.channel, self._on_updated, self.reload)
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._reload_periodically())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def revoke_all(self, *user_ids: UUID | str) -> None:
+        """Отзывает все выпущенные до этого момента access-токены пользователей"""
+        user_ids = [str(x) for x in user_ids]
+        if not user_ids:
+            return
+
+        not_before = time.time_ns() // 1_000_000
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.set(self._key(user_id), not_before, ex=self.ttl)
+            for start in range(0, len(user_ids), PUBLISH_BATCH_SIZE):
+                batch = user_ids[start : start + PUBLISH_BATCH_SIZE]
+                pipe.publish(self.channel, f"{not_before}:{','.join(batch)}")
+            await pipe.execute()
+        self._remember(not_before, user_ids)
+
+    async def is_revoked(self, payload: dict[str, Any]) -> bool:
+        return (await self.are_revoked([payload]))[0]
+
+    async def are_revoked(self, payloads: list[dict[str, Any]]) -> list[bool]:
+        """Проверка пачки токенов: по копии в памяти или одним MGET в Redis"""
+        user_ids = [payload["user_id"] for payload in payloads]
+        if self._ready():
+            watermarks = [self._l1.get(user_id) for user_id in user_ids]
+        elif user_ids:
+            values = await self.redis.mget([self._key(x) for x in user_ids])
+            watermarks = [
+                self._not_before(x) if x is not None else None for x in values
+            ]
+        else:
+            watermarks = []
+
+        return [
+            not_before is not None and self._issued_at(payload) < not_before
+            for payload, not_before in zip(payloads, watermarks)
+        ]
+
+    async def reload(self) -> None:
+        """
+        Перечитывает отметки из Redis, истекшие записи отпадают сами.
+        Перечитывания идут по одной, чтобы копия без отметок, пришедших во
+        время чтения, не заменила собой полную
+        """
+        async with self._reload_lock:
+            pending: dict[str, int] = {}
+            self._pending = pending
+            try:
+                prefix_length = len(self.key_prefix) + 1
+                keys = [
+                    key
+                    async for key in self.redis.scan_iter(
+                        match=f"{self.key_prefix}:*", count=1000
+                    )
+                ]
+                l1 = {}
+                if keys:
+                    for key, value in zip(keys, await self.redis.mget(keys)):
+                        if value is not None:
+                            l1[key.decode()[prefix_length:]] = self._not_before(
+                                value
+                            )
+                for user_id, not_before in pending.items():
+                    l1[user_id] = max(l1.get(user_id, 0), not_before)
+                self._l1 = l1
+            finally:
+                self._pending = None
+
+    def _issued_at(self, payload: dict[str, Any]) -> int:
+        """Время выпуска токена в миллисекундах"""
+        if ISSUED_AT_MS_CLAIM in payload:
+            return payload[ISSUED_AT_MS_CLAIM]
+        # У токенов, выпущенных до появления iat, время выпуска выводится из exp
+        return payload.get("iat", payload["exp"] - self.ttl) * 1000
+
+    @staticmethod
+    def _not_before(value: bytes | str | int) -> int:
+        not_before = int(value)
+        if not_before < SECONDS_WATERMARK_LIMIT:
+            return not_before * 1000
+        return not_before
+
+    def _ready(self) -> bool:
+        return (
+            self._l1 is not None
+            and self.listener is not None
+            and self.listener.connected
+        )
+
+    def _remember(self, not_before: int, user_ids: list[str]) -> None:
+        for watermarks in (self._l1, self._pending):
+            if watermarks is None:
+                continue
+            for user_id in user_ids:
+                watermarks[user_id] = max(watermarks.get(user_id, 0), not_before)
+
+    async def _on_updated(self, message: str) -> None:
+        not_before, _, user_ids = message.partition(":")
+        self._remember(self._not_before(not_before), user_ids.split(","))
+
+    async def _reload_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("token watermarks reload failed")
+
+
+watermarks: TokenWatermarks | None = None
+
+
+async def get_token_watermarks() -> TokenWatermarks | None:
+    return watermarks
@@ -1,21 +1,55 @@
-from functools import lru_cache
+import json
+from datetime import datetime
+from functools import partial
 from uuid import UUID
 
 from fastapi import Depends
-from sqlalchemy import select
+from redis.asyncio import Redis
+from sqlalchemy import Select, delete, exists, func, or_, select, text, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 import models as db_models
+from core.config import settings
+from core.metrics import registry
 from db.postgres import get_postgres_session
-from schemas.users import CreateUserSchema, UpdateUserSchema
+from db.redis import get_redis
+from db.unit_of_work import run_after_commit, short_session
+from schemas.users import (CreateUserSchema, HistoryTotal, LoginHistoryPageSchema,
+                           UpdateUserSchema)
 from services.exceptions import ConflictError, ObjectNotFoundError
+from services.login_history_writer import (LoginHistoryWriter,
+                                           get_login_history_writer)
+from services.login_lookup_cache import LoginLookupCache, get_login_lookup_cache
+from services.password_hasher import hash_password
+from services.taken_identifiers import TakenIdentifiers, get_taken_identifiers
+from services.token_watermarks import TokenWatermarks, get_token_watermarks
+from utils.cursor import decode_cursor, encode_cursor
+
+existence_checks = registry.counter(
+    "signup_existence_checks_total",
+    "Проверки занятости логина и email запросом до хэширования пароля",
+)
+early_conflicts = registry.counter(
+    "signup_early_conflicts_total", "Регистрации, отклоненные до хэширования пароля"
+)
 
 
 class UserService:
-    def __init__(self, postgres_session: AsyncSession):
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        history_writer: LoginHistoryWriter | None = None,
+        watermarks: TokenWatermarks | None = None,
+        taken: TakenIdentifiers | None = None,
+        login_cache: LoginLookupCache | None = None,
+    ):
         self.postgres_session = postgres_session
+        self.history_writer = history_writer
+        self.watermarks = watermarks
+        self.taken = taken
+        self.login_cache = login_cache
 
     async def get_user_by_id(self, user_id: UUID) -> db_models.User:
         async with self.postgres_session() as session:
@@ -50,55 +84,171 @@ class UserService:
     async def update_user(
         self, user_id: UUID, user_data: UpdateUserSchema
     ) -> db_models.User:
+        changes = {
+            field: getattr(user_data, field) for field in user_data.model_fields_set
+        }
+        # хэшируем до открытия сессии, чтобы не держать соединение
+        if "password" in changes:
+            changes["password"] = await hash_password(changes["password"])
+
         async with self.postgres_session() as session:
             user = await session.get(db_models.User, user_id)
 
             if not user:
                 raise ObjectNotFoundError
 
-            for field in user_data.model_fields_set:
-                val = getattr(user_data, field)
+            old_login = user.login
+            for field, val in changes.items():
                 setattr(user, field, val)
 
             try:
-                await session.commit()
+                await session.flush()
             except IntegrityError:
                 raise ConflictError
 
-            return user
+            # Иначе украденный refresh-токен выдал бы новый access-токен
+            if "password" in changes:
+                await session.execute(
+                    delete(db_models.RefreshToken).where(
+                        db_models.RefreshToken.user_id == user_id
+                    )
+                )
 
-    async def get_user_history(self, user_id: UUID) -> list[db_models.LoginHistory]:
-        async with self.postgres_session() as session:
-            results = await session.execute(
-                select(db_models.User)
-                .where(db_models.User.id == user_id)
-                .options(selectinload(db_models.User.login_history))
+        await self.remember_identifiers(changes.get("login"), changes.get("email"))
+        if "login" in changes or "password" in changes:
+            await self.invalidate_logins(old_login, user.login)
+        # После смены пароля старые access-токены тоже недействительны
+        if "password" in changes and self.watermarks is not None:
+            await run_after_commit(
+                self.postgres_session, partial(self.watermarks.revoke_all, user_id)
             )
+        return user
 
-            user = results.scalars().first()
-            if not user:
+    async def get_user_history(
+        self,
+        user_id: UUID,
+        size: int,
+        cursor: str | None = None,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        total: HistoryTotal | None = None,
+    ) -> LoginHistoryPageSchema:
+        """
+        Страница истории входов от новых к старым. Следующая страница
+        запрашивается по курсору (event_date, id) последней записи, фильтры
+        по дате позволяют Postgres отбросить лишние партиции
+        """
+        history = db_models.LoginHistory
+        filters = [history.user_id == user_id]
+        if date_from:
+            filters.append(history.event_date >= date_from)
+        if date_to:
+            filters.append(history.event_date < date_to)
+
+        stmt = select(history).where(*filters)
+        if cursor:
+            stmt = stmt.where(
+                tuple_(history.event_date, history.id) < decode_cursor(cursor)
+            )
+        stmt = stmt.order_by(history.event_date.desc(), history.id.desc()).limit(
+            size + 1
+        )
+
+        async with self.postgres_session() as session:
+            items = list(await session.scalars(stmt))
+            # Пустая страница может означать несуществующего пользователя
+            if not items and not await session.get(db_models.User, user_id):
                 raise ObjectNotFoundError
 
-            login_history = user.login_history
+            page = LoginHistoryPageSchema(items=items[:size], size=size)
+            if len(items) > size:
+                last = items[size - 1]
+                page.next_cursor = encode_cursor(last.event_date, last.id)
+
+            count_stmt = select(history.id).where(*filters)
+            if total == HistoryTotal.exact:
+                page.total = await session.scalar(
+                    select(func.count()).select_from(count_stmt.subquery())
+                )
+            elif total == HistoryTotal.estimated:
+                page.total = await self._estimate_rows(session, count_stmt)
+                page.total_is_estimate = True
+
+            return page
+
+    @staticmethod
+    async def _estimate_rows(session: AsyncSession, stmt: Select) -> int:
+        """Оценка числа строк по плану запроса, без обхода таблицы"""
+        compiled = stmt.compile(
+            dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = await session.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def ensure_available(self, login: str, email: str) -> None:
+        """
+        Отклоняет занятые логин или email до хэширования пароля. Если фильтр
+        занятых говорит, что оба свободны, запрос в базу не нужен, иначе
+        занятость проверяется по уникальным индексам. Гонку двух регистраций
+        по-прежнему разрешает уникальное ограничение
+        """
+        if self.taken is not None and not await self.taken.might_be_taken(
+            login, email
+        ):
+            return
+
+        existence_checks.inc()
+        user = db_models.User
+        # Сессия запроса открыла бы транзакцию и держала соединение
+        # на время хэширования пароля
+        async with short_session(self.postgres_session) as session:
+            taken = await session.scalar(
+                select(exists().where(or_(user.login == login, user.email == email)))
+            )
+        if taken:
+            early_conflicts.inc()
+            raise ConflictError
+
+    async def remember_identifiers(
+        self, login: str | None = None, email: str | None = None
+    ) -> None:
+        """Заносит логин и email в фильтр занятых после коммита"""
+        if self.taken is not None and (login or email):
+            await run_after_commit(
+                self.postgres_session, partial(self.taken.add, login, email)
+            )
 
-            return login_history
+    async def invalidate_logins(self, *logins: str) -> None:
+        """Сбрасывает кэш поиска по логинам после коммита"""
+        if self.login_cache is not None and logins:
+            await run_after_commit(
+                self.postgres_session,
+                partial(self.login_cache.invalidate, *set(logins)),
+            )
 
     async def create_user(self, user_data: CreateUserSchema) -> db_models.User:
+        await self.ensure_available(user_data.login, user_data.email)
+        password_hash = await hash_password(user_data.password)
         async with self.postgres_session() as session:
             user = db_models.User(
                 login=user_data.login,
-                password=user_data.password,
+                password_hash=password_hash,
                 first_name=user_data.first_name,
                 last_name=user_data.last_name,
                 email=user_data.email,
             )
             session.add(user)
             try:
-                await session.commit()
+                await session.flush()
             except IntegrityError:
                 raise ConflictError
 
-            return user
+        await self.remember_identifiers(user.login, user.email)
+        # Логин мог попасть в кэш как несуществующий
+        await self.invalidate_logins(user.login)
+        return user
 
     async def get_user_roles(self, user_id: str) -> list[db_models.Role]:
         async with self.postgres_session() as session:
@@ -116,6 +266,10 @@ class UserService:
             return user_roles
 
     async def save_login_history(self, user_id: str, user_agent: str) -> None:
+        if self.history_writer is not None:
+            self.history_writer.submit(user_id, user_agent)
+            return
+
         async with self.postgres_session() as session:
             login_history = db_models.LoginHistory(
                 user_id=user_id,
@@ -123,11 +277,26 @@ class UserService:
                 user_agent=user_agent,
             )
             session.add(login_history)
-            await session.commit()
+            await session.flush()
 
 
-@lru_cache()
 def get_user_service(
     postgres_session: AsyncSession = Depends(get_postgres_session),
+    history_writer: LoginHistoryWriter | None = Depends(get_login_history_writer),
+    redis: Redis = Depends(get_redis),
+    watermarks: TokenWatermarks | None = Depends(get_token_watermarks),
+    taken: TakenIdentifiers | None = Depends(get_taken_identifiers),
+    login_cache: LoginLookupCache | None = Depends(get_login_lookup_cache),
 ) -> UserService:
-    return UserService(postgres_session)
+    return UserService(
+        postgres_session,
+        history_writer,
+        watermarks or TokenWatermarks(redis),
+        taken
+        or TakenIdentifiers(
+            redis,
+            capacity=settings.signup_filter_capacity,
+            error_rate=settings.signup_filter_error_rate,
+        ),
+        login_cache or LoginLookupCache(redis),
+    )
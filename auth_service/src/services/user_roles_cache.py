@@ -0,0 +1,172 @@
+import json
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.metrics import registry
+from db.pubsub import PubSubListener
+from models.associations import user_role
+from models.roles import Role
+
+l1_hits = registry.counter("user_roles_cache_l1_hits_total", "Роли найдены в памяти")
+redis_hits = registry.counter(
+    "user_roles_cache_redis_hits_total", "Роли найдены в Redis"
+)
+misses = registry.counter("user_roles_cache_misses_total", "Роли прочитаны из Postgres")
+
+# Сообщение об инвалидации всех пользователей сразу, например при удалении роли
+ALL_USERS = "*"
+INVALIDATE_BATCH_SIZE = 1000
+
+# Роли, прочитанные из Postgres, записываются, только если с момента чтения
+# поколение пользователя не менялось: иначе инвалидация, прошедшая во время
+# запроса, была бы затерта снятой ролью
+GUARDED_SET_SCRIPT = """
+if (redis.call("GET", KEYS[2]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[3])
+return 1
+"""
+
+
+class UserRolesCache:
+    """
+    Названия ролей пользователя для выпуска токенов.
+
+    Основная копия лежит в Redis с TTL. Поверх неё каждый воркер держит
+    небольшой LRU в памяти, которому доверяет только при живой подписке на
+    канал инвалидации. Инвалидация увеличивает поколение пользователя,
+    удаляет ключи в Redis и рассылает id пользователей остальным воркерам.
+    """
+
+    key_prefix = "user_roles"
+    channel = "user_roles:invalidated"
+
+    def __init__(
+        self,
+        postgres_session: AsyncSession,
+        redis: Redis | None = None,
+        listener: PubSubListener | None = None,
+        ttl: int = 300,
+        l1_size: int = 10_000,
+    ):
+        self.postgres_session = postgres_session
+        self.redis = redis
+        self.listener = listener
+        self.ttl = ttl
+        self.l1_size = l1_size
+        self._l1: OrderedDict[str, tuple[float, list[str]]] = OrderedDict()
+        self._guarded_set = redis.register_script(GUARDED_SET_SCRIPT) if redis else None
+
+        if listener is not None:
+            listener.subscribe(self.channel, self._on_invalidated, self._clear_l1)
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+    def _generation_key(self, user_id: str) -> str:
+        return f"{self.key_prefix}:generation:{user_id}"
+
+    def _l1_enabled(self) -> bool:
+        return self.listener is not None and self.listener.connected
+
+    async def get(self, user_id: UUID | str) -> list[str]:
+        user_id = str(user_id)
+        if self._l1_enabled():
+            entry = self._l1.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self._l1.move_to_end(user_id)
+                l1_hits.inc()
+                return entry[1]
+
+        generation = None
+        if self.redis is not None:
+            cached, generation = await self.redis.mget(
+                [self._key(user_id), self._generation_key(user_id)]
+            )
+            if cached is not None:
+                redis_hits.inc()
+                roles = json.loads(cached)
+                self._remember(user_id, roles)
+                return roles
+
+        misses.inc()
+        async with self.postgres_session() as session:
+            roles = list(
+                await session.scalars(
+                    select(Role.title)
+                    .join(user_role, user_role.c.role_id == Role.id)
+                    .where(user_role.c.user_id == user_id)
+                    .order_by(Role.title)
+                )
+            )
+        if self._guarded_set is None:
+            self._remember(user_id, roles)
+        elif await self._guarded_set(
+            keys=[self._key(user_id), self._generation_key(user_id)],
+            args=[(generation or b"").decode(), json.dumps(roles), self.ttl],
+        ):
+            self._remember(user_id, roles)
+        return roles
+
+    async def set(self, user_id: UUID | str, roles: list[str]) -> None:
+        user_id = str(user_id)
+        if self.redis is not None:
+            await self.redis.set(self._key(user_id), json.dumps(roles), ex=self.ttl)
+        self._remember(user_id, roles)
+
+    async def invalidate(self, *user_ids: UUID | str) -> None:
+        user_ids = [str(x) for x in user_ids]
+        if not user_ids:
+            return
+        for user_id in user_ids:
+            self._l1.pop(user_id, None)
+        if self.redis is None:
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            # Сначала поколение, потом удаление: запись из уже начатого чтения
+            # либо будет удалена, либо отклонена по поколению
+            for user_id in user_ids:
+                generation_key = self._generation_key(user_id)
+                pipe.incr(generation_key)
+                pipe.expire(generation_key, self.ttl)
+            for start in range(0, len(user_ids), INVALIDATE_BATCH_SIZE):
+                batch = user_ids[start : start + INVALIDATE_BATCH_SIZE]
+                pipe.delete(*(self._key(x) for x in batch))
+            if len(user_ids) > INVALIDATE_BATCH_SIZE:
+                pipe.publish(self.channel, ALL_USERS)
+            else:
+                pipe.publish(self.channel, ",".join(user_ids))
+            await pipe.execute()
+
+    def _remember(self, user_id: str, roles: list[str]) -> None:
+        if not self._l1_enabled():
+            return
+        # В памяти запись живёт не дольше минуты на случай потерянной инвалидации
+        self._l1[user_id] = (time.monotonic() + min(self.ttl, 60), roles)
+        self._l1.move_to_end(user_id)
+        while len(self._l1) > self.l1_size:
+            self._l1.popitem(last=False)
+
+    async def _on_invalidated(self, message: str) -> None:
+        if message == ALL_USERS:
+            await self._clear_l1()
+            return
+        for user_id in message.split(","):
+            self._l1.pop(user_id, None)
+
+    async def _clear_l1(self) -> None:
+        self._l1.clear()
+
+
+cache: UserRolesCache | None = None
+
+
+async def get_user_roles_cache() -> UserRolesCache | None:
+    return cache
@@ -1,15 +1,19 @@
 ADMIN_LOGIN = "admin_user"
 ADMIN_PASSWORD = "admin_password"
 ADMIN_UUID = "55804ea9-a256-4fe2-903b-7cfaa6c4c062"
+ADMIN_EMAIL = "admin@example.com"
 
 MODERATOR_LOGIN = "moderator_user"
 MODERATOR_PASSWORD = "moderator_password"
 MODERATOR_UUID = "66958ba0-edc2-4dc9-97ed-7a436a2c96ab"
+MODERATOR_EMAIL = "moderator@example.com"
 
 ROLE_ADMIN_UUID = "2e796639-9b3f-49c3-9c59-9c3302ae5e59"
 ROLE_ADMIN_TITLE = "admin"
 TEST_ROLE_UUID = "5e796639-9b3f-49c3-9c59-9c3302ae5e59"
 
+USER_AGENT = "pytest"
+
 ROLE_NOT_FOUND_RESPONSE = {"detail": "role not found"}
 FORBIDDEN_RESPONSE = {"detail": "Forbidden"}
 NOT_AUTHENTICATED_RESPONSE = {"detail": "Not authenticated"}
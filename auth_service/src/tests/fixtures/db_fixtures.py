@@ -8,10 +8,11 @@ from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
 from sqlalchemy.pool import NullPool
 
 from core.config import JWT_ALGORITHM, settings
-from db.postgres import Base, get_postgres_session
+from db.postgres import Base, get_session_maker
 from main import app
 from models import LoginHistory, RefreshToken, Role, User
 from tests import constants
+from utils.hashing import token_digest
 
 DATABASE_URL_TEST = settings.postgres_url
 
@@ -28,11 +29,11 @@ metadata = Base.metadata
 metadata.bind = engine_test
 
 
-async def override_get_async_session():
-    yield async_session_maker
+async def override_get_session_maker():
+    return async_session_maker
 
 
-app.dependency_overrides[get_postgres_session] = override_get_async_session
+app.dependency_overrides[get_session_maker] = override_get_session_maker
 
 
 @pytest.fixture(autouse=True, scope="function")
@@ -61,6 +62,7 @@ async def admin():
         admin_user = User(
             login=constants.ADMIN_LOGIN,
             password=constants.ADMIN_PASSWORD,
+            email=constants.ADMIN_EMAIL,
             first_name="Admin",
             last_name="User",
         )
@@ -97,6 +99,7 @@ async def moderator():
         moderator = User(
             login=constants.MODERATOR_LOGIN,
             password=constants.MODERATOR_PASSWORD,
+            email=constants.MODERATOR_EMAIL,
             first_name="Moderator",
             last_name="Bla",
         )
@@ -135,7 +138,7 @@ async def refresh_token_moderator(moderator):
         refresh = RefreshToken(
             user_id=moderator.id,
             expires_at=valid_till,
-            token=token,
+            token_hash=token_digest(token),
         )
         session.add(refresh)
         await session.commit()
@@ -198,6 +201,7 @@ async def login_multiple_times(moderator):
                 user_id=moderator.id,
                 event_date=datetime.now() - timedelta(days=i),
                 success=True,
+                user_agent=constants.USER_AGENT,
             )
             for i in range(0, 5)
         ]
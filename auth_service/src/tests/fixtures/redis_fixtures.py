@@ -1,3 +1,4 @@
+import pytest
 import redis.asyncio as redis
 
 from core.config import settings
@@ -15,3 +16,12 @@ async def override_get_redis():
 
 
 app.dependency_overrides[get_redis] = override_get_redis
+
+
+@pytest.fixture(autouse=True, scope="function")
+async def flush_redis():
+    # Кэши в Redis не должны переживать пересоздание базы между тестами
+    yield
+    redis_client = redis.Redis(host=settings.redis_host, port=settings.redis_port)
+    await redis_client.flushdb()
+    await redis_client.aclose()
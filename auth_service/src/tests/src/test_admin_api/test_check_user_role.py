@@ -0,0 +1,45 @@
+import pytest
+from fastapi import status
+
+from tests import constants
+
+
+class TestAdminCheckUserRoleApi:
+    def setup_method(self):
+        self.endpoint = "/api/v1/users/"
+
+    @pytest.mark.parametrize(
+        "title, expected_status",
+        [
+            ("moderator", status.HTTP_204_NO_CONTENT),
+            (constants.ROLE_ADMIN_TITLE, status.HTTP_404_NOT_FOUND),
+        ],
+    )
+    @pytest.mark.asyncio
+    async def test_check_own_role(
+        self, async_client, moderator, headers_moderator, title, expected_status
+    ):
+        response = await async_client.get(
+            url=f"{self.endpoint}{moderator.id}/roles/{title}",
+            headers=headers_moderator,
+        )
+        assert response.status_code == expected_status
+
+    @pytest.mark.asyncio
+    async def test_check_role_by_admin(self, async_client, moderator, headers_admin):
+        response = await async_client.get(
+            url=f"{self.endpoint}{moderator.id}/roles/moderator",
+            headers=headers_admin,
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    @pytest.mark.asyncio
+    async def test_check_other_user_role(
+        self, async_client, admin, moderator, headers_moderator
+    ):
+        title = constants.ROLE_ADMIN_TITLE
+        response = await async_client.get(
+            url=f"{self.endpoint}{constants.ADMIN_UUID}/roles/{title}",
+            headers=headers_moderator,
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,42 @@
+import pytest
+from fastapi import status
+
+from core.config import settings
+
+
+class TestAuthIntrospect:
+    def setup_method(self):
+        self.endpoint = "/api/v1/auth/introspect"
+
+    @pytest.mark.asyncio
+    async def test_introspect(
+        self, async_client, moderator, access_token_moderator, refresh_token_moderator
+    ):
+        tokens = [access_token_moderator, "not a token", refresh_token_moderator]
+        response = await async_client.post(self.endpoint, json={"tokens": tokens})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "max-age" in response.headers["cache-control"]
+        results = response.json()["tokens"]
+        assert [x["active"] for x in results] == [True, False, False]
+        assert results[0]["user_id"] == str(moderator.id)
+        assert results[0]["roles"] == ["moderator"]
+
+        # После выхода access-токен попадает в список отозванных
+        await async_client.post(
+            "/api/v1/auth/logout",
+            json={
+                "access_token": access_token_moderator,
+                "refresh_token": refresh_token_moderator,
+            },
+        )
+        response = await async_client.post(self.endpoint, json={"tokens": tokens})
+        assert [x["active"] for x in response.json()["tokens"]] == [False] * 3
+
+    @pytest.mark.asyncio
+    async def test_introspect_too_many_tokens(self, async_client):
+        response = await async_client.post(
+            self.endpoint,
+            json={"tokens": ["token"] * (settings.introspect_max_tokens + 1)},
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,70 @@
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from fastapi import status
+
+from core import jwt_keys
+from core.config import JWT_ALGORITHM, settings
+from core.jwt_keys import KeyRing
+
+
+@pytest.fixture
+def keyring(tmp_path, monkeypatch):
+    for kid in ("2026-01", "2026-02"):
+        pem = ed25519.Ed25519PrivateKey.generate().private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        (tmp_path / f"{kid}.pem").write_bytes(pem)
+    monkeypatch.setattr(settings, "jwt_keys_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "jwt_active_kid", "2026-01")
+    keyring = KeyRing.from_settings()
+    monkeypatch.setattr(jwt_keys, "keyring", keyring)
+    return keyring
+
+
+class TestJWKS:
+    def setup_method(self):
+        self.endpoint = "/auth/.well-known/jwks.json"
+
+    def test_sign_with_active_key(self, keyring):
+        token = keyring.encode({"user_id": "user"})
+
+        assert jwt.get_unverified_header(token) == {
+            "alg": "EdDSA",
+            "kid": "2026-01",
+            "typ": "JWT",
+        }
+        assert keyring.decode(token) == {"user_id": "user"}
+
+    def test_legacy_hs256(self, keyring):
+        token = jwt.encode(
+            {"user_id": "user"}, settings.jwt_secret_key, algorithm=JWT_ALGORITHM
+        )
+        assert keyring.decode(token) == {"user_id": "user"}
+
+        keyring.accept_legacy = False
+        with pytest.raises(jwt.InvalidTokenError):
+            keyring.decode(token)
+
+    @pytest.mark.asyncio
+    async def test_jwks(self, async_client, keyring):
+        response = await async_client.get(self.endpoint)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "max-age" in response.headers["cache-control"]
+        # Проверяем токен только по опубликованным ключам
+        jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        assert [key.key_id for key in jwk_set.keys] == ["2026-01", "2026-02"]
+        token = keyring.encode({"user_id": "user"})
+        key = jwk_set["2026-01"]
+        assert jwt.decode(token, key.key, algorithms=[key.algorithm_name]) == {
+            "user_id": "user"
+        }
+
+        response = await async_client.get(
+            self.endpoint, headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
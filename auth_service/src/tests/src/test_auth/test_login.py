@@ -1,6 +1,9 @@
+import asyncio
+
 import pytest
 from fastapi import status
 
+from core.config import settings
 from tests import constants
 
 
@@ -105,3 +108,48 @@ class TestAuthLogin:
         response_data = response.json()
         for field in expected_fields:
             assert field in response_data
+
+    @pytest.mark.asyncio
+    async def test_login_blocked_after_failures(self, async_client, admin, monkeypatch):
+        monkeypatch.setattr(settings, "login_max_failures", 2)
+        credentials = {"login": constants.ADMIN_LOGIN, "password": "wrong"}
+
+        for _ in range(2):
+            response = await async_client.post(url=self.endpoint, json=credentials)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # Верный пароль не проверяется, пока не истекло окно неудачных попыток
+        credentials["password"] = constants.ADMIN_PASSWORD
+        response = await async_client.post(url=self.endpoint, json=credentials)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    @pytest.mark.asyncio
+    async def test_login_after_signup_of_unknown_login(self, async_client):
+        credentials = {"login": "new_user", "password": "new_password"}
+        response = await async_client.post(url=self.endpoint, json=credentials)
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        # Регистрация сбрасывает закэшированный отрицательный ответ
+        response = await async_client.post(
+            url="/api/v1/auth/signup",
+            json={**credentials, "first_name": "New", "last_name": "User"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = await async_client.post(url=self.endpoint, json=credentials)
+        assert response.status_code == status.HTTP_200_OK
+
+    @pytest.mark.asyncio
+    async def test_parallel_guesses_respect_limit(
+        self, async_client, admin, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "login_max_failures", 2)
+        credentials = {"login": constants.ADMIN_LOGIN, "password": "wrong"}
+
+        responses = await asyncio.gather(
+            *(async_client.post(url=self.endpoint, json=credentials) for _ in range(6))
+        )
+
+        statuses = sorted(response.status_code for response in responses)
+        assert statuses == [status.HTTP_400_BAD_REQUEST] * 2 + [
+            status.HTTP_429_TOO_MANY_REQUESTS
+        ] * 4
@@ -0,0 +1,28 @@
+import pytest
+from redis.asyncio import Redis
+
+from core.config import settings
+from services.login_lookup_cache import LoginLookup, LoginLookupCache
+
+
+class TestLoginLookupCache:
+    @pytest.mark.asyncio
+    async def test_invalidation_during_read_wins(self):
+        redis = Redis(host=settings.redis_host, port=settings.redis_port)
+        cache = LoginLookupCache(redis)
+
+        async def load_before_password_change(login: str) -> LoginLookup:
+            # Смена пароля закоммичена, пока вход читал старый хэш
+            await cache.invalidate(login)
+            return LoginLookup("user-id", "old-hash")
+
+        async def load(login: str) -> LoginLookup:
+            return LoginLookup("user-id", "new-hash")
+
+        try:
+            await cache.get("login", load_before_password_change)
+
+            lookup = await cache.get("login", load)
+            assert lookup.password_hash == "new-hash"
+        finally:
+            await redis.aclose()
@@ -8,6 +8,7 @@ from sqlalchemy.sql import select
 from models import RefreshToken
 from tests import constants
 from tests.fixtures.db_fixtures import async_session_maker
+from utils.hashing import token_digest
 
 
 class TestAuthLogout:
@@ -41,6 +42,28 @@ class TestAuthLogout:
         )
         assert response2.status_code == status.HTTP_200_OK
 
+    @pytest.mark.asyncio
+    async def test_access_token_revoked_after_logout(
+        self, async_client, moderator, access_token_moderator, refresh_token_moderator
+    ):
+        user_url = f"/api/v1/users/{moderator.id}"
+        headers = {"Authorization": f"Bearer {access_token_moderator}"}
+
+        response1 = await async_client.get(user_url, headers=headers)
+        assert response1.status_code == status.HTTP_200_OK
+
+        await async_client.post(
+            self.endpoint,
+            json={
+                "access_token": access_token_moderator,
+                "refresh_token": refresh_token_moderator,
+            },
+        )
+
+        # После выхода access токен попадает в список отозванных
+        response2 = await async_client.get(user_url, headers=headers)
+        assert response2.status_code == status.HTTP_401_UNAUTHORIZED
+
     @pytest.mark.asyncio
     async def test_logout_all(
         self, async_client, moderator, access_token_moderator, refresh_token_moderator
@@ -91,7 +114,37 @@ class TestAuthLogout:
             user_refresh_tokens = result1.all()
 
         assert len(user_refresh_tokens) == 1
-        assert user_refresh_tokens[0].token == refresh_token_moderator
+        assert user_refresh_tokens[0].token_hash == token_digest(
+            refresh_token_moderator
+        )
+
+    @pytest.mark.asyncio
+    async def test_logout_all_revokes_access_tokens(
+        self, async_client, moderator, access_token_moderator, refresh_token_moderator
+    ):
+        user_url = f"/api/v1/users/{moderator.id}"
+        tokens = {
+            "access_token": access_token_moderator,
+            "refresh_token": refresh_token_moderator,
+        }
+
+        response1 = await async_client.post(f"{self.endpoint}/all", json=tokens)
+        assert response1.status_code == status.HTTP_200_OK
+
+        # Отзыв одной отметкой по пользователю, токен в denylist не попадал
+        response2 = await async_client.get(
+            user_url, headers={"Authorization": f"Bearer {access_token_moderator}"}
+        )
+        assert response2.status_code == status.HTTP_401_UNAUTHORIZED
+
+        # Новый access-токен выдается по сохраненному refresh-токену
+        response3 = await async_client.post("/api/v1/auth/refresh", json=tokens)
+        assert response3.status_code == status.HTTP_200_OK
+        new_access_token = response3.json()["access_token"]
+        response4 = await async_client.get(
+            user_url, headers={"Authorization": f"Bearer {new_access_token}"}
+        )
+        assert response4.status_code == status.HTTP_200_OK
 
     @pytest.mark.parametrize(
         "token_data, expected_status",
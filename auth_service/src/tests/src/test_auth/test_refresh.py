@@ -1,8 +1,12 @@
 from uuid import uuid4
 
+import jwt
 import pytest
 from fastapi import status
 
+from core.config import JWT_ALGORITHM, settings
+from tests import constants
+
 
 class TestAuthRefresh:
     def setup_method(self):
@@ -38,6 +42,57 @@ class TestAuthRefresh:
         assert "access_token" in response2_data
         assert "refresh_token" in response2_data
 
+    @pytest.mark.asyncio
+    async def test_refresh_token_reuse(
+        self, async_client, moderator, access_token_moderator, refresh_token_moderator
+    ):
+        request_data = {
+            "access_token": access_token_moderator,
+            "refresh_token": refresh_token_moderator,
+        }
+        response1 = await async_client.post(self.endpoint, json=request_data)
+        assert response1.status_code == status.HTTP_200_OK
+        assert response1.json()["refresh_token"] != refresh_token_moderator
+
+        # После ротации старый refresh токен больше не действителен
+        response2 = await async_client.post(self.endpoint, json=request_data)
+        assert response2.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio
+    async def test_refresh_after_role_change(
+        self,
+        async_client,
+        moderator,
+        role,
+        headers_admin,
+        access_token_moderator,
+        refresh_token_moderator,
+    ):
+        response1 = await async_client.post(
+            self.endpoint,
+            json={
+                "access_token": access_token_moderator,
+                "refresh_token": refresh_token_moderator,
+            },
+        )
+        tokens = response1.json()
+
+        # Новая роль сбрасывает кэш ролей и попадает в следующий токен
+        await async_client.post(
+            f"/api/v1/users/{moderator.id}/roles",
+            headers=headers_admin,
+            json={"role_id": constants.TEST_ROLE_UUID},
+        )
+        response2 = await async_client.post(self.endpoint, json=tokens)
+        assert response2.status_code == status.HTTP_200_OK
+
+        payload = jwt.decode(
+            response2.json()["access_token"],
+            settings.jwt_secret_key,
+            algorithms=[JWT_ALGORITHM],
+        )
+        assert sorted(payload["roles"]) == ["moderator", "new role"]
+
     @pytest.mark.parametrize(
         "token_data, expected_status",
         [
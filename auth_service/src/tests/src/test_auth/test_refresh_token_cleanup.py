@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import status
+from sqlalchemy import func, select
+
+from core.config import settings
+from models import RefreshToken
+from services.refresh_token_sweeper import RefreshTokenSweeper
+from tests import constants
+from tests.fixtures.db_fixtures import async_session_maker
+
+
+async def count_tokens(user_id) -> int:
+    async with async_session_maker() as session:
+        return await session.scalar(
+            select(func.count())
+            .select_from(RefreshToken)
+            .where(RefreshToken.user_id == user_id)
+        )
+
+
+class TestRefreshTokenCleanup:
+    @pytest.mark.asyncio
+    async def test_sweep_expired(self, moderator):
+        now = datetime.now()
+        async with async_session_maker() as session:
+            session.add_all(
+                RefreshToken(
+                    user_id=moderator.id,
+                    token_hash=uuid4().hex,
+                    expires_at=now - timedelta(days=1),
+                )
+                for _ in range(7)
+            )
+            session.add(
+                RefreshToken(
+                    user_id=moderator.id,
+                    token_hash=uuid4().hex,
+                    expires_at=now + timedelta(days=1),
+                )
+            )
+            await session.commit()
+
+        # Пачки меньше числа просроченных токенов, чтобы проверить цикл
+        sweeper = RefreshTokenSweeper(async_session_maker, batch_size=3)
+        assert await sweeper.sweep() == 7
+        assert await count_tokens(moderator.id) == 1
+
+    @pytest.mark.asyncio
+    async def test_sessions_cap(self, async_client, moderator, monkeypatch):
+        monkeypatch.setattr(settings, "max_sessions_per_user", 2)
+
+        for _ in range(4):
+            response = await async_client.post(
+                url="/api/v1/auth/login",
+                json={
+                    "login": constants.MODERATOR_LOGIN,
+                    "password": constants.MODERATOR_PASSWORD,
+                },
+            )
+            assert response.status_code == status.HTTP_200_OK
+
+        assert await count_tokens(moderator.id) == 2
+
+        # Последний выданный токен остаётся рабочим
+        refresh_response = await async_client.post(
+            url="/api/v1/auth/refresh",
+            json={
+                "access_token": response.json()["access_token"],
+                "refresh_token": response.json()["refresh_token"],
+            },
+        )
+        assert refresh_response.status_code == status.HTTP_200_OK
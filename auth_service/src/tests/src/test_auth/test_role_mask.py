@@ -0,0 +1,47 @@
+import pytest
+from fastapi import HTTPException
+
+from api.auth_utils import (check_admin, decode_token, has_role,
+                            is_access_token, token_roles)
+from core.config import ROLE_MASK_CLAIM, settings
+from services import role_catalog
+from services.auth import AuthService
+
+USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    catalog = role_catalog.RoleCatalog(None)
+    catalog.set_bits({"admin": 0, "moderator": 3, "subscriber": 70})
+    monkeypatch.setattr(role_catalog, "catalog", catalog)
+    monkeypatch.setattr(settings, "access_token_role_mask", True)
+    return catalog
+
+
+class TestRoleMask:
+    @pytest.mark.asyncio
+    async def test_mask_claim(self, catalog):
+        token = await AuthService.generate_access_token(
+            USER_ID, ["subscriber", "moderator"]
+        )
+        payload = decode_token(token)
+
+        assert "roles" not in payload
+        assert payload[ROLE_MASK_CLAIM] == (1 << 70) | (1 << 3)
+        assert is_access_token(payload)
+        assert has_role(payload, "subscriber")
+        assert not has_role(payload, "admin")
+        assert token_roles(payload) == ["moderator", "subscriber"]
+        with pytest.raises(HTTPException):
+            check_admin(payload)
+
+    @pytest.mark.asyncio
+    async def test_unknown_role_falls_back_to_titles(self, catalog):
+        token = await AuthService.generate_access_token(USER_ID, ["admin", "new"])
+        payload = decode_token(token)
+
+        # Роль, которой еще нет в справочнике, не теряется
+        assert payload["roles"] == ["admin", "new"]
+        assert has_role(payload, "admin")
+        check_admin(payload)
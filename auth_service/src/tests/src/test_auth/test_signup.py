@@ -1,6 +1,8 @@
 import pytest
 from fastapi import status
 
+from services import user as user_service
+
 
 class TestAuthSignup:
     def setup_method(self):
@@ -88,3 +90,25 @@ class TestAuthSignup:
         response_data = response.json()
         for field in expected_fields:
             assert field in response_data
+
+    @pytest.mark.asyncio
+    async def test_duplicate_rejected_before_hashing(self, async_client, monkeypatch):
+        hashed = []
+        hash_password = user_service.hash_password
+
+        async def counting_hash_password(password: str) -> str:
+            hashed.append(password)
+            return await hash_password(password)
+
+        monkeypatch.setattr(user_service, "hash_password", counting_hash_password)
+        user_data = {"login": "user1", "password": "pass1", "email": "u1@example.com"}
+
+        response1 = await async_client.post(url=self.endpoint, json=user_data)
+        assert response1.status_code == status.HTTP_200_OK
+
+        # Занятый логин отклоняется проверкой по индексу, пароль не хэшируется
+        response2 = await async_client.post(
+            url=self.endpoint, json={**user_data, "email": "u2@example.com"}
+        )
+        assert response2.status_code == status.HTTP_409_CONFLICT
+        assert len(hashed) == 1
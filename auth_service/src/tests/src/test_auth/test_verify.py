@@ -0,0 +1,44 @@
+import pytest
+from fastapi import status
+
+
+class TestAuthVerify:
+    def setup_method(self):
+        self.endpoint = "/api/v1/auth/verify"
+
+    @pytest.mark.asyncio
+    async def test_verify(
+        self, async_client, moderator, access_token_moderator, refresh_token_moderator
+    ):
+        headers = {"Authorization": f"Bearer {access_token_moderator}"}
+        response = await async_client.get(self.endpoint, headers=headers)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert response.headers["x-user-id"] == str(moderator.id)
+        assert response.headers["x-user-roles"] == "moderator"
+
+        # Отозванный после выхода токен не проходит проверку
+        await async_client.post(
+            "/api/v1/auth/logout",
+            json={
+                "access_token": access_token_moderator,
+                "refresh_token": refresh_token_moderator,
+            },
+        )
+        response = await async_client.get(self.endpoint, headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio
+    async def test_verify_anonymous(self, async_client):
+        response = await async_client.get(self.endpoint)
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert "x-user-id" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_verify_invalid_token(self, async_client, refresh_token_moderator):
+        for token in ("not a token", refresh_token_moderator):
+            response = await async_client.get(
+                self.endpoint, headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
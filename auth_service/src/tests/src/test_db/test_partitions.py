@@ -0,0 +1,68 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+from db.partitions import (DEFAULT_PARTITION, add_months, list_partitions,
+                           maintain_partitions, month_start, partition_name)
+from tests import constants
+from tests.fixtures.db_fixtures import async_session_maker, engine_test
+
+
+async def partition_of(event_date: datetime) -> str:
+    async with async_session_maker() as session:
+        return await session.scalar(
+            text(
+                "SELECT tableoid::regclass::text FROM login_history "
+                "WHERE event_date = :event_date"
+            ),
+            {"event_date": event_date},
+        )
+
+
+class TestLoginHistoryPartitions:
+    @pytest.mark.asyncio
+    async def test_partitions_created_with_table(self):
+        async with engine_test.connect() as conn:
+            partitions = await conn.run_sync(list_partitions)
+        names = {x.name for x in partitions}
+
+        assert DEFAULT_PARTITION in names
+        assert partition_name(month_start(date.today())) in names
+
+    @pytest.mark.asyncio
+    async def test_rows_moved_from_default_partition(self, moderator):
+        future_month = add_months(date.today(), 24)
+        event_date = datetime(future_month.year, future_month.month, 15)
+        async with async_session_maker() as session:
+            await session.execute(
+                text(
+                    "INSERT INTO login_history "
+                    "VALUES (gen_random_uuid(), :user_id, :event_date, true, :ua)"
+                ),
+                {
+                    "user_id": moderator.id,
+                    "event_date": event_date,
+                    "ua": constants.USER_AGENT,
+                },
+            )
+            await session.commit()
+        assert await partition_of(event_date) == DEFAULT_PARTITION
+
+        async with engine_test.begin() as conn:
+            await conn.run_sync(maintain_partitions, months_ahead=0, today=event_date)
+
+        assert await partition_of(event_date) == partition_name(future_month)
+
+    @pytest.mark.asyncio
+    async def test_retention(self):
+        old_month = add_months(date.today(), -36)
+        async with engine_test.begin() as conn:
+            await conn.run_sync(maintain_partitions, months_ahead=0, today=old_month)
+            result = await conn.run_sync(
+                maintain_partitions, retention_months=12, drop_detached=True
+            )
+            partitions = await conn.run_sync(list_partitions)
+
+        assert partition_name(old_month) in result["detached"]
+        assert partition_name(old_month) not in {x.name for x in partitions}
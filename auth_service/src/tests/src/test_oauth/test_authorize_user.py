@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from db.unit_of_work import UnitOfWork
+from models import OAuthAccount, User
+from schemas.auths import OAuthUser
+from services.exceptions import ConflictError
+from services.oauth2 import OAuthServiceGoogle
+from services.password_hasher import UNUSABLE_PASSWORD
+from services.user import UserService
+from tests import constants
+from tests.fixtures.db_fixtures import async_session_maker
+
+
+def make_oauth_user(email: str) -> OAuthUser:
+    return OAuthUser(
+        oauth_user_id="google-1",
+        email=email,
+        first_name="Oauth",
+        last_name="User",
+        provider_type="Google",
+    )
+
+
+async def authorize(oauth_user: OAuthUser) -> User:
+    async with UnitOfWork(async_session_maker) as unit_of_work:
+        service = OAuthServiceGoogle(unit_of_work, UserService(unit_of_work))
+        return await service.authorize_user(oauth_user, constants.USER_AGENT)
+
+
+async def count(model) -> int:
+    async with async_session_maker() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+
+class TestAuthorizeUser:
+    @pytest.mark.asyncio
+    async def test_new_user_without_password(self):
+        user = await authorize(make_oauth_user("new@example.com"))
+
+        assert user.password == UNUSABLE_PASSWORD
+        assert (await authorize(make_oauth_user("new@example.com"))).id == user.id
+        assert await count(User) == 1
+        assert await count(OAuthAccount) == 1
+
+    @pytest.mark.asyncio
+    async def test_link_existing_user_by_email(self, moderator):
+        user = await authorize(make_oauth_user(constants.MODERATOR_EMAIL.upper()))
+
+        assert str(user.id) == constants.MODERATOR_UUID
+        # Пароль пользователя не затирается
+        assert user.check_password(constants.MODERATOR_PASSWORD)
+        assert await count(OAuthAccount) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_first_logins(self):
+        users = await asyncio.gather(
+            *(authorize(make_oauth_user("race@example.com")) for _ in range(5))
+        )
+
+        assert len({user.id for user in users}) == 1
+        assert await count(User) == 1
+        assert await count(OAuthAccount) == 1
+
+    @pytest.mark.asyncio
+    async def test_login_taken_by_other_user(self):
+        async with async_session_maker() as session:
+            session.add(
+                User(
+                    login="taken@example.com",
+                    password="password",
+                    email="other@example.com",
+                    first_name="Other",
+                    last_name="User",
+                )
+            )
+            await session.commit()
+
+        # Ручка авторизации отвечает на это 409
+        with pytest.raises(ConflictError):
+            await authorize(make_oauth_user("taken@example.com"))
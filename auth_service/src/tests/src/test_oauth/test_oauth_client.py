@@ -0,0 +1,104 @@
+import httpx
+import jwt
+import pytest
+from authlib.integrations.httpx_client import AsyncOAuth2Client
+
+from core import oauth_clients
+from core.config import settings
+from services.oauth2 import OAuthServiceGoogle
+from services.oidc_keys import OIDCKeySet
+
+DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+
+
+def make_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestOAuthHttpClient:
+    @pytest.mark.asyncio
+    async def test_retry_server_errors(self, monkeypatch):
+        monkeypatch.setattr(settings, "oauth_http_retry_backoff", 0)
+        statuses = iter([503, 502, 200])
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(next(statuses))
+
+        async with make_client(handler) as client:
+            response = await oauth_clients.get_with_retries(
+                client, "https://provider/userinfo"
+            )
+
+        assert response.status_code == 200
+        assert len(calls) == settings.oauth_http_retries + 1
+
+    @pytest.mark.asyncio
+    async def test_no_retry_client_errors(self, monkeypatch):
+        monkeypatch.setattr(settings, "oauth_http_retry_backoff", 0)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(401)
+
+        async with make_client(handler) as client:
+            response = await oauth_clients.get_with_retries(
+                client, "https://provider/userinfo"
+            )
+
+        assert response.status_code == 401
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_fake_provider(self):
+        transport = oauth_clients.FakeGoogleTransport(latency=0)
+        async with httpx.AsyncClient(transport=transport) as client:
+            token = await client.post("https://provider/token", data={"code": "abc"})
+            headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+            first = await client.get("https://provider/userinfo", headers=headers)
+            second = await client.get("https://provider/userinfo", headers=headers)
+
+        # Один и тот же код всегда дает одного и того же пользователя
+        assert first.json() == second.json()
+        assert first.json()["email"].endswith("@fake.example.com")
+
+
+class TestGoogleIdToken:
+    @pytest.fixture
+    async def client(self, monkeypatch):
+        monkeypatch.setattr(settings, "google_client_id", "client")
+        monkeypatch.setattr(settings, "google_userinfo_url", "https://provider/me")
+        transport = oauth_clients.FakeGoogleTransport(latency=0, client_id="client")
+        async with AsyncOAuth2Client(transport=transport) as client:
+            monkeypatch.setattr(oauth_clients, "google_client", client)
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_verify_id_token(self, client):
+        keys = OIDCKeySet(client, DISCOVERY_URL)
+        token = await client.fetch_token("https://provider/token", code="abc")
+
+        claims = await keys.verify(token["id_token"], "client")
+
+        assert claims["email"].endswith("@fake.example.com")
+
+    @pytest.mark.asyncio
+    async def test_reject_foreign_audience(self, client):
+        keys = OIDCKeySet(client, DISCOVERY_URL)
+        token = await client.fetch_token("https://provider/token", code="abc")
+
+        with pytest.raises(jwt.InvalidAudienceError):
+            await keys.verify(token["id_token"], "other-client")
+
+    @pytest.mark.asyncio
+    async def test_userinfo_fallback(self, client):
+        token = await client.fetch_token("https://provider/token", code="abc")
+        with_keys = OAuthServiceGoogle(None, None, OIDCKeySet(client, DISCOVERY_URL))
+        without_keys = OAuthServiceGoogle(None, None, None)
+
+        # Профиль из id_token совпадает с профилем из userinfo
+        assert await with_keys.get_user_data_from_provider(
+            token
+        ) == await without_keys.get_user_data_from_provider(token)
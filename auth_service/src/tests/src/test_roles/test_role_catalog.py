@@ -0,0 +1,76 @@
+import pytest
+from redis.asyncio import Redis
+
+from api.auth_utils import decode_token, has_role
+from core.config import ROLE_MASK_CLAIM, settings
+from db.pubsub import PubSubListener
+from db.unit_of_work import UnitOfWork
+from schemas.roles import RoleCreateSchema
+from services import role_catalog
+from services.auth import AuthService
+from services.role import RoleService
+from services.role_catalog import RoleCatalog
+from services.token_watermarks import TokenWatermarks
+from tests import constants
+from tests.fixtures.db_fixtures import async_session_maker
+
+
+class TestRoleCatalog:
+    @pytest.mark.asyncio
+    async def test_catalog_follows_role_changes(self, role):
+        redis = Redis(host=settings.redis_host, port=settings.redis_port)
+        listener = PubSubListener(redis)
+        catalog = RoleCatalog(async_session_maker, redis, listener)
+        await listener.start()
+        await catalog.start()
+        try:
+            assert catalog.ready
+            cached_role = await catalog.get(constants.TEST_ROLE_UUID)
+            assert cached_role.title == "new role"
+
+            # Справочник обновляется после коммита запроса
+            async with UnitOfWork(async_session_maker) as unit_of_work:
+                await RoleService(unit_of_work, redis, catalog).change_role(
+                    RoleCreateSchema(title="renamed role"), constants.TEST_ROLE_UUID
+                )
+            cached_role = await catalog.get(constants.TEST_ROLE_UUID)
+            assert cached_role.title == "renamed role"
+
+            async with UnitOfWork(async_session_maker) as unit_of_work:
+                await RoleService(unit_of_work, redis, catalog).delete_role(
+                    constants.TEST_ROLE_UUID
+                )
+            assert await catalog.get(constants.TEST_ROLE_UUID) is None
+        finally:
+            await catalog.stop()
+            await listener.stop()
+            await redis.aclose()
+
+    @pytest.mark.asyncio
+    async def test_rename_revokes_mask_tokens(self, moderator, monkeypatch):
+        redis = Redis(host=settings.redis_host, port=settings.redis_port)
+        catalog = RoleCatalog(async_session_maker, redis)
+        await catalog.load()
+        monkeypatch.setattr(role_catalog, "catalog", catalog)
+        monkeypatch.setattr(settings, "access_token_role_mask", True)
+        watermarks = TokenWatermarks(redis)
+        try:
+            token = await AuthService.generate_access_token(
+                constants.MODERATOR_UUID, ["moderator"]
+            )
+            payload = decode_token(token)
+            assert ROLE_MASK_CLAIM in payload
+
+            role_id = str(moderator.roles[0].id)
+            async with UnitOfWork(async_session_maker) as unit_of_work:
+                await RoleService(
+                    unit_of_work, redis, catalog, watermarks=watermarks
+                ).change_role(
+                    RoleCreateSchema(title=constants.ROLE_ADMIN_TITLE), role_id
+                )
+
+            # Бит роли не меняется, поэтому старая маска читается как админ
+            assert has_role(payload, constants.ROLE_ADMIN_TITLE)
+            assert await watermarks.is_revoked(payload)
+        finally:
+            await redis.aclose()
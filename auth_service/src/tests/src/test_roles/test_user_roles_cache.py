@@ -0,0 +1,31 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from redis.asyncio import Redis
+
+from core.config import settings
+from services.user_roles_cache import UserRolesCache
+from tests import constants
+from tests.fixtures.db_fixtures import async_session_maker
+
+
+class TestUserRolesCache:
+    @pytest.mark.asyncio
+    async def test_invalidation_during_read_wins(self, admin):
+        redis = Redis(host=settings.redis_host, port=settings.redis_port)
+
+        @asynccontextmanager
+        async def session_with_invalidation():
+            async with async_session_maker() as session:
+                # Роли сняли, пока кэш читал их из базы
+                await cache.invalidate(constants.ADMIN_UUID)
+                yield session
+
+        cache = UserRolesCache(session_with_invalidation, redis)
+        try:
+            roles = await cache.get(constants.ADMIN_UUID)
+
+            assert roles == [constants.ROLE_ADMIN_TITLE]
+            assert await redis.get(cache._key(constants.ADMIN_UUID)) is None
+        finally:
+            await redis.aclose()
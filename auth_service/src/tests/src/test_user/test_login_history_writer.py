@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import func, select
+
+from models import LoginHistory
+from services.login_history_writer import LoginHistoryWriter
+from tests import constants
+from tests.fixtures.db_fixtures import async_session_maker
+
+
+class TestLoginHistoryWriter:
+    @pytest.mark.asyncio
+    async def test_drain_on_stop(self, moderator):
+        writer = LoginHistoryWriter(async_session_maker, batch_size=3)
+        await writer.start()
+        for _ in range(7):
+            writer.submit(moderator.id, constants.USER_AGENT)
+
+        # Остановка дописывает всё, что осталось в очереди
+        await writer.stop()
+
+        async with async_session_maker() as session:
+            count = await session.scalar(
+                select(func.count())
+                .select_from(LoginHistory)
+                .where(LoginHistory.user_id == moderator.id)
+            )
+
+        assert count == 7
+
+    @pytest.mark.asyncio
+    async def test_drop_when_queue_full(self, moderator):
+        writer = LoginHistoryWriter(async_session_maker, max_queue_size=2)
+        for _ in range(5):
+            writer.submit(moderator.id, constants.USER_AGENT)
+
+        assert len(writer._queue) == 2
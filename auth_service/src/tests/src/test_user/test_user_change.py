@@ -2,8 +2,11 @@ from datetime import datetime
 
 import pytest
 from fastapi import status
+from sqlalchemy import exists, select
 
+from models import RefreshToken
 from tests import constants
+from tests.fixtures.db_fixtures import async_session_maker
 
 
 class TestUserChange:
@@ -122,3 +125,19 @@ class TestUserChange:
         response = await async_client.put(f"{self.endpoint}/{admin.id}")
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.asyncio
+    async def test_password_change_ends_sessions(
+        self, async_client, admin, headers_admin, moderator, refresh_token_moderator
+    ):
+        response = await async_client.put(
+            url=f"{self.endpoint}/{moderator.id}",
+            json={"password": "new_pass1"},
+            headers=headers_admin,
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        async with async_session_maker() as session:
+            assert not await session.scalar(
+                select(exists().where(RefreshToken.user_id == moderator.id))
+            )
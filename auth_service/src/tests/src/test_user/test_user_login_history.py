@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime, timedelta
 
 import pytest
 from fastapi import status
@@ -11,25 +12,25 @@ class TestUserLoginHistory:
         self.endpoint = "/api/v1/users"
 
     @pytest.mark.parametrize(
-        "pagination_data, expected_length, expected_fields, expected_status",
+        "pagination_data, expected_length, expected_fields, has_next",
         [
             (
-                {"page": 1, "size": 10},
+                {"size": 10},
                 5,
-                ("event_date", "success"),
-                status.HTTP_200_OK,
+                ("event_date", "success", "user_agent"),
+                False,
             ),
             (
-                {"page": 1, "size": 3},
+                {"size": 3},
                 3,
-                ("event_date", "success"),
-                status.HTTP_200_OK,
+                ("event_date", "success", "user_agent"),
+                True,
             ),
             (
-                {"page": 10, "size": 1},
+                {"size": 1, "from": (datetime.now() + timedelta(days=1)).isoformat()},
                 0,
                 (),
-                status.HTTP_200_OK,
+                False,
             ),
         ],
     )
@@ -43,7 +44,7 @@ class TestUserLoginHistory:
         pagination_data,
         expected_length,
         expected_fields,
-        expected_status,
+        has_next,
     ):
         response = await async_client.get(
             url=f"{self.endpoint}/{moderator.id}/login_history",
@@ -56,10 +57,56 @@ class TestUserLoginHistory:
 
         assert "items" in response_data
         assert len(response_data.get("items")) == expected_length
+        assert (response_data.get("next_cursor") is not None) == has_next
 
         for field in expected_fields:
             assert field in response_data.get("items")[0]
 
+    @pytest.mark.asyncio
+    async def test_cursor_pagination(
+        self, async_client, moderator, headers_admin, login_multiple_times
+    ):
+        url = f"{self.endpoint}/{moderator.id}/login_history"
+        event_dates = []
+        params = {"size": 2, "total": "exact"}
+        while True:
+            response = await async_client.get(url, headers=headers_admin, params=params)
+            assert response.status_code == status.HTTP_200_OK
+            response_data = response.json()
+            assert response_data["total"] == 5
+            event_dates.extend(x["event_date"] for x in response_data["items"])
+            if not response_data["next_cursor"]:
+                break
+            params["cursor"] = response_data["next_cursor"]
+
+        # Все записи пройдены по одному разу, от новых к старым
+        assert len(event_dates) == 5
+        assert event_dates == sorted(event_dates, reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_estimated_total(
+        self, async_client, moderator, headers_admin, login_multiple_times
+    ):
+        response = await async_client.get(
+            url=f"{self.endpoint}/{moderator.id}/login_history",
+            headers=headers_admin,
+            params={"total": "estimated"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["total_is_estimate"] is True
+        assert response.json()["total"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor(self, async_client, moderator, headers_admin):
+        response = await async_client.get(
+            url=f"{self.endpoint}/{moderator.id}/login_history",
+            headers=headers_admin,
+            params={"cursor": "not-a-cursor"},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
     @pytest.mark.asyncio
     async def test_not_exists_user(self, async_client, headers_admin):
         response = await async_client.get(
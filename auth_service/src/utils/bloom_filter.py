@@ -0,0 +1,35 @@
+import hashlib
+import math
+
+
+def optimal_bloom_params(capacity: int, error_rate: float) -> tuple[int, int]:
+    """Размер битового массива и число хэш-функций под емкость и долю ошибок"""
+    size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    hash_count = max(1, round(size / capacity * math.log(2)))
+    return size, hash_count
+
+
+def bloom_positions(item: str, size: int, hash_count: int) -> list[int]:
+    """Позиции битов элемента (двойное хэширование Кирша-Митценмахера)"""
+    digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % size for i in range(hash_count)]
+
+
+class BloomFilter:
+    """Фильтр Блума в памяти процесса: отрицательный ответ всегда точный"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size, self.hash_count = optimal_bloom_params(capacity, error_rate)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str) -> None:
+        for position in bloom_positions(item, self.size, self.hash_count):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in bloom_positions(item, self.size, self.hash_count)
+        )
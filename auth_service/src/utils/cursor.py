@@ -0,0 +1,19 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from services.exceptions import InvalidCursorError
+
+
+def encode_cursor(event_date: datetime, object_id: UUID) -> str:
+    raw = f"{event_date.isoformat()}|{object_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        event_date, object_id = raw.split("|")
+        return datetime.fromisoformat(event_date), UUID(object_id)
+    except ValueError:
+        raise InvalidCursorError
@@ -0,0 +1,11 @@
+import hashlib
+
+
+def short_digest(value: str, digest_size: int = 16) -> str:
+    """Короткий стабильный хэш строки, чтобы не хранить длинные ключи в Redis"""
+    return hashlib.blake2b(value.encode(), digest_size=digest_size).hexdigest()
+
+
+def token_digest(token: str) -> str:
+    """Хэш токена фиксированной длины вместо хранения самого токена"""
+    return hashlib.sha256(token.encode()).hexdigest()
@@ -1,8 +1,6 @@
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
-                                    create_async_engine)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from core.config import settings
 from db import postgres
 from models.roles import Role
 from models.user import User
@@ -11,7 +9,7 @@ from models.user import User
 async def create_superuser(
     login: str, password: str, first_name: str, last_name: str, email: str
 ):
-    engine = create_async_engine(postgres.dsn, echo=settings.engine_echo, future=True)
+    engine = postgres.create_engine()
     async_session = async_sessionmaker(
         bind=engine, expire_on_commit=False, class_=AsyncSession
     )
@@ -2,6 +2,9 @@ import os
 
 AUTH_SERVICE_HOST = os.getenv("AUTH_SERVICE_HOST", "127.0.0.1")
 AUTH_SERVICE_PORT = os.getenv("AUTH_SERVICE_PORT", "80")
+AUTH_SERVICE_TIMEOUT = float(os.getenv("AUTH_SERVICE_TIMEOUT", "3"))
+# Сколько секунд помнить, что пользователь администратор
+ADMIN_ROLE_CACHE_TTL = int(os.getenv("ADMIN_ROLE_CACHE_TTL", "60"))
 
 AUTHENTICATION_BACKENDS = [
     "movies.auth.AuthServiceBackend",
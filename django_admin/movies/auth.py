@@ -1,62 +1,67 @@
 import http
+import time
 from logging import getLogger
-from time import sleep
+from urllib.parse import quote
 
 import requests
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import BaseBackend
+from requests.adapters import HTTPAdapter
 
-from config.components.auth import (ADMIN_ROLE_KEY, AUTH_SERVICE_HOST,
-                                    AUTH_SERVICE_PORT)
+from config.components.auth import (ADMIN_ROLE_CACHE_TTL, ADMIN_ROLE_KEY,
+                                    AUTH_SERVICE_HOST, AUTH_SERVICE_PORT,
+                                    AUTH_SERVICE_TIMEOUT)
 
 User = get_user_model()
 
 logger = getLogger("django")
 
-SLEEP_TIME = 0.5
+# Одна сессия на процесс, соединения с auth_service переиспользуются
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_maxsize=10))
+session.mount("https://", HTTPAdapter(pool_maxsize=10))
 
+# user_id -> момент, до которого пользователь считается администратором
+admin_checks: dict[str, float] = {}
 
-class AuthServiceBackend(BaseBackend):
-    def _check_admin_role(self, user_id, access_token):
-        url = (
-            f"{AUTH_SERVICE_HOST}:{AUTH_SERVICE_PORT}/auth/api/v1/users/{user_id}/roles"
-        )
-        page = 1
-        page_size = 50
-
-        session = requests.Session()
-
-        while True:
-            try:
-                response = session.get(
-                    url,
-                    headers={"Authorization": f"Bearer {access_token}"},
-                    params={"page": page, "size": page_size},
-                )
-                if response.status_code != http.HTTPStatus.OK:
-                    return False
-
-                items = response.json().get("items", [])
 
-                if not items:
-                    break
+def auth_service_url(path: str) -> str:
+    return f"{AUTH_SERVICE_HOST}:{AUTH_SERVICE_PORT}/auth/api/v1/{path}"
 
-                for item in items:
-                    if item["title"] == ADMIN_ROLE_KEY:
-                        return True
 
-                page += 1
-                sleep(SLEEP_TIME)
+class AuthServiceBackend(BaseBackend):
+    def _check_admin_role(self, user_id, access_token):
+        if admin_checks.get(user_id, 0) > time.monotonic():
+            return True
 
-            except Exception as e:
-                logger.error(e)
-                break
-        return False
+        try:
+            response = session.get(
+                auth_service_url(f"users/{user_id}/roles/{quote(ADMIN_ROLE_KEY)}"),
+                headers={"Authorization": f"Bearer {access_token}"},
+                timeout=AUTH_SERVICE_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            logger.error(e)
+            return False
+
+        if response.status_code != http.HTTPStatus.NO_CONTENT:
+            return False
+
+        # Кэшируются только положительные ответы, отказ всегда перепроверяется
+        admin_checks[user_id] = time.monotonic() + ADMIN_ROLE_CACHE_TTL
+        return True
 
     def authenticate(self, request, username=None, password=None):
-        url = AUTH_SERVICE_HOST + ":" + AUTH_SERVICE_PORT + "/auth/api/v1/auth/login"
         payload = {"login": username, "password": password}
-        response = requests.post(url, json=payload)
+        try:
+            response = session.post(
+                auth_service_url("auth/login"),
+                json=payload,
+                timeout=AUTH_SERVICE_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            logger.error(e)
+            return None
 
         if response.status_code != http.HTTPStatus.OK:
             return None
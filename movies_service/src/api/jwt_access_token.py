@@ -1,26 +1,87 @@
+import asyncio
 import http
+import json
+import logging
 import time
+import urllib.request
 from enum import Enum
 from typing import Optional
 
+import jwt
 from fastapi import HTTPException, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import jwt
 
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class ExpiredTokenException(Exception):
     pass
 
 
-def decode_token(token: str) -> Optional[dict]:
+class JWKSKeys:
+    """
+    Публичные ключи auth_service, разобранные один раз.
+
+    JWK Set скачивается при старте и повторно только когда встречается
+    неизвестный kid (смена ключа), не чаще раза в min_refresh_interval секунд.
+    Проверка токена с известным kid в сеть не ходит.
+    """
+
+    def __init__(self, url: str, min_refresh_interval: float = 60, timeout: float = 3):
+        self.url = url
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fetch(self) -> dict:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            return json.load(response)
+
+    async def refresh(self) -> None:
+        """Перечитывает ключи, ошибки только логируются: старые ключи остаются"""
+        self._refreshed_at = time.monotonic()
+        try:
+            jwk_set = jwt.PyJWKSet.from_dict(await asyncio.to_thread(self._fetch))
+        except Exception:
+            logger.exception("failed to load JWKS from %s", self.url)
+            return
+        self._keys = {key.key_id: key for key in jwk_set.keys}
+
+    async def get(self, kid: str) -> Optional[jwt.PyJWK]:
+        if kid in self._keys:
+            return self._keys[kid]
+
+        async with self._lock:
+            stale = time.monotonic() - self._refreshed_at >= self.min_refresh_interval
+            if kid not in self._keys and stale:
+                await self.refresh()
+        return self._keys.get(kid)
+
+
+jwks_keys: Optional[JWKSKeys] = None
+
+
+async def decode_token(token: str) -> Optional[dict]:
     try:
-        decoded_token = jwt.decode(
-            token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm]
-        )
-        return decoded_token if decoded_token["exp"] >= time.time() else None
-    except Exception:
+        kid = jwt.get_unverified_header(token).get("kid")
+        # Токены без kid подписаны общим секретом. С ключами auth_service
+        # сервису секрет не нужен, и такие токены по умолчанию отклоняются
+        if jwks_keys is None or (kid is None and settings.jwt_accept_legacy_hs256):
+            return jwt.decode(
+                token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm]
+            )
+        if kid is None:
+            return None
+
+        key = await jwks_keys.get(kid)
+        if key is None:
+            return None
+        return jwt.decode(token, key.key, algorithms=[key.algorithm_name])
+    except jwt.InvalidTokenError:
         return None
 
 
@@ -29,6 +90,13 @@ class JWTBearer(HTTPBearer):
         super().__init__(auto_error=auto_error)
 
     async def __call__(self, request: Request) -> dict | None:
+        if settings.trust_gateway_auth and "x-user-id" in request.headers:
+            roles = request.headers.get("x-user-roles", "")
+            return {
+                "user_id": request.headers["x-user-id"],
+                "roles": [role for role in roles.split(",") if role],
+            }
+
         credentials: HTTPAuthorizationCredentials = await super().__call__(request)
         if not credentials:
             raise HTTPException(
@@ -40,7 +108,7 @@ class JWTBearer(HTTPBearer):
                 status_code=http.HTTPStatus.UNAUTHORIZED,
                 detail="Only Bearer token might be accepted",
             )
-        decoded_token = self.parse_token(credentials.credentials)
+        decoded_token = await self.parse_token(credentials.credentials)
         if not decoded_token:
             # TODO: реализовать логику перенаправления в сервис аутентификации для обновления токена
             raise HTTPException(
@@ -50,8 +118,8 @@ class JWTBearer(HTTPBearer):
         return decoded_token
 
     @staticmethod
-    def parse_token(jwt_token: str) -> Optional[dict]:
-        return decode_token(jwt_token)
+    async def parse_token(jwt_token: str) -> Optional[dict]:
+        return await decode_token(jwt_token)
 
 
 security_jwt = JWTBearer()
@@ -75,6 +143,7 @@ async def get_permissions(user: dict) -> str:
     # TODO: чот не красивая логика, тк фильмы помеченные FR не будут отображаться для всех
     # кажется нужно сделать viewing_permission не text, а list
     roles = user.get("roles", [])
-    if not roles:
+    # В компактном формате роли приходят битовой маской "rm"
+    if not roles and not user.get("rm"):
         return FilmsPermissionChoices.FREE.value
     return FilmsPermissionChoices.PREMIUM.value
@@ -21,6 +21,13 @@ class Settings(BaseSettings):
 
     jwt_secret_key: str = Field("my_secret_key", alias="JWT_SECRET_KEY")
     jwt_algorithm: str = Field("my_jwt_algorithm", alias="JWT_ALGORITHM")
+    jwt_jwks_url: str = Field("", alias="JWT_JWKS_URL")
+    jwt_jwks_min_refresh_sec: int = Field(60, alias="JWT_JWKS_MIN_REFRESH_SEC")
+    # При заданном JWT_JWKS_URL токены без kid (HS256 на общем секрете) принимаются
+    # только с этим флагом, например на время перехода auth_service на ключи
+    jwt_accept_legacy_hs256: bool = Field(False, alias="JWT_ACCEPT_LEGACY_HS256")
+    # Токен уже проверен nginx через auth_request, пользователь приходит в заголовках
+    trust_gateway_auth: bool = Field(False, alias="TRUST_GATEWAY_AUTH")
 
 
 settings = Settings()
@@ -6,6 +6,7 @@ from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 from redis.asyncio import Redis
 
+from api import jwt_access_token
 from api.v1 import films, genres, persons
 from core.config import settings as config
 from db import elastic, redis
@@ -17,6 +18,13 @@ async def lifespan(app: FastAPI):
     try:
         redis.redis = Redis(host=config.redis_host, port=config.redis_port)
         elastic.es = AsyncElasticsearch(hosts=[config.elastic_host])
+        if config.jwt_jwks_url:
+            jwt_access_token.jwks_keys = jwt_access_token.JWKSKeys(
+                config.jwt_jwks_url,
+                min_refresh_interval=config.jwt_jwks_min_refresh_sec,
+            )
+            # Если auth_service ещё не поднялся, ключи подтянутся на первом токене
+            await jwt_access_token.jwks_keys.refresh()
         yield
     finally:
         # shutdown